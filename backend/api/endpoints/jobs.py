@@ -0,0 +1,27 @@
+# Linux Mirror Testing Solution - Job Endpoints
+
+from fastapi import APIRouter, HTTPException
+from api.endpoints.test import test_tracker, cancel_target
+from services.jobs import job_registry
+
+router = APIRouter()
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Get the state of a manual test job and the results of its finished targets"""
+    job = job_registry.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.describe(test_tracker.get)
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel every target of a job that has not finished yet"""
+    job = job_registry.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    cancelled = {}
+    for entry in job.entries:
+        if entry.done is None or not entry.done.done():
+            cancelled[entry.target.key] = await cancel_target(entry.target.key)
+    return {**job.describe(test_tracker.get), "cancelled": cancelled}
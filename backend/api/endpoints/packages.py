@@ -0,0 +1,53 @@
+# Linux Mirror Testing Solution - Package Index Endpoints
+
+import time
+from fastapi import APIRouter, Query
+from core.repo_config import config_store
+from services.package_index import package_index
+
+router = APIRouter()
+
+@router.get("")
+async def get_package_index():
+    """Size of the package index and when each target was last indexed"""
+    return package_index.stats()
+
+@router.get("/{name}")
+async def get_package(name: str, version: str = Query(None, description="Only count versions starting with this, e.g. 3.0")):
+    """
+    Which configured targets carry a package and in which versions, from the
+    package index (no container). ``version`` matches the start of the
+    version without its epoch, so version=3.0 answers "is 3.0.x everywhere".
+    """
+    started = time.perf_counter_ns()
+    found = package_index.lookup(name)
+    elapsed_ns = time.perf_counter_ns() - started
+
+    targets, missing, unindexed = [], [], []
+    for target in config_store.get().targets:
+        if target.key not in package_index.segments:
+            unindexed.append(target.key)
+            continue
+        packages = found.get(target.key, [])
+        if version:
+            packages = [p for p in packages if p["version"].split(":", 1)[-1].startswith(version)]
+        if not packages:
+            missing.append(target.key)
+            continue
+        targets.append({
+            "key": target.key,
+            "distribution": target.distribution,
+            "version": target.version,
+            "repository": target.repository,
+            "packages": packages,
+        })
+
+    return {
+        "name": name,
+        "version": version,
+        "present_everywhere": bool(targets) and not missing and not unindexed,
+        "targets": targets,
+        "missing": missing,
+        "unindexed": unindexed,
+        "lookup_microseconds": round(elapsed_ns / 1000, 1),
+    }
@@ -1,83 +1,163 @@
 # Linux Mirror Testing Solution - Test Endpoints
 
-import yaml
 import asyncio
+import hashlib
+import logging
+import os
+import shutil
 import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from fastapi import APIRouter, WebSocket
-from typing import Dict, Any, List
-from models.test import TestResult, TestRequest
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Dict, Any, List, Mapping, Optional
+from models.test import TestResult, TestRequest, PackageCheckRequest
 from services.test_service import test_service
 from core.config import settings
+from core.repo_config import config_store, DISTRIBUTION_NAMES, PACKAGE_NAME
+from services.scheduler import test_scheduler, periodic_scheduler, priority_for, PRIORITY_MANUAL
+from services.container_pool import container_pool
+from services.docker_client import docker_client, DockerAPIError, CONTAINER_PATH
+from services.container_reaper import container_reaper, container_name, container_labels, test_timeout_seconds
+from services.http_client import http_client
+from services.metadata import MetadataError, MetadataReport, chain_digest
+from services.apt_metadata import dists_url_for, fetch_release, verify_apt_repository
+from services.rpm_metadata import fetch_repomd, verify_rpm_repository
+from services.fingerprint_cache import fingerprint_cache, Fingerprint, script_digest
+from services.package_index import package_index
+from services.completeness import completeness_checker
+from services.results_store import results_store
+from services.event_hub import event_hub, serve_websocket, stream_events, parse_last_event_id
+from services.log_stream import log_streamer
+from services.jobs import Job, job_registry
+from services.output_matcher import OutputMatcher
+from services import metrics
+from services.tracing import tracer, span, start_span
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Global test tracking
 test_tracker = {}  # Format: {f"{distribution}-{version}": {"start_time": datetime, "status": "running"}}
 
-async def test_repository_comprehensive(distribution: str, version: str, repository_url: str):
-    """Perform comprehensive repository testing including update and install tests"""
-    import aiohttp
-    import subprocess
-    import tempfile
-    import os
+# Containers of running tests by test key, for cancellation
+active_containers = {}
 
+# Targets with a package check in flight (one container per target at a time)
+package_checks_running = set()
+
+# Manual job the current test task runs for (labels its containers)
+current_job_id: ContextVar = ContextVar("current_job_id", default=None)
+
+async def test_repository_comprehensive(distribution: str, version: str, repository_url: str, force: bool = False):
+    """
+    Perform comprehensive repository testing including update and install tests.
+    Container phases are skipped when nothing they depend on changed since the
+    last green run, unless ``force`` is set.
+    """
     test_key = f"{distribution}-{version}"
+    trace = tracer.start_run(test_key, distribution=distribution, version=version, repository=repository_url)
     test_tracker[test_key] = {
         "start_time": datetime.now(),
+        "started_ns": trace.root.start_ns,
         "status": "running",
         "repository": repository_url,
         "test_results": {
             "connectivity": {"status": "pending", "duration": 0, "error": None},
+            "metadata": {"status": "pending", "duration": 0, "error": None},
             "update": {"status": "pending", "duration": 0, "error": None},
             "install": {"status": "pending", "duration": 0, "error": None}
         }
     }
 
+    cancelled = False
+    log_streamer.start_run(test_key)
+    publish_target(test_key)
+
+    def record_phase(phase, status, error, duration, step=None):
+        test_tracker[test_key]["test_results"][phase] = {
+            "status": status,
+            "duration": round(duration, 3),
+            "error": error
+        }
+        if status not in ("skipped", "unchanged"):
+            metrics.phase_duration.labels(phase, distribution, version).observe(duration)
+        if step is not None:
+            step.attributes["status"] = status
+            if status == "failure":
+                step.error = error
+        publish_target(test_key)
+
     try:
         # Phase 1: Connectivity Test
-        connectivity_start = datetime.now()
-        connectivity_status, connectivity_error = await test_connectivity(distribution, version, repository_url)
-        connectivity_duration = (datetime.now() - connectivity_start).seconds
-
-        test_tracker[test_key]["test_results"]["connectivity"] = {
-            "status": connectivity_status,
-            "duration": connectivity_duration,
-            "error": connectivity_error
-        }
+        with span("connectivity") as step:
+            connectivity_status, connectivity_error = await test_connectivity(distribution, version, repository_url)
+        record_phase("connectivity", connectivity_status, connectivity_error, step.duration, step)
+
+        # Phase 2: Metadata verification from the backend host (no container)
+        metadata_status = "skipped"
+        if connectivity_status != "failure":
+            with span("metadata") as step:
+                metadata_status, metadata_error, metadata_report = await test_metadata(distribution, version, repository_url)
+            record_phase("metadata", metadata_status, metadata_error, step.duration, step)
+            if metadata_report is not None:
+                test_tracker[test_key]["package_count"] = metadata_report.package_count
+                test_tracker[test_key]["metadata"] = metadata_report.to_dict()
+                with span("package_index"):
+                    await package_index.ingest(test_key, repository_url, metadata_report)
+                metadata_report.packages = None
+        else:
+            record_phase("metadata", "skipped", None, 0)
 
-        # If connectivity fails, skip other tests
+        # If connectivity or metadata fails, skip the container tests
         if connectivity_status == "failure":
             test_tracker[test_key]["status"] = "failure"
             test_tracker[test_key]["error_message"] = f"Connectivity failed: {connectivity_error}"
+            record_phase("update", "skipped", None, 0)
+            record_phase("install", "skipped", None, 0)
+        elif metadata_status == "failure":
+            test_tracker[test_key]["status"] = "failure"
+            test_tracker[test_key]["error_message"] = f"Metadata verification failed: {metadata_error}"
+            record_phase("update", "skipped", None, 0)
+            record_phase("install", "skipped", None, 0)
         else:
-            # Phase 2: Update Test (apt update / yum update)
-            update_start = datetime.now()
-            update_status, update_error = await test_repository_update(distribution, version, repository_url)
-            update_duration = (datetime.now() - update_start).seconds
-
-            test_tracker[test_key]["test_results"]["update"] = {
-                "status": update_status,
-                "duration": update_duration,
-                "error": update_error
-            }
-
-            # Phase 3: Install Test (install a common package)
-            install_start = datetime.now()
-            install_status, install_error = await test_package_install(distribution, version, repository_url)
-            install_duration = (datetime.now() - install_start).seconds
-
-            test_tracker[test_key]["test_results"]["install"] = {
-                "status": install_status,
-                "duration": install_duration,
-                "error": install_error
-            }
-
-            # Determine overall status
-            if all(result["status"] == "success" for result in test_tracker[test_key]["test_results"].values()):
+            fingerprint = None
+            if metadata_status == "success":
+                with span("fingerprint"):
+                    fingerprint = await get_run_fingerprint(distribution, version, repository_url, metadata_report)
+            unchanged = None if force else fingerprint_cache.lookup(test_key, fingerprint)
+            test_tracker[test_key]["verified_unchanged"] = unchanged is not None
+
+            if unchanged is not None:
+                # Mirror, image and script are identical to the last green run
+                note = f"Unchanged since full run at {datetime.fromtimestamp(unchanged.verified_at).isoformat(timespec='seconds')}"
+                record_phase("update", "unchanged", note, 0)
+                record_phase("install", "unchanged", note, 0)
+
+            pipeline_results = None
+            if unchanged is None and config_store.get().section("test").get("combined_pipeline", settings.combined_container_pipeline):
+                # Phases 3+4 in a single container: one cold start, one index download
+                with span("pipeline"):
+                    pipeline_results = await test_repository_pipeline(distribution, version, repository_url, on_phase=record_phase)
+
+            if unchanged is None and pipeline_results is None:
+                # Phase 3: Update Test (apt update / yum update)
+                with span("update") as step:
+                    update_status, update_error = await test_repository_update(distribution, version, repository_url)
+                record_phase("update", update_status, update_error, step.duration, step)
+
+                # Phase 4: Install Test (install a common package)
+                with span("install") as step:
+                    install_status, install_error = await test_package_install(distribution, version, repository_url)
+                record_phase("install", install_status, install_error, step.duration, step)
+
+            # Determine overall status (skipped phases don't count either way)
+            results = [result for result in test_tracker[test_key]["test_results"].values() if result["status"] != "skipped"]
+            if all(result["status"] in ("success", "unchanged") for result in results):
                 overall_status = "success"
                 error_msg = None
-            elif any(result["status"] == "success" for result in test_tracker[test_key]["test_results"].values()):
+            elif any(result["status"] == "success" for result in results):
                 overall_status = "partial"
                 failures = [name for name, result in test_tracker[test_key]["test_results"].items() if result["status"] == "failure"]
                 error_msg = f"Failed tests: {', '.join(failures)}"
@@ -88,180 +168,418 @@ async def test_repository_comprehensive(distribution: str, version: str, reposit
             test_tracker[test_key]["status"] = overall_status
             test_tracker[test_key]["error_message"] = error_msg
 
+            if overall_status != "success":
+                fingerprint_cache.invalidate(test_key)
+            elif unchanged is None:
+                fingerprint_cache.store(test_key, fingerprint)
+
+    except asyncio.CancelledError:
+        # Cancelled from the API; container_process has removed the container
+        cancelled = True
+        test_tracker[test_key]["status"] = "cancelled"
+        test_tracker[test_key]["error_message"] = "Test cancelled"
+        for result in test_tracker[test_key]["test_results"].values():
+            if result["status"] == "pending":
+                result["status"] = "cancelled"
+        fingerprint_cache.invalidate(test_key)
+
     except Exception as e:
         test_tracker[test_key]["status"] = "failure"
         test_tracker[test_key]["error_message"] = f"Test framework error: {str(e)}"
 
     # Update final status
-    end_time = datetime.now()
-    duration = (end_time - test_tracker[test_key]["start_time"]).seconds
-    test_tracker[test_key]["end_time"] = end_time
-    test_tracker[test_key]["duration"] = duration
+    test_tracker[test_key]["end_time"] = datetime.now()
+    test_tracker[test_key]["duration"] = round(trace.root.duration, 3)
+    tracer.finish_run(test_key, trace, test_tracker[test_key]["status"])
+    results_store.record(distribution, version, test_tracker[test_key])
+    metrics.runs_total.labels(test_tracker[test_key]["status"]).inc()
+    log_streamer.finish_run(test_key, test_tracker[test_key]["status"])
+    publish_target(test_key)
+    if cancelled:
+        raise asyncio.CancelledError()
+
+
+def get_metadata_urls(distribution: str, version: str, repository_url: str) -> List[str]:
+    """Get the repository metadata URLs probed by the connectivity test"""
+    distribution = distribution.lower()
+    if distribution in ["debian", "ubuntu"]:
+        # Use codenames for Debian and Ubuntu versions
+        return [f"{repository_url}/dists/{get_codename(distribution, version)}/Release"]
+    elif distribution == "kali":
+        # Kali uses kali-rolling
+        return [f"{repository_url}/dists/kali-rolling/Release"]
+    elif distribution in ["rocky", "rhel"]:
+        # Rocky Linux / RHEL repo structure: test repodata for BaseOS
+        return [f"{repository_url}/{version}/BaseOS/x86_64/os/repodata/repomd.xml"]
+    return [repository_url]
 
 
 async def test_connectivity(distribution: str, version: str, repository_url: str):
     """Test basic repository connectivity"""
-    import aiohttp
-
     try:
-        async with aiohttp.ClientSession() as session:
-            test_urls = []
-
-            if distribution.lower() == "debian":
-                # Use codenames for all Debian versions
-                codenames = {
-                    "7": "wheezy", "8": "jessie", "9": "stretch", "10": "buster",
-                    "11": "bullseye", "12": "bookworm", "13": "trixie"
-                }
-                codename = codenames.get(version, version)
-                test_urls = [f"{repository_url}/dists/{codename}/Release"]
-            elif distribution.lower() == "ubuntu":
-                codenames = {"18.04": "bionic", "20.04": "focal", "22.04": "jammy", "24.04": "noble"}
-                codename = codenames.get(version, version)
-                test_urls = [f"{repository_url}/dists/{codename}/Release"]
-            elif distribution.lower() == "kali":
-                # Kali uses kali-rolling
-                test_urls = [f"{repository_url}/dists/kali-rolling/Release"]
-            elif distribution.lower() == "rocky":
-                # Rocky Linux repo structure: test repodata for BaseOS
-                test_urls = [f"{repository_url}/{version}/BaseOS/x86_64/os/repodata/repomd.xml"]
-            elif distribution.lower() == "rhel":
-                # RHEL repo structure: test repodata for BaseOS
-                test_urls = [f"{repository_url}/{version}/BaseOS/x86_64/os/repodata/repomd.xml"]
+        for url in get_metadata_urls(distribution, version, repository_url):
+            # Conditional HEAD over the shared keep-alive session; 304 means unchanged and healthy
+            result = await http_client.probe(url, timeout=get_timeout("connectivity"))
+            if result.ok:
+                return "success", None
             else:
-                test_urls = [repository_url]
-
-            for url in test_urls:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    if response.status == 200:
-                        return "success", None
-                    else:
-                        return "failure", f"HTTP {response.status}"
+                return "failure", f"HTTP {result.status}"
 
-            return "failure", "No valid URLs found"
+        return "failure", "No valid URLs found"
 
     except Exception as e:
         return "failure", str(e)
 
 
+async def test_metadata(distribution: str, version: str, repository_url: str):
+    """
+    Verify repository metadata (Release + Packages indices for APT,
+    repomd.xml + primary.xml for RPM) from the backend.
+    Returns (status, error, report); status is "skipped" when disabled or
+    not supported for the distribution.
+    """
+    if not config_store.get().section("test").get("verify_metadata", settings.metadata_verification_enabled):
+        return "skipped", None, None
+
+    test_key = f"{distribution}-{version}"
+    target = config_store.get().get(test_key)
+
+    def collect_packages(digest: str) -> bool:
+        # Rows are only held in memory when the index is out of date for this metadata
+        return package_index.enabled and not package_index.is_current(test_key, repository_url, digest)
+
+    # The package index and the completeness diff reuse the indices this phase downloads anyway
+    keep_indices = completeness_checker.workdir(test_key)
+    try:
+        if distribution.lower() in APT_DISTRIBUTIONS:
+            codename = get_codename(distribution, version)
+            release = await fetch_release(dists_url_for(repository_url, codename), settings.metadata_timeout_seconds)
+            report = await verify_apt_repository(
+                repository_url,
+                codename,
+                components=(target.components if target else None) or ("main",),
+                architectures=(target.architectures if target else None) or ("amd64",),
+                collect_packages=collect_packages(hashlib.sha256(release[1]).hexdigest()),
+                keep_indices=keep_indices,
+                release=release
+            )
+        elif distribution.lower() in ["rocky", "rhel"] and version in RPM_VERSIONS:
+            report = MetadataReport()
+            repos = []
+            for component in (target.components if target else None) or ("BaseOS",):
+                for arch in (target.architectures if target else None) or ("x86_64",):
+                    # The install test package comes from BaseOS
+                    packages = get_test_packages(distribution, version) if component == "BaseOS" else []
+                    repos.append((f"{repository_url.rstrip('/')}/{version}/{component}/{arch}/os", packages))
+            # Every repomd.xml first: the index's digest covers all of them
+            repomds = [await fetch_repomd(repo_url) for repo_url, _ in repos]
+            digest = None
+            for repomd in repomds:
+                digest = chain_digest(digest, hashlib.sha256(repomd).hexdigest())
+            collect = collect_packages(digest)
+            for (repo_url, packages), repomd in zip(repos, repomds):
+                report.merge(await verify_rpm_repository(
+                    repo_url, test_packages=packages, collect_packages=collect,
+                    keep_indices=keep_indices, repomd=repomd
+                ))
+        else:
+            return "skipped", None, None
+        if keep_indices:
+            with span("completeness"):
+                report.completeness = await completeness_checker.check(test_key, report.index_copies)
+        return "success", None, report
+
+    except MetadataError as e:
+        return "failure", str(e), None
+    except Exception as e:
+        return "failure", f"Metadata fetch error: {str(e)}", None
+    finally:
+        if keep_indices:
+            shutil.rmtree(keep_indices, ignore_errors=True)
+
+
+async def get_run_fingerprint(distribution: str, version: str, repository_url: str, metadata_report):
+    """Fingerprint of what the container phases would test; None if it can't be determined"""
+    scripts = get_container_scripts(distribution, version, repository_url)
+    if metadata_report is None or not metadata_report.release_sha256 or scripts is None:
+        return None
+    try:
+        image = await docker_client.inspect_image(get_base_image(distribution, version))
+    except Exception:
+        return None
+    if not image:
+        return None
+    return Fingerprint(metadata_report.release_sha256, image.get("Id", ""), script_digest(*scripts))
+
+
+def get_container_scripts(distribution: str, version: str, repository_url: str) -> Optional[List[str]]:
+    """
+    The scripts the container phases will run: the combined pipeline script
+    when it is enabled and available, else the update and install scripts.
+    None when a phase has no script (nothing stable to fingerprint).
+    """
+    if config_store.get().section("test").get("combined_pipeline", settings.combined_container_pipeline):
+        script = get_pipeline_script(distribution, version, repository_url)
+        if script is not None:
+            return [script]
+    scripts = [get_update_script(distribution, version, repository_url), get_install_script(distribution, version, repository_url)]
+    return None if None in scripts else scripts
+
+
+# Container test helpers
+APT_DISTRIBUTIONS = ["debian", "ubuntu", "kali"]
+RPM_DISTRIBUTIONS = ["rocky", "rhel", "centos"]
+RPM_VERSIONS = ["8", "9", "10"]
+
+# Marker written by the pipeline script around each phase, e.g. "@@phase update end 0"
+PHASE_MARKER = "@@phase"
+# Lines written by the package check script, e.g. "@@pkg nano 7.2-1" / "@@installed nano 7.2-1"
+PACKAGE_MARKER = "@@pkg"
+INSTALLED_MARKER = "@@installed"
+
+
+def get_base_image(distribution: str, version: str) -> str:
+    """
+    Get the container image used to test a distribution version: from
+    container.base_images in config.yaml, else the built-in default
+    """
+    configured = config_store.get().section("container").get("base_images", {}).get(distribution.lower())
+    if isinstance(configured, Mapping):
+        configured = configured.get(version, configured.get("default"))
+    if configured:
+        return str(configured).replace("{version}", version)
+    base_images = {
+        "debian": f"debian:{version}" if version in ["11", "12"] else "debian:latest",
+        "ubuntu": f"ubuntu:{version}" if version in ["20.04", "22.04", "24.04"] else "ubuntu:latest",
+        "kali": "kalilinux/kali-rolling:latest",
+        "rocky": f"rockylinux:{version}" if version in ["8", "9"] else "rockylinux:9",
+        "rhel": f"registry.access.redhat.com/ubi{version}/ubi" if version in ["8", "9"] else "registry.access.redhat.com/ubi9/ubi"
+    }
+    return base_images.get(distribution.lower(), "ubuntu:latest")
+
+
+def get_test_package(distribution: str, version: str):
+    """Get the package installed by the install test"""
+    distribution = distribution.lower()
+    if distribution == "kali":
+        return "curl"  # Reliable package in Kali
+    elif distribution in ["debian", "ubuntu"]:
+        return "nano"  # Most reliable package across Debian/Ubuntu versions
+    elif distribution == "rocky" and version in RPM_VERSIONS:
+        return "nano"  # Reliable package in Rocky Linux BaseOS repository
+    elif distribution == "rhel" and version in RPM_VERSIONS:
+        return "tree"  # tree is available in RHEL BaseOS repository and not pre-installed
+    return None
+
+
+def get_test_packages(distribution: str, version: str) -> List[str]:
+    """Packages installed by the install test: the repository's ``packages`` or the distribution default"""
+    target = config_store.get().get(f"{distribution}-{version}")
+    if target is not None and target.packages:
+        return list(target.packages)
+    package = get_test_package(distribution, version)
+    return [package] if package is not None else []
+
+
+def get_rpm_repo_name(distribution: str) -> str:
+    return f"{distribution.lower()}-baseos"
+
+
+def get_repo_setup_script(distribution: str, version: str, repository_url: str):
+    """
+    Get the shell commands that point a container at the mirror under test.
+    Returns None when the distribution has no container setup.
+    """
+    distribution = distribution.lower()
+    if distribution in APT_DISTRIBUTIONS:
+        if distribution == "kali":
+            # Kali uses kali-rolling as the distribution name
+            sources_content = f"deb {repository_url} kali-rolling main"
+        else:
+            codename = get_codename(distribution, version)
+            sources_content = f"deb {repository_url} {codename} main"
+        return (
+            f"echo 'nameserver 8.8.8.8' > /etc/resolv.conf && "
+            f"echo 'nameserver 1.1.1.1' >> /etc/resolv.conf && "
+            f"echo '{sources_content}' > /etc/apt/sources.list"
+        )
+    elif distribution in ["rocky", "rhel"] and version in RPM_VERSIONS:
+        # Rocky Linux and RHEL private repos share the baseurl/version/BaseOS/arch/os/ layout
+        baseos_url = f"{repository_url}/{version}/BaseOS/x86_64/os/"
+        repo_name = get_rpm_repo_name(distribution)
+        repo_display_name = f"{distribution.title()} {version} - BaseOS"
+        return (
+            f"export {CONTAINER_PATH} && "
+            f"echo 'nameserver 8.8.8.8' > /etc/resolv.conf && "
+            f"echo 'nameserver 1.1.1.1' >> /etc/resolv.conf && "
+            f"rm -rf /etc/yum.repos.d/* && "
+            f"mkdir -p /etc/yum.repos.d && "
+            f"echo '[{repo_name}]' > /etc/yum.repos.d/test.repo && "
+            f"echo 'name={repo_display_name}' >> /etc/yum.repos.d/test.repo && "
+            f"echo 'baseurl={baseos_url}' >> /etc/yum.repos.d/test.repo && "
+            f"echo 'enabled=1' >> /etc/yum.repos.d/test.repo && "
+            f"echo 'gpgcheck=0' >> /etc/yum.repos.d/test.repo"
+        )
+    return None
+
+
+def get_update_command(distribution: str) -> str:
+    """Command that refreshes the repository index"""
+    if distribution.lower() in APT_DISTRIBUTIONS:
+        return "apt-get update -y --allow-insecure-repositories 2>&1"
+    repo_name = get_rpm_repo_name(distribution)
+    return f"dnf clean all && dnf --disablerepo='*' --enablerepo='{repo_name}' makecache 2>&1"
+
+
+def get_install_command(distribution: str, packages: List[str], refresh: bool = True) -> str:
+    """
+    Command that installs the test packages in one transaction; refresh=False
+    reuses an index fetched earlier in the same container
+    """
+    names = " ".join(packages)
+    if distribution.lower() in APT_DISTRIBUTIONS:
+        command = f"apt-get install -y --allow-unauthenticated {names} 2>&1"
+        return f"apt-get update -y --allow-insecure-repositories && {command}" if refresh else command
+    repo_name = get_rpm_repo_name(distribution)
+    command = f"dnf --disablerepo='*' --enablerepo='{repo_name}' install -y {names} 2>&1"
+    return f"dnf clean all && {command}" if refresh else command
+
+
+def get_container_env(distribution: str) -> List[str]:
+    """Environment for test containers; RPM images need an explicit PATH"""
+    if distribution.lower() in RPM_DISTRIBUTIONS:
+        return [CONTAINER_PATH]
+    return []
+
+
+async def run_phase(distribution: str, version: str, phase: str, process, timeout: float):
+    """
+    Stream a single-phase container's output through the log buffer and an
+    OutputMatcher; a fatal line kills the container right away
+    """
+    matcher = OutputMatcher(distribution, phase)
+    log = await asyncio.wait_for(
+        log_streamer.consume(process.stdout, f"{distribution}-{version}", phase, matcher), timeout=timeout
+    )
+    if matcher.fatal is not None:
+        process.kill()
+        return matcher.classify(None)
+    await process.wait()
+    return matcher.classify(process.returncode, log.tail())
+
+
+def get_timeout(kind: str) -> float:
+    """
+    Timeout in seconds for "connectivity", "update", "install" or "pipeline"
+    (update + install), from config.yaml test.* falling back to Settings.
+    Container phases never exceed test.timeout_seconds.
+    """
+    test_config = config_store.get().section("test")
+    if kind == "connectivity":
+        return float(test_config.get("default_timeout_seconds", settings.test_default_timeout_seconds))
+    if kind == "pipeline":
+        return min(get_timeout("update") + get_timeout("install"), test_timeout_seconds())
+    defaults = {"update": settings.test_update_timeout_seconds, "install": settings.test_install_timeout_seconds}
+    value = (test_config.get("timeouts") or {}).get(kind, defaults[kind])
+    return min(float(value), test_timeout_seconds())
+
+
+@asynccontextmanager
+async def container_process(distribution: str, version: str, image: str, command: List[str], phase: str,
+                            cancellable: bool = True):
+    """
+    Run ``command`` for a test through the Docker Engine API, preferring a
+    warm pooled container (exec) and falling back to a fresh container named
+    after the target and phase and labeled with target, phase and job.
+    The container is removed on exit, including on cancellation.
+    ``cancellable`` registers it as the target's test container for cancel_target().
+    """
+    test_key = f"{distribution}-{version}"
+    env = get_container_env(distribution)
+    with span("container", phase=phase, image=image) as step:
+        with span("pool.acquire"):
+            lease = await container_pool.acquire(image)
+        step.attributes["pooled"] = lease is not None
+        if lease is not None:
+            try:
+                process = await docker_client.exec(lease.id, command, env=env)
+            except BaseException:
+                # Includes cancellation; the leased container would otherwise run until restart
+                container_pool.release(lease)
+                raise
+        else:
+            name = container_name(test_key, phase)
+            labels = container_labels(test_key, phase, current_job_id.get())
+            try:
+                process = await docker_client.run(image, command, env=env, labels=labels, name=name)
+            except DockerAPIError as e:
+                if e.status != 409:
+                    raise
+                # A container left over from an earlier run of this phase holds the name
+                await docker_client.remove_container(name, force=True)
+                process = await docker_client.run(image, command, env=env, labels=labels, name=name)
+
+        if cancellable:
+            active_containers[test_key] = process
+        container_reaper.track(process.container_id)
+        try:
+            yield process
+        finally:
+            if cancellable:
+                active_containers.pop(test_key, None)
+            container_reaper.untrack(process.container_id)
+            await process.close()
+            if lease is not None:
+                container_pool.release(lease)
+
+
+def get_update_script(distribution: str, version: str, repository_url: str) -> Optional[str]:
+    """Script of the separate update phase; None when the distribution has no repo setup"""
+    setup_script = get_repo_setup_script(distribution, version, repository_url)
+    if setup_script is None:
+        return None
+    return f"{setup_script} && {get_update_command(distribution)}"
+
+
+def get_install_script(distribution: str, version: str, repository_url: str) -> Optional[str]:
+    """Script of the separate install phase; None when there is nothing to install"""
+    setup_script = get_repo_setup_script(distribution, version, repository_url)
+    test_packages = get_test_packages(distribution, version)
+    if setup_script is None or not test_packages:
+        return None
+    return f"{setup_script} && {get_install_command(distribution, test_packages)}"
+
+
 async def test_repository_update(distribution: str, version: str, repository_url: str):
     """Test repository update in a container"""
-    import os
     try:
-        # Get base image from config
-        base_images = {
-            "debian": f"debian:{version}" if version in ["11", "12"] else "debian:latest",
-            "ubuntu": f"ubuntu:{version}" if version in ["20.04", "22.04", "24.04"] else "ubuntu:latest",
-            "kali": "kalilinux/kali-rolling:latest",
-            "rocky": f"rockylinux:{version}" if version in ["8", "9"] else "rockylinux:9",
-            "rhel": f"registry.access.redhat.com/ubi{version}/ubi" if version in ["8", "9"] else "registry.access.redhat.com/ubi9/ubi"
-        }
+        image = get_base_image(distribution, version)
+        script = get_update_script(distribution, version, repository_url)
 
-        image = base_images.get(distribution.lower(), "ubuntu:latest")
+        if script is not None:
+            async with container_process(distribution, version, image, ["bash", "-c", script], "update") as process:
+                try:
+                    return await run_phase(distribution, version, "update", process, timeout=get_timeout("update"))
 
-        # Set Docker host from environment
-        docker_host = os.environ.get('DOCKER_HOST', 'tcp://docker-daemon:2376')
+                except asyncio.TimeoutError:
+                    process.kill()
+                    return "failure", "Update test timed out"
 
-        # Create sources.list content for the test
-        if distribution.lower() in ["debian", "ubuntu", "kali"]:
-            if distribution.lower() == "kali":
-                # Kali uses kali-rolling as the distribution name
-                sources_content = f"deb {repository_url} kali-rolling main"
-            else:
-                codename = get_codename(distribution, version)
-                sources_content = f"deb {repository_url} {codename} main"
-
-            # Create Docker command to test apt update with explicit Docker host
-            docker_cmd = [
-                "docker", "run", "--rm",
-                image, "bash", "-c",
-                f"""
-                echo 'nameserver 8.8.8.8' > /etc/resolv.conf && \\
-                echo 'nameserver 1.1.1.1' >> /etc/resolv.conf && \\
-                echo '{sources_content}' > /etc/apt/sources.list && \\
-                apt-get update -y --allow-insecure-repositories 2>&1
-                """
-            ]
-        elif distribution.lower() in ["rocky", "rhel", "centos"]:
-            # For RPM-based systems, test with dnf/yum update
-            if distribution.lower() == "rocky" and version in ["8", "9", "10"]:
-                # Rocky Linux repo structure: baseurl/rocky/version/BaseOS/arch/os/
-                baseos_url = f"{repository_url}/{version}/BaseOS/x86_64/os/"
-            elif distribution.lower() == "rhel" and version in ["8", "9", "10"]:
-                # RHEL repo structure for private repo: baseurl/version/BaseOS/arch/os/
-                baseos_url = f"{repository_url}/{version}/BaseOS/x86_64/os/"
-
-            # Set up repo configuration for both Rocky and RHEL
-            if distribution.lower() in ["rocky", "rhel"] and version in ["8", "9", "10"]:
-                repo_name = f"{distribution.lower()}-baseos"
-                repo_display_name = f"{distribution.title()} {version} - BaseOS"
-
-                # Both RHEL and Rocky Linux use similar configuration for private repos
-                bash_script = (
-                    f"export PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin && "
-                    f"echo 'nameserver 8.8.8.8' > /etc/resolv.conf && "
-                    f"echo 'nameserver 1.1.1.1' >> /etc/resolv.conf && "
-                    f"rm -rf /etc/yum.repos.d/* && "
-                    f"mkdir -p /etc/yum.repos.d && "
-                    f"echo '[{repo_name}]' > /etc/yum.repos.d/test.repo && "
-                    f"echo 'name={repo_display_name}' >> /etc/yum.repos.d/test.repo && "
-                    f"echo 'baseurl={baseos_url}' >> /etc/yum.repos.d/test.repo && "
-                    f"echo 'enabled=1' >> /etc/yum.repos.d/test.repo && "
-                    f"echo 'gpgcheck=0' >> /etc/yum.repos.d/test.repo && "
-                    f"dnf clean all && "
-                    f"dnf --disablerepo='*' --enablerepo='{repo_name}' makecache 2>&1"
-                )
-                docker_cmd = [
-                    "docker", "run", "--rm", "--env", "PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin",
-                    image, "bash", "-c",
-                    bash_script
-                ]
-            else:
-                # Fallback for other RPM systems
-                docker_cmd = [
-                    "docker", "run", "--rm",
-                    image, "bash", "-c",
-                    f"curl -I {repository_url} 2>&1"
-                ]
+        if distribution.lower() in RPM_DISTRIBUTIONS:
+            # Fallback for other RPM systems
+            command = ["bash", "-c", f"curl -I {repository_url} 2>&1"]
         else:
             # For other systems, just test connectivity
-            docker_cmd = [
-                "docker", "run", "--rm",
-                "alpine:latest", "sh", "-c",
-                f"wget -q --spider {repository_url} 2>&1 || curl -I {repository_url} 2>&1"
-            ]
-
-        # Run the test with timeout
-        # Set environment to include Docker host
-        env = os.environ.copy()
-        env['DOCKER_HOST'] = docker_host
-
-        process = await asyncio.create_subprocess_exec(
-            *docker_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT,
-            env=env
-        )
+            image = "alpine:latest"
+            command = ["sh", "-c", f"wget -q --spider {repository_url} 2>&1 || curl -I {repository_url} 2>&1"]
 
-        try:
-            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=120)
-            output = stdout.decode()
-
-            if process.returncode == 0:
-                if "Reading package lists" in output or "Hit:" in output or "Get:" in output:
-                    return "success", None
-                elif "Metadata cache created" in output or "Cache created successfully" in output:
-                    return "success", None
-                elif distribution.lower() in ["rocky", "rhel", "centos"] and "Rocky Linux" in output:
-                    return "success", None
-                else:
-                    return "partial", "Update completed but with warnings"
-            else:
-                return "failure", f"Update failed: {output[-200:]}"  # Last 200 chars
+        async with container_process(distribution, version, image, command, "update") as process:
+            try:
+                return await run_phase(distribution, version, "update", process, timeout=get_timeout("update"))
 
-        except asyncio.TimeoutError:
-            process.kill()
-            return "failure", "Update test timed out"
+            except asyncio.TimeoutError:
+                process.kill()
+                return "failure", "Update test timed out"
 
     except Exception as e:
         return "failure", f"Container error: {str(e)}"
@@ -269,117 +587,297 @@ async def test_repository_update(distribution: str, version: str, repository_url
 
 async def test_package_install(distribution: str, version: str, repository_url: str):
     """Test package installation from repository"""
-    import os
     try:
-        base_images = {
-            "debian": f"debian:{version}" if version in ["11", "12"] else "debian:latest",
-            "ubuntu": f"ubuntu:{version}" if version in ["20.04", "22.04", "24.04"] else "ubuntu:latest",
-            "kali": "kalilinux/kali-rolling:latest",
-            "rocky": f"rockylinux:{version}" if version in ["8", "9"] else "rockylinux:9",
-            "rhel": f"registry.access.redhat.com/ubi{version}/ubi" if version in ["8", "9"] else "registry.access.redhat.com/ubi9/ubi"
-        }
-
-        image = base_images.get(distribution.lower(), "ubuntu:latest")
+        image = get_base_image(distribution, version)
+        script = get_install_script(distribution, version, repository_url)
 
-        # Set Docker host from environment
-        docker_host = os.environ.get('DOCKER_HOST', 'tcp://docker-daemon:2376')
-
-        if distribution.lower() in ["debian", "ubuntu", "kali"]:
-            if distribution.lower() == "kali":
-                # Kali uses kali-rolling as the distribution name
-                sources_content = f"deb {repository_url} kali-rolling main"
-                test_package = "curl"  # Reliable package in Kali
-            else:
-                codename = get_codename(distribution, version)
-                sources_content = f"deb {repository_url} {codename} main"
-                test_package = "nano"  # Most reliable package across Debian/Ubuntu versions
-
-            docker_cmd = [
-                "docker", "run", "--rm",
-                image, "bash", "-c",
-                f"""
-                echo 'nameserver 8.8.8.8' > /etc/resolv.conf && \\
-                echo 'nameserver 1.1.1.1' >> /etc/resolv.conf && \\
-                echo '{sources_content}' > /etc/apt/sources.list && \\
-                apt-get update -y --allow-insecure-repositories && \\
-                apt-get install -y --allow-unauthenticated {test_package} 2>&1
-                """
-            ]
-        elif distribution.lower() in ["rocky", "rhel", "centos"]:
-            # For RPM-based systems, test with dnf install
-            if distribution.lower() == "rocky" and version in ["8", "9", "10"]:
-                # Rocky Linux repo structure
-                baseos_url = f"{repository_url}/{version}/BaseOS/x86_64/os/"
-                test_package = "nano"  # Reliable package in Rocky Linux BaseOS repository
-            elif distribution.lower() == "rhel" and version in ["8", "9", "10"]:
-                # RHEL repo structure for private repo
-                baseos_url = f"{repository_url}/{version}/BaseOS/x86_64/os/"
-                test_package = "tree"  # tree is available in RHEL BaseOS repository and not pre-installed
-
-            # Set up repo configuration for both Rocky and RHEL
-            if distribution.lower() in ["rocky", "rhel"] and version in ["8", "9", "10"]:
-                repo_name = f"{distribution.lower()}-baseos"
-                repo_display_name = f"{distribution.title()} {version} - BaseOS"
-
-                # Both RHEL and Rocky Linux use similar configuration for private repos
-                bash_script = (
-                    f"export PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin && "
-                    f"echo 'nameserver 8.8.8.8' > /etc/resolv.conf && "
-                    f"echo 'nameserver 1.1.1.1' >> /etc/resolv.conf && "
-                    f"rm -rf /etc/yum.repos.d/* && "
-                    f"mkdir -p /etc/yum.repos.d && "
-                    f"echo '[{repo_name}]' > /etc/yum.repos.d/test.repo && "
-                    f"echo 'name={repo_display_name}' >> /etc/yum.repos.d/test.repo && "
-                    f"echo 'baseurl={baseos_url}' >> /etc/yum.repos.d/test.repo && "
-                    f"echo 'enabled=1' >> /etc/yum.repos.d/test.repo && "
-                    f"echo 'gpgcheck=0' >> /etc/yum.repos.d/test.repo && "
-                    f"dnf clean all && "
-                    f"dnf --disablerepo='*' --enablerepo='{repo_name}' install -y {test_package} 2>&1"
-                )
-                docker_cmd = [
-                    "docker", "run", "--rm", "--env", "PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin",
-                    image, "bash", "-c",
-                    bash_script
-                ]
-            else:
+        if script is None:
+            if distribution.lower() in RPM_DISTRIBUTIONS:
                 return "success", "Other RPM-based install test not implemented"
-        else:
             # For other systems
             return "success", "Install test not implemented for this distribution"
 
-        # Set environment to include Docker host
-        env = os.environ.copy()
-        env['DOCKER_HOST'] = docker_host
+        async with container_process(distribution, version, image, ["bash", "-c", script], "install") as process:
+            try:
+                return await run_phase(distribution, version, "install", process, timeout=get_timeout("install"))
+
+            except asyncio.TimeoutError:
+                process.kill()
+                return "failure", "Install test timed out"
 
-        process = await asyncio.create_subprocess_exec(
-            *docker_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT,
-            env=env
-        )
+    except Exception as e:
+        return "failure", f"Container error: {str(e)}"
 
+
+def get_pipeline_script(distribution: str, version: str, repository_url: str):
+    """
+    Build a single script that runs the update and install phases back to back,
+    printing phase markers so the output stream can be split per phase.
+    Returns None when the distribution has no combined pipeline.
+    """
+    setup_script = get_repo_setup_script(distribution, version, repository_url)
+    test_packages = get_test_packages(distribution, version)
+    if setup_script is None or not test_packages:
+        return None
+
+    lines = [setup_script]
+    lines += get_phase_lines("update", get_update_command(distribution))
+    # The install phase reuses the index fetched by the update phase
+    lines += get_phase_lines("install", get_install_command(distribution, test_packages, refresh=False))
+    return "\n".join(lines)
+
+
+def get_phase_lines(phase: str, command: str, stop_on_failure: bool = True) -> List[str]:
+    """Script lines running ``command`` between the phase's start and end markers"""
+    lines = [
+        f"echo '{PHASE_MARKER} {phase} start'",
+        f"( {command} ); rc=$?",
+        f"echo \"{PHASE_MARKER} {phase} end $rc\"",
+    ]
+    if stop_on_failure:
+        lines.append("[ $rc -eq 0 ] || exit $rc")
+    return lines
+
+
+async def test_repository_pipeline(distribution: str, version: str, repository_url: str, on_phase=None):
+    """
+    Run the update and install phases in one container session.
+
+    Returns {phase: (status, error, duration)}; ``on_phase(phase, status, error, duration, span)``
+    is called as soon as each phase finishes.  The repository setup and each
+    phase are traced as script.* spans under the container's span.  Returns None when the distribution
+    has no combined pipeline and the separate phase tests should be used.
+    """
+    script = get_pipeline_script(distribution, version, repository_url)
+    if script is None:
+        return None
+
+    test_key = f"{distribution}-{version}"
+    matchers = {phase: OutputMatcher(distribution, phase) for phase in ("update", "install")}
+    results = {}
+    current = {"phase": None, "span": None}
+
+    def finish_phase(phase: str, returncode, error: Optional[str] = None):
+        step = current["span"]
+        step.end()
+        if error is not None:
+            status = "failure"
+        else:
+            status, error = matchers[phase].classify(returncode, log_streamer.phase(test_key, phase).tail())
+        if status == "failure":
+            step.error = error
+        results[phase] = (status, error, step.duration)
+        current.update(phase=None, span=None)
+        if on_phase:
+            on_phase(phase, status, error, step.duration, step)
+
+    async def consume(stream) -> bool:
+        """Route output to the phase buffers; True when a fatal line was seen"""
+        setup = start_span("script.setup")
         try:
-            stdout, _ = await asyncio.wait_for(process.communicate(), timeout=180)
-            output = stdout.decode()
-
-            if process.returncode == 0:
-                if "Setting up" in output or "Processing triggers" in output:
-                    return "success", None
-                elif "Installed:" in output or "Complete!" in output:
-                    return "success", None
-                elif distribution.lower() in ["rocky", "rhel", "centos"] and ("Transaction complete" in output or "Transaction test" in output or "Running transaction" in output):
-                    return "success", None
+            while True:
+                line = await stream.readline()
+                if not line:
+                    return False
+                text = line.decode(errors="replace")
+                if text.startswith(PHASE_MARKER):
+                    parts = text.split()
+                    if len(parts) >= 3 and parts[1] in matchers:
+                        if parts[2] == "start":
+                            setup.end()
+                            current.update(phase=parts[1], span=start_span(f"script.{parts[1]}"))
+                        elif parts[2] == "end" and current["phase"] == parts[1]:
+                            returncode = int(parts[3]) if len(parts) > 3 and parts[3].lstrip("-").isdigit() else 1
+                            finish_phase(parts[1], returncode)
+                        continue
+                # Output before the first marker is the repository setup
+                log_streamer.append(test_key, current["phase"] or "setup", text)
+                if current["phase"] is not None and matchers[current["phase"]].feed(text):
+                    finish_phase(current["phase"], None)
+                    return True
+        finally:
+            setup.end()
+
+    try:
+        image = get_base_image(distribution, version)
+        async with container_process(distribution, version, image, ["bash", "-c", script], "pipeline") as process:
+            try:
+                # Same overall budget as the separate update and install containers
+                if await asyncio.wait_for(consume(process.stdout), timeout=get_timeout("pipeline")):
+                    # Fatal signature: no point waiting for apt/dnf to give up
+                    process.kill()
                 else:
-                    return "partial", "Package installed but with warnings"
+                    await process.wait()
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                if current["phase"] is not None:
+                    finish_phase(current["phase"], None, f"{current['phase'].title()} test timed out")
+
+            if current["phase"] is not None and current["phase"] not in results:
+                # The container died without closing the phase
+                finish_phase(current["phase"], process.returncode or 1)
+
+    except Exception as e:
+        for phase in matchers:
+            if phase not in results:
+                results[phase] = ("failure", f"Container error: {str(e)}", 0)
+
+    # Phases that never started (setup or an earlier phase failed)
+    for phase in matchers:
+        if phase not in results:
+            if "update" in results and results["update"][0] == "failure":
+                results[phase] = ("failure", "Skipped: update phase failed", 0)
             else:
-                return "failure", f"Install failed: {output[-200:]}"
+                results[phase] = ("failure", f"{phase.title()} phase did not run: {log_streamer.phase(test_key, 'setup').tail()}", 0)
+            if on_phase:
+                on_phase(phase, *results[phase])
+
+    return results
+
+
+def get_package_query_command(distribution: str, packages: List[str]) -> str:
+    """
+    Shell that prints "@@pkg <name> <version>" for each available package and
+    leaves the available names in $avail (runs in the script's shell, not a subshell)
+    """
+    names = " ".join(packages)
+    if distribution.lower() in APT_DISTRIBUTIONS:
+        return (
+            f"avail=''; for p in {names}; do "
+            f"v=$(apt-cache policy \"$p\" 2>/dev/null | sed -n 's/^ *Candidate: //p' | head -n 1); "
+            f"if [ -n \"$v\" ] && [ \"$v\" != '(none)' ]; then echo \"{PACKAGE_MARKER} $p $v\"; avail=\"$avail $p\"; fi; "
+            f"done"
+        )
+    repo_name = get_rpm_repo_name(distribution)
+    return (
+        f"out=$(dnf -q --disablerepo='*' --enablerepo='{repo_name}' repoquery --latest-limit 1 "
+        f"--queryformat '{PACKAGE_MARKER} %{{name}} %{{evr}}\\n' {names} 2>&1); echo \"$out\"; "
+        f"avail=$(echo \"$out\" | sed -n 's/^{PACKAGE_MARKER} \\([^ ]*\\) .*/\\1/p' | sort -u | tr '\\n' ' ')"
+    )
+
+
+def get_installed_query_command(distribution: str) -> str:
+    """Shell that prints "@@installed <name> <version>" for each installed package in $avail"""
+    if distribution.lower() in APT_DISTRIBUTIONS:
+        return f"dpkg-query -W -f='{INSTALLED_MARKER} ${{Package}} ${{Version}}\\n' $avail 2>/dev/null"
+    return f"rpm -q --qf '{INSTALLED_MARKER} %{{NAME}} %{{EVR}}\\n' $avail 2>/dev/null | grep '^{INSTALLED_MARKER}'"
+
+
+def get_package_check_script(distribution: str, version: str, repository_url: str,
+                             packages: List[str], install: bool = False):
+    """
+    Build the script for a package check: one index download, one availability
+    query for every package and, with ``install``, one transaction installing
+    the available ones. Returns None when the distribution has no container setup.
+    """
+    setup_script = get_repo_setup_script(distribution, version, repository_url)
+    if setup_script is None or not packages:
+        return None
+
+    lines = [setup_script]
+    lines += get_phase_lines("update", get_update_command(distribution))
+    lines += [f"echo '{PHASE_MARKER} query start'", get_package_query_command(distribution, packages),
+              f"echo '{PHASE_MARKER} query end 0'"]
+    if install:
+        command = get_install_command(distribution, ["$avail"], refresh=False)
+        lines += get_phase_lines("install", f"[ -z \"${{avail// }}\" ] || {command}", stop_on_failure=False)
+        lines.append(get_installed_query_command(distribution))
+    return "\n".join(lines)
+
+
+async def check_target_packages(target, packages: List[str], install: bool = False) -> Dict[str, Any]:
+    """
+    Check (and with ``install``, install) ``packages`` for one target in a
+    single container. Returns the target's status with one entry per package:
+    {"available", "version", "installed"}; "installed" is None unless installing.
+    """
+    distribution, version = target.distribution, target.version
+    summary = {
+        "key": target.key,
+        "distribution": distribution,
+        "version": version,
+        "status": "failure",
+        "error": None,
+        "duration": 0,
+        "packages": {name: {"available": False, "version": None, "installed": False if install else None}
+                     for name in packages},
+    }
+    script = get_package_check_script(distribution, version, target.repository, packages, install)
+    if script is None:
+        summary.update(status="skipped", error="Package checks are not supported for this distribution")
+        return summary
 
-        except asyncio.TimeoutError:
-            process.kill()
-            return "failure", "Install test timed out"
+    matchers = {phase: OutputMatcher(distribution, phase) for phase in ("update", "install")}
+    tails = {phase: [] for phase in ("setup", "update", "query", "install")}
+    returncodes: Dict[str, int] = {}
 
+    async def consume(stream):
+        phase = "setup"
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            text = line.decode(errors="replace")
+            parts = text.split()
+            if text.startswith(PHASE_MARKER) and len(parts) >= 3 and parts[1] in tails:
+                if parts[2] == "start":
+                    phase = parts[1]
+                elif parts[2] == "end":
+                    returncodes[parts[1]] = int(parts[3]) if len(parts) > 3 and parts[3].lstrip("-").isdigit() else 1
+                continue
+            if text.startswith(PACKAGE_MARKER) and len(parts) >= 3 and parts[1] in summary["packages"]:
+                # dnf versions that don't expand "\n" in --queryformat leave it on the line
+                version = parts[2][:-2] if parts[2].endswith("\\n") else parts[2]
+                summary["packages"][parts[1]].update(available=True, version=version)
+                continue
+            if text.startswith(INSTALLED_MARKER) and len(parts) >= 3 and parts[1] in summary["packages"]:
+                summary["packages"][parts[1]].update(installed=True, version=parts[2])
+                continue
+            tails[phase] = (tails[phase] + [text])[-20:]
+            if phase == "update" and matchers["update"].feed(text):
+                # The index can't be fetched; nothing else can succeed
+                return
+
+    started = time.monotonic()
+    try:
+        image = get_base_image(distribution, version)
+        async with container_process(distribution, version, image, ["bash", "-c", script], "packages",
+                                     cancellable=False) as process:
+            try:
+                await asyncio.wait_for(consume(process.stdout), timeout=get_timeout("pipeline"))
+            except asyncio.TimeoutError:
+                summary["error"] = "Package check timed out"
+            if summary["error"] is not None or "update" not in returncodes:
+                # Timed out or a fatal update line: no point waiting for apt/dnf to give up
+                process.kill()
+            await process.wait()
     except Exception as e:
-        return "failure", f"Container error: {str(e)}"
+        summary["error"] = f"Container error: {str(e)}"
+    summary["duration"] = round(time.monotonic() - started, 3)
+    if summary["error"] is not None:
+        return summary
+
+    if returncodes.get("update") != 0:
+        tail = "".join(tails["update"] or tails["setup"])
+        summary["error"] = matchers["update"].classify(returncodes.get("update", 1), tail)[1]
+        return summary
+
+    missing = [name for name, result in summary["packages"].items() if not result["available"]]
+    failed = [name for name, result in summary["packages"].items() if result["available"] and result["installed"] is False]
+    errors = []
+    if missing:
+        errors.append(f"Not available: {', '.join(missing)}")
+    if install and failed:
+        for line in tails["install"]:
+            matchers["install"].feed(line)
+        returncode = returncodes.get("install", 1)
+        reason = matchers["install"].classify(returncode, "".join(tails["install"]))[1] or f"exit code {returncode}"
+        errors.append(f"Not installed: {', '.join(failed)} ({reason})")
+    succeeded = len(packages) - len(missing) - (len(failed) if install else 0)
+    summary["status"] = "success" if not errors else "partial" if succeeded else "failure"
+    summary["error"] = "; ".join(errors) or None
+    return summary
 
 
 def get_codename(distribution: str, version: str):
@@ -391,233 +889,318 @@ def get_codename(distribution: str, version: str):
     }
     return codenames.get(distribution.lower(), {}).get(version, version)
 
-@router.post("/test")
-async def start_test(test_request: TestRequest):
-    """Start a test for the specified distributions and repositories"""
-    # In a real implementation, this would start a background task
-    # For now, we'll simulate a test result
-    print(f"Starting test for {test_request.distribution} {test_request.version}")
-    result = {
-        "distribution": test_request.distribution,
-        "version": test_request.version,
-        "status": "success",
-        "repository": test_request.repository_url,
-        "duration_seconds": 15,
-        "error_message": None
-    }
-    return result
+def schedule_tests(targets=None, manual: bool = False, reason: str = "scheduled"):
+    """Queue targets on the scheduler (all configured targets by default)"""
+    if targets is None:
+        targets = config_store.get().targets
+    entries = []
+    for target in targets:
+        previous_status = test_tracker.get(target.key, {}).get("status")
+        entries.append(test_scheduler.submit(target, priority_for(previous_status, manual), reason))
+        if previous_status is None:
+            publish_target(target.key)
+    return entries
+
+
+async def run_scheduled_test(entry):
+    target = entry.target
+    current_job_id.set(entry.job_id)
+    # Manual triggers always run the container phases
+    await test_repository_comprehensive(
+        target.distribution, target.version, target.repository, force=entry.priority == PRIORITY_MANUAL
+    )
+
+
+test_scheduler.configure(run_scheduled_test)
+periodic_scheduler.configure(
+    lambda targets: schedule_tests(targets, reason="interval"),
+    has_result=lambda key: key in test_tracker
+)
+
+def select_targets(test_request: TestRequest):
+    """
+    Configured targets matching a TestRequest. ``distributions`` entries may
+    name a family ("debian"), a display name ("Debian") or a single target
+    ("Debian-12" / "Debian 12"); ``repositories`` filters by URL. Empty lists
+    match everything.
+    """
+    wanted = {name.lower().replace(" ", "-") for name in test_request.distributions}
+    repositories = {url.rstrip("/") for url in test_request.repositories}
+    selected = []
+    for target in config_store.get().targets:
+        names = {target.family, target.distribution.lower(), target.key.lower()}
+        if wanted and not names & wanted:
+            continue
+        if repositories and target.repository.rstrip("/") not in repositories:
+            continue
+        selected.append(target)
+    return selected
+
+@router.post("/test", status_code=202)
+async def start_test(test_request: Optional[TestRequest] = None):
+    """
+    Queue a manual test job for the requested targets (all targets when the
+    request is empty) and return its job id straight away. A request for the
+    same targets as a job still in flight joins that job.
+    """
+    targets = select_targets(test_request or TestRequest())
+    if not targets:
+        raise HTTPException(status_code=404, detail="No configured targets match the request")
+
+    job = job_registry.find_active(targets)
+    coalesced = job is not None
+    if job is None:
+        entries = schedule_tests(targets, manual=True, reason="manual")
+        job = job_registry.add(Job(targets, entries, reason="manual"))
+        for entry in entries:
+            if entry.job_id is None and entry.started_at is None:
+                entry.job_id = job.id
+    return {**job.describe(test_tracker.get), "coalesced": coalesced}
+
+@router.post("/test/packages")
+async def check_packages(check_request: PackageCheckRequest):
+    """
+    Check that packages are available on the selected targets, and install
+    them with ``install``. Each target uses one container, one index download
+    and one apt-get/dnf transaction for all of its packages; the response has
+    a status per target and per package.
+    """
+    targets = select_targets(check_request)
+    if not targets:
+        raise HTTPException(status_code=404, detail="No configured targets match the request")
+
+    requested = {name.lower().replace(" ", "-"): packages for name, packages in check_request.target_packages.items()}
+    plan = []
+    for target in targets:
+        packages = (requested.get(target.key.lower()) or requested.get(target.family)
+                    or check_request.packages or get_test_packages(target.distribution, target.version))
+        invalid = [package for package in packages if not PACKAGE_NAME.match(package)]
+        if invalid:
+            raise HTTPException(status_code=422, detail=f"Invalid package names: {', '.join(invalid)}")
+        plan.append((target, list(dict.fromkeys(packages))))
+
+    busy = [target.key for target, _ in plan if target.key in package_checks_running]
+    if busy:
+        raise HTTPException(status_code=409, detail=f"Package check already running for {', '.join(busy)}")
+
+    async def check(target, packages):
+        # Slots come out of the scheduler's own limits, shared with scheduled tests
+        async with test_scheduler.slot(target):
+            return await check_target_packages(target, packages, check_request.install)
+
+    keys = {target.key for target, _ in plan}
+    package_checks_running.update(keys)
+    try:
+        results = await asyncio.gather(*(check(target, packages) for target, packages in plan))
+    finally:
+        package_checks_running.difference_update(keys)
+    return {"install": check_request.install, "targets": results}
+
+def describe_target(target) -> Dict[str, Any]:
+    """Dashboard entry for one target: its config plus the latest tracked result"""
+    repo = {"distribution": target.distribution, "version": target.version, "repository": target.repository}
+    test_info = test_tracker.get(target.key)
+
+    if test_info is not None:
+        # Get current status and duration
+        repo["status"] = test_info["status"]
+
+        if "duration" in test_info:
+            repo["duration_seconds"] = test_info["duration"]
+        elif test_info["status"] == "running":
+            # Calculate current duration for running tests
+            repo["duration_seconds"] = round((time.monotonic_ns() - test_info["started_ns"]) / 1e9, 3)
+            repo["start_time"] = test_info["start_time"].isoformat()
+        else:
+            repo["duration_seconds"] = 0
+
+        repo["error_message"] = test_info.get("error_message")
+
+        # Add detailed test results if available
+        if "test_results" in test_info:
+            repo["test_details"] = {
+                phase: {
+                    "status": result["status"],
+                    "duration": result["duration"],
+                    "error": result["error"]
+                }
+                for phase, result in test_info["test_results"].items()
+            }
+            repo["package_count"] = test_info.get("package_count")
+        else:
+            repo["test_details"] = None
+    else:
+        # Not run yet; the scheduler owns starting it
+        repo["status"] = "queued" if test_scheduler.is_pending(target.key) else "pending"
+        repo["duration_seconds"] = 0
+        repo["error_message"] = None
+
+    return repo
+
+
+def build_repository_list() -> List[Dict[str, Any]]:
+    config = config_store.get()
+    if config.fallback:
+        # Return fallback data if config can't be read
+        return [
+            {"distribution": target.distribution, "version": target.version, "repository": target.repository}
+            for target in config.targets
+        ]
+    return [describe_target(target) for target in config.targets]
+
+
+def publish_target(test_key: str):
+    """Push the current state of one target to connected dashboards"""
+    target = config_store.get().get(test_key)
+    if target is not None:
+        event_hub.publish(test_key, describe_target(target))
+
+
+event_hub.configure(build_repository_list)
 
 @router.get("/test")
 async def get_test_list():
     """Get list of repositories to test based on configuration"""
-    # Read the config file to get actual repository URLs
-    try:
-        with open('config.yaml', 'r') as file:
-            config = yaml.safe_load(file)
-    except Exception as e:
-        print(f"Error reading config file: {e}")
-        # Return fallback data if config can't be read
-        repositories = []
-        
-        # Debian versions (hardcoded for fallback only)
-        debian_versions = ["7", "8", "9", "10", "11", "12", "13"]
-        for version in debian_versions:
-            repositories.append({
-                "distribution": "Debian",
-                "version": version,
-                "repository": f"http://mirror.example.com/debian-{version}"
-            })
-        
-        # Ubuntu versions (hardcoded for fallback only)
-        ubuntu_versions = ["18.04", "20.04", "22.04", "24.04", "25.04"]
-        for version in ubuntu_versions:
-            repositories.append({
-                "distribution": "Ubuntu",
-                "version": version,
-                "repository": f"http://mirror.example.com/ubuntu-{version}"
-            })
-        
-        # Kali (hardcoded for fallback only)
-        repositories.append({
-            "distribution": "Kali",
-            "version": "kali-rolling",
-            "repository": "http://mirror.example.com/kali-rolling"
-        })
-        
-        # Rocky Linux versions (hardcoded for fallback only)
-        rocky_versions = ["8", "9", "10"]
-        for version in rocky_versions:
-            repositories.append({
-                "distribution": "Rocky",
-                "version": version,
-                "repository": f"http://mirror.example.com/rocky-{version}"
-            })
-        
-        # RHEL versions (hardcoded for fallback only)
-        rhel_versions = ["8", "9", "10"]
-        for version in rhel_versions:
-            repositories.append({
-                "distribution": "RHEL",
-                "version": version,
-                "repository": f"http://mirror.example.com/rhel-{version}"
-            })
-        
-        return repositories
-    
-    repositories = []
-    
-    # Process Debian repositories
-    if 'repositories' in config and 'debian' in config['repositories']:
-        debian_repos = config['repositories']['debian']
-        for repo in debian_repos:
-            if 'url' in repo and 'distributions' in repo:
-                for version in repo['distributions']:
-                    repositories.append({
-                        "distribution": "Debian",
-                        "version": version,
-                        "repository": repo['url']
-                    })
-    
-    # Process Ubuntu repositories
-    if 'repositories' in config and 'ubuntu' in config['repositories']:
-        ubuntu_repos = config['repositories']['ubuntu']
-        for repo in ubuntu_repos:
-            if 'url' in repo and 'distributions' in repo:
-                for version in repo['distributions']:
-                    repositories.append({
-                        "distribution": "Ubuntu",
-                        "version": version,
-                        "repository": repo['url']
-                    })
-    
-    # Process Kali repositories
-    if 'repositories' in config and 'kali' in config['repositories']:
-        kali_repos = config['repositories']['kali']
-        for repo in kali_repos:
-            if 'url' in repo and 'distributions' in repo:
-                for version in repo['distributions']:
-                    repositories.append({
-                        "distribution": "Kali",
-                        "version": version,
-                        "repository": repo['url']
-                    })
-    
-    # Process Rocky Linux repositories
-    if 'repositories' in config and 'rocky' in config['repositories']:
-        rocky_repos = config['repositories']['rocky']
-        for repo in rocky_repos:
-            if 'url' in repo and 'distributions' in repo:
-                for version in repo['distributions']:
-                    repositories.append({
-                        "distribution": "Rocky",
-                        "version": version,
-                        "repository": repo['url']
-                    })
-    
-    # Process RHEL repositories
-    if 'repositories' in config and 'rhel' in config['repositories']:
-        rhel_repos = config['repositories']['rhel']
-        for repo in rhel_repos:
-            if 'url' in repo and 'distributions' in repo:
-                for version in repo['distributions']:
-                    repositories.append({
-                        "distribution": "RHEL",
-                        "version": version,
-                        "repository": repo['url']
-                    })
-    
-    # Add status field and start tests for each repository
-    for repo in repositories:
-        test_key = f"{repo['distribution']}-{repo['version']}"
-
-        if test_key in test_tracker:
-            # Get current status and duration
-            test_info = test_tracker[test_key]
-            repo["status"] = test_info["status"]
-
-            if "duration" in test_info:
-                repo["duration_seconds"] = test_info["duration"]
-            elif test_info["status"] == "running":
-                # Calculate current duration for running tests
-                current_duration = (datetime.now() - test_info["start_time"]).seconds
-                repo["duration_seconds"] = current_duration
-            else:
-                repo["duration_seconds"] = 0
-
-            repo["error_message"] = test_info.get("error_message")
-
-            # Add detailed test results if available
-            if "test_results" in test_info:
-                repo["test_details"] = {
-                    "connectivity": {
-                        "status": test_info["test_results"]["connectivity"]["status"],
-                        "duration": test_info["test_results"]["connectivity"]["duration"],
-                        "error": test_info["test_results"]["connectivity"]["error"]
-                    },
-                    "update": {
-                        "status": test_info["test_results"]["update"]["status"],
-                        "duration": test_info["test_results"]["update"]["duration"],
-                        "error": test_info["test_results"]["update"]["error"]
-                    },
-                    "install": {
-                        "status": test_info["test_results"]["install"]["status"],
-                        "duration": test_info["test_results"]["install"]["duration"],
-                        "error": test_info["test_results"]["install"]["error"]
-                    }
-                }
-            else:
-                repo["test_details"] = None
-        else:
-            # Start a new test asynchronously
-            repo["status"] = "running"
-            repo["duration_seconds"] = 0
-            repo["error_message"] = None
-            # Start the test in the background
-            asyncio.create_task(test_repository_comprehensive(repo['distribution'], repo['version'], repo['repository']))
+    return build_repository_list()
 
-    return repositories
+@router.get("/test/scheduler")
+async def get_scheduler_status():
+    """Get scheduler queue depth, in-flight tests, wait times and upcoming periodic runs"""
+    return {**test_scheduler.stats(), "periodic": periodic_scheduler.stats()}
 
 @router.get("/test/{distro}/{version}")
-async def get_test_result(distro: str, version: str):
-    """Get test result for a specific distro/version"""
-    # This would normally query the database
-    return {"distro": distro, "version": version, "status": "success"}
-
-@router.websocket("/test/ws")
-async def websocket_test_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time test updates"""
-    await websocket.accept()
+async def get_test_result(distro: str, version: str, limit: int = Query(20, ge=1, le=200), cursor: str = None):
+    """Get the run history for a specific distro/version, newest first (cursor paginated)"""
+    distribution = DISTRIBUTION_NAMES.get(distro.lower(), distro)
     try:
-        # Send initial message
-        await websocket.send_text("Connected to test WebSocket")
+        page = await asyncio.to_thread(results_store.history, distribution, version, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    current = test_tracker.get(f"{distribution}-{version}")
+    if current is not None:
+        status = current["status"]
+    elif page["results"]:
+        status = page["results"][0]["status"]
+    else:
+        status = "pending"
+    return {"distro": distribution, "version": version, "status": status, **page}
+
+@router.get("/test/{distro}/{version}/trace")
+async def get_test_trace(distro: str, version: str, format: str = Query("tree", pattern="^(tree|otlp)$")):
+    """Span tree of the target's current or last run (format=otlp for OTLP/JSON)"""
+    distribution = DISTRIBUTION_NAMES.get(distro.lower(), distro)
+    trace = tracer.get(f"{distribution}-{version}")
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"No traced run for {distribution} {version}")
+    return trace.to_otlp() if format == "otlp" else trace.to_dict()
+
+async def cancel_target(test_key: str):
+    """
+    Stop a target's test: drop it from the queue, or cancel its task and
+    force-remove its container right away. Returns what was cancelled.
+    """
+    state = test_scheduler.cancel(test_key)
+    process = active_containers.get(test_key)
+    if process is not None:
+        try:
+            if process.remove:
+                await docker_client.remove_container(process.container_id, force=True)
+            else:
+                # Exec session in a pooled container: the container is single-use anyway
+                await docker_client.kill_container(process.container_id)
+        except Exception as e:
+            logger.warning(f"Error stopping container for {test_key}: {e}")
+    if state == "queued":
+        publish_target(test_key)
+    return state
+
+@router.get("/test/{distro}/{version}/completeness")
+async def get_completeness_report(distro: str, version: str):
+    """
+    Full diff of the target's last completeness check as tab-separated lines:
+    kind (missing/stale/extra), name, arch, upstream versions, mirror versions
+    """
+    distribution = DISTRIBUTION_NAMES.get(distro.lower(), distro)
+    path = completeness_checker.report_path(f"{distribution}-{version}")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"No completeness report for {distribution} {version}")
+    return FileResponse(path, media_type="text/tab-separated-values")
+
+@router.post("/test/{distro}/{version}/cancel")
+async def cancel_test(distro: str, version: str):
+    """Cancel a queued or running test and remove its container"""
+    test_key = f"{DISTRIBUTION_NAMES.get(distro.lower(), distro)}-{version}"
+    state = await cancel_target(test_key)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"No queued or running test for {test_key}")
+    return {"key": test_key, "cancelled": state}
+
+@router.get("/test/{distro}/{version}/logs")
+async def stream_test_logs(distro: str, version: str, phase: str = None):
+    """
+    Server-Sent Events stream of a target's container output: the buffered
+    lines of the current run, then live lines ("line", "start", "end" events)
+    """
+    test_key = f"{DISTRIBUTION_NAMES.get(distro.lower(), distro)}-{version}"
+    if config_store.get().get(test_key) is None:
+        raise HTTPException(status_code=404, detail=f"No configured target {test_key}")
+
+    async def events():
+        async for event in log_streamer.follow(test_key, phase):
+            yield f"data: {event}\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/test/{distro}/{version}/logs")
+async def websocket_test_logs(websocket: WebSocket, distro: str, version: str, phase: str = None):
+    """WebSocket variant of the log stream"""
+    test_key = f"{DISTRIBUTION_NAMES.get(distro.lower(), distro)}-{version}"
+    if config_store.get().get(test_key) is None:
+        # Refused before accept(), so the handshake fails with a 403
+        await websocket.close(code=1008, reason=f"No configured target {test_key}")
+        return
+    await websocket.accept()
 
-        # Send initial repository data
-        repositories = await get_test_list()
-        import json
-        await websocket.send_text(json.dumps(repositories))
+    async def send():
+        async for event in log_streamer.follow(test_key, phase):
+            await websocket.send_text(event)
 
-        # Send periodic updates with real-time durations
+    async def receive():
+        # Only here to notice the client going away while the run is quiet
         while True:
-            try:
-                # Check if client sent any message (non-blocking)
-                try:
-                    message = await asyncio.wait_for(websocket.receive_text(), timeout=0.1)
-                    if message == "get_status":
-                        # Client is requesting status update
-                        repositories = await get_test_list()
-                        await websocket.send_text(json.dumps(repositories))
-                except asyncio.TimeoutError:
-                    # No message received, continue with periodic updates
-                    pass
+            await websocket.receive_text()
 
-                # Send periodic updates every 2 seconds
-                await asyncio.sleep(2)
-                repositories = await get_test_list()
-                await websocket.send_text(json.dumps(repositories))
-
-            except Exception as e2:
-                print(f"Error in WebSocket loop: {e2}")
-                break
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+@router.get("/test/stream")
+async def stream_test_events(since: int = None, epoch: str = None, last_event_id: str = Header(None)):
+    """
+    Server-Sent Events variant of /test/ws for proxies that break WebSockets.
+    Resumes from Last-Event-ID on browser reconnects, or from since/epoch.
+    """
+    if last_event_id:
+        epoch, since = parse_last_event_id(last_event_id)
+    return StreamingResponse(
+        stream_events(event_hub, since, epoch),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    except Exception as e:
-        print(f"WebSocket error in test endpoint: {e}")
+@router.websocket("/test/ws")
+async def websocket_test_endpoint(websocket: WebSocket, since: int = None, epoch: str = None):
+    """
+    WebSocket endpoint for real-time test updates. Clients pass the last
+    "seq"/"epoch" they saw to get only the deltas they missed; new or too
+    far behind clients get a snapshot first. Every message carries "seq".
+    """
+    await websocket.accept()
+    await serve_websocket(websocket, event_hub, since, epoch)
@@ -2,8 +2,12 @@
 
 from fastapi import APIRouter
 from .endpoints.test import router as test_router
+from .endpoints.jobs import router as jobs_router
+from .endpoints.packages import router as packages_router
 
 router = APIRouter()
 
 # Include the test router with proper prefix and tags
 router.include_router(test_router, prefix="/test", tags=["test"])
+router.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
+router.include_router(packages_router, prefix="/packages", tags=["packages"])
@@ -21,20 +21,78 @@ class Settings(BaseSettings):
     database_port: int = 5432
     database_username: str = "test_user"
     database_password: str = "test_password"
+    # Background writer commits queued results in batches
+    database_batch_size: int = 50
+    database_flush_interval_seconds: float = 0.5
     
     # Test settings
     test_interval_minutes: int = 60
+    # Random +/- offset added to each periodic run (capped at a quarter interval)
+    test_interval_jitter_seconds: int = 30
     test_timeout_seconds: int = 300
+    # Per-operation timeouts (overridable by test.default_timeout_seconds / test.timeouts)
+    test_default_timeout_seconds: int = 30
+    test_update_timeout_seconds: int = 120
+    test_install_timeout_seconds: int = 180
     max_concurrent_tests: int = 5
+    max_concurrent_per_host: int = 3
+    # Verify Release/Packages metadata from the backend before container phases
+    metadata_verification_enabled: bool = True
+    metadata_timeout_seconds: int = 300
+    # Skip container phases when metadata, image and script are unchanged
+    skip_unchanged_enabled: bool = True
+    unchanged_max_age_hours: int = 24
+    # Container output kept per target/phase (overridable by test.logs)
+    log_buffer_lines: int = 2000
+    log_persist_enabled: bool = False
+    log_directory: str = "./logs"
+    log_listener_queue_size: int = 1024
+    # Finished run traces appended as JSON lines (overridable by test.tracing)
+    trace_export_enabled: bool = False
+    trace_export_file: str = "./logs/traces.jsonl"
+    trace_export_format: str = "otlp"
+    # Package versions per target from the metadata phase (overridable by test.package_index)
+    package_index_enabled: bool = True
+    package_index_path: str = "./package_index.bin"
+    # Diff mirror metadata against offline upstream snapshots (overridable by test.completeness)
+    completeness_enabled: bool = False
+    completeness_snapshot_dir: str = "./snapshots"
+    completeness_report_dir: str = "./logs/completeness"
+    completeness_workers: int = 1
+    # Rows sorted in memory at a time; larger indices are merged from sorted runs on disk
+    completeness_sort_chunk_rows: int = 50000
+    completeness_sample_size: int = 20
+    # Run update and install in one container (overridable by test.combined_pipeline)
+    combined_container_pipeline: bool = True
     
+    # Mirror HTTP client settings
+    http_connection_limit: int = 100
+    http_connection_limit_per_host: int = 8
+
     # Container settings
     container_memory_mb: int = 1024
     container_cpu_cores: float = 1.0
+    # Docker Engine API (DOCKER_HOST selects tcp:// or unix://)
+    docker_api_version: str = "v1.41"
+    docker_api_connection_limit: int = 32
+    # Warm container pool (overridable by container.pool in config.yaml)
+    container_pool_enabled: bool = False
+    container_pool_size: int = 2
+    container_pool_idle_ttl_seconds: int = 900
+    container_pool_health_interval_seconds: int = 60
+    # Labeled test containers older than test_timeout_seconds + grace are removed
+    container_reaper_interval_seconds: int = 60
+    container_reaper_grace_seconds: int = 60
     
     # Frontend settings
     frontend_refresh_interval_seconds: int = 5
     frontend_show_history: bool = True
     frontend_default_timeout: int = 300
+    # Dashboard stream: messages buffered per client before it is resynced with a snapshot
+    websocket_queue_size: int = 256
+    # Deltas kept for replay to reconnecting clients; older clients get a snapshot
+    event_log_size: int = 1000
+    stream_retry_ms: int = 3000
     
     # Notification settings
     email_notifications_enabled: bool = False
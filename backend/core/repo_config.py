@@ -0,0 +1,213 @@
+# Linux Mirror Testing Solution - Compiled Repository Configuration
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Display names used in the API and as the prefix of test_tracker keys
+DISTRIBUTION_NAMES = {
+    "debian": "Debian",
+    "ubuntu": "Ubuntu",
+    "kali": "Kali",
+    "rocky": "Rocky",
+    "rhel": "RHEL",
+}
+
+APT_FAMILIES = ("debian", "ubuntu", "kali")
+
+# Repository sections and architectures verified when a repository entry does not list its own
+DEFAULT_COMPONENTS = {"apt": ("main",), "rpm": ("BaseOS",)}
+DEFAULT_ARCHITECTURES = {"apt": ("amd64",), "rpm": ("x86_64",)}
+
+# Package names are written into container shell scripts, so only plain names are accepted
+PACKAGE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9+._-]*$")
+
+# Used when config.yaml cannot be read at all (hardcoded for fallback only)
+FALLBACK_REPOSITORIES = {
+    "debian": [{"url": "http://mirror.example.com/debian", "distributions": ["7", "8", "9", "10", "11", "12", "13"]}],
+    "ubuntu": [{"url": "http://mirror.example.com/ubuntu", "distributions": ["18.04", "20.04", "22.04", "24.04", "25.04"]}],
+    "kali": [{"url": "http://mirror.example.com/kali", "distributions": ["kali-rolling"]}],
+    "rocky": [{"url": "http://mirror.example.com/rocky", "distributions": ["8", "9", "10"]}],
+    "rhel": [{"url": "http://mirror.example.com/rhel", "distributions": ["8", "9", "10"]}],
+}
+
+
+class ConfigError(ValueError):
+    """Raised when config.yaml does not describe a valid target matrix"""
+
+
+@dataclass(frozen=True)
+class Target:
+    """A single distribution/version/repository combination to test"""
+    family: str        # config key, e.g. "debian"
+    distribution: str  # display name, e.g. "Debian"
+    version: str
+    repository: str
+    components: Tuple[str, ...] = ()
+    architectures: Tuple[str, ...] = ()
+    packages: Tuple[str, ...] = ()            # installed by the install phase (default per distribution)
+    interval_minutes: Optional[float] = None  # overrides test.interval_minutes
+
+    @property
+    def package_format(self) -> str:
+        return "apt" if self.family in APT_FAMILIES else "rpm"
+
+    @property
+    def key(self) -> str:
+        return f"{self.distribution}-{self.version}"
+
+
+@dataclass(frozen=True)
+class CompiledConfig:
+    """Immutable, validated view of config.yaml"""
+    raw: Mapping[str, Any]
+    targets: Tuple[Target, ...]
+    by_key: Mapping[str, Target]
+    mtime: float = 0.0
+    fallback: bool = False
+
+    def get(self, key: str) -> Optional[Target]:
+        return self.by_key.get(key)
+
+    def section(self, name: str) -> Mapping[str, Any]:
+        value = self.raw.get(name)
+        return value if isinstance(value, Mapping) else MappingProxyType({})
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def compile_config(raw: Optional[Dict[str, Any]], mtime: float = 0.0, fallback: bool = False) -> CompiledConfig:
+    """
+    Validate the parsed YAML and build the target matrix.
+    Repository entries with ``enabled: false`` are skipped.
+    """
+    raw = raw or {}
+    if not isinstance(raw, dict):
+        raise ConfigError("Top level of config.yaml must be a mapping")
+
+    repositories = raw.get("repositories") or {}
+    if not isinstance(repositories, dict):
+        raise ConfigError("'repositories' must be a mapping of distribution to repository list")
+
+    targets = []
+    by_key: Dict[str, Target] = {}
+    for family, repos in repositories.items():
+        family = str(family).lower()
+        display = DISTRIBUTION_NAMES.get(family, family.title())
+        if not isinstance(repos, list):
+            raise ConfigError(f"repositories.{family} must be a list")
+
+        for index, repo in enumerate(repos):
+            if not isinstance(repo, dict):
+                raise ConfigError(f"repositories.{family}[{index}] must be a mapping")
+            if not repo.get("enabled", True):
+                continue
+            url = repo.get("url")
+            versions = repo.get("distributions")
+            if not url or not isinstance(versions, list):
+                raise ConfigError(f"repositories.{family}[{index}] needs 'url' and a 'distributions' list")
+
+            package_format = "apt" if family in APT_FAMILIES else "rpm"
+            components = tuple(str(c) for c in repo.get("components") or DEFAULT_COMPONENTS[package_format])
+            architectures = tuple(str(a) for a in repo.get("architectures") or DEFAULT_ARCHITECTURES[package_format])
+            packages = tuple(str(p) for p in repo.get("packages") or ())
+            invalid = [package for package in packages if not PACKAGE_NAME.match(package)]
+            if invalid:
+                raise ConfigError(f"repositories.{family}[{index}].packages has invalid package names: {', '.join(invalid)}")
+            interval = repo.get("interval_minutes")
+            if interval is not None:
+                try:
+                    interval = float(interval)
+                except (TypeError, ValueError):
+                    raise ConfigError(f"repositories.{family}[{index}].interval_minutes must be a number")
+
+            for version in versions:
+                target = Target(
+                    family=family, distribution=display, version=str(version), repository=str(url),
+                    components=components, architectures=architectures, packages=packages, interval_minutes=interval
+                )
+                if target.key in by_key:
+                    logger.warning(f"Duplicate target {target.key} in config, keeping {by_key[target.key].repository}")
+                    continue
+                by_key[target.key] = target
+                targets.append(target)
+
+    return CompiledConfig(
+        raw=_freeze(raw),
+        targets=tuple(targets),
+        by_key=MappingProxyType(by_key),
+        mtime=mtime,
+        fallback=fallback,
+    )
+
+
+class ConfigStore:
+    """
+    Holds the compiled config and swaps it atomically when config.yaml changes.
+    The file is stat()ed at most once per ``check_interval`` seconds.
+    """
+
+    def __init__(self, path: str = "config.yaml", check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._compiled: Optional[CompiledConfig] = None
+        self._signature = None
+        self._last_check = 0.0
+
+    def get(self) -> CompiledConfig:
+        now = time.monotonic()
+        if self._compiled is None or now - self._last_check >= self.check_interval:
+            self._refresh(now)
+        return self._compiled
+
+    def _refresh(self, now: float):
+        with self._lock:
+            if self._compiled is not None and now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            try:
+                stat = os.stat(self.path)
+            except OSError as e:
+                if self._compiled is None:
+                    print(f"Error reading config file: {e}")
+                    self._compiled = compile_config({"repositories": FALLBACK_REPOSITORIES}, fallback=True)
+                return
+
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if signature == self._signature:
+                return
+
+            try:
+                with open(self.path, "r") as file:
+                    compiled = compile_config(yaml.safe_load(file), mtime=stat.st_mtime)
+            except (OSError, yaml.YAMLError, ConfigError) as e:
+                print(f"Error reading config file: {e}")
+                if self._compiled is None:
+                    self._compiled = compile_config({"repositories": FALLBACK_REPOSITORIES}, fallback=True)
+                # Keep serving the previous good config; retry when the file changes again
+                self._signature = signature
+                return
+
+            self._signature = signature
+            self._compiled = compiled
+            logger.info(f"Loaded {len(compiled.targets)} test targets from {self.path}")
+
+
+# Global config store instance
+config_store = ConfigStore()
@@ -1,12 +1,55 @@
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from api.router import router as api_router
+from api.endpoints.test import get_base_image, test_tracker, websocket_test_endpoint
 from core.config import settings
+from core.repo_config import config_store
+from services.scheduler import test_scheduler, periodic_scheduler
+from services.container_pool import container_pool
+from services.container_reaper import container_reaper
+from services.docker_client import docker_client
+from services.http_client import http_client
+from services.results_store import results_store
+from services.fingerprint_cache import fingerprint_cache
+from services.event_hub import event_hub
+from services.package_index import package_index
+from services.completeness import completeness_checker
+from services import metrics
+from contextlib import asynccontextmanager
 import asyncio
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Restore the last result per target so the dashboard and priorities survive restarts
+    results_store.start()
+    test_tracker.update(await asyncio.to_thread(results_store.latest))
+    fingerprint_cache.load(await asyncio.to_thread(results_store.fingerprints))
+    # Package lookups are served from the saved index until the next metadata runs
+    await package_index.start()
+    # Warm the images the configured targets use; untested targets run right
+    # away, the rest at their staggered slot in the interval
+    targets = config_store.get().targets
+    metrics.prepare_targets(targets)
+    container_pool.start({get_base_image(t.family, t.version) for t in targets})
+    test_scheduler.start()
+    periodic_scheduler.start()
+    container_reaper.start()
+    yield
+    await container_reaper.stop()
+    await periodic_scheduler.stop()
+    await test_scheduler.stop()
+    await container_pool.stop()
+    await docker_client.close()
+    await http_client.close()
+    await package_index.stop()
+    completeness_checker.stop()
+    await asyncio.to_thread(results_store.stop)
+
 app = FastAPI(
     title=settings.app_name,
-    openapi_url=f"{settings.api_v1_str}/openapi.json"
+    openapi_url=f"{settings.api_v1_str}/openapi.json",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -25,6 +68,16 @@ app.include_router(api_router, prefix=settings.api_v1_str)
 async def root():
     return {"message": "Linux Mirror Testing API"}
 
+# Gauges are read when scraped, so they cost nothing between scrapes
+metrics.queue_depth.set_function(lambda: test_scheduler.queue_depth)
+metrics.in_flight.set_function(lambda: test_scheduler.in_flight)
+metrics.stream_subscribers.set_function(lambda: event_hub.subscriber_count)
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of the test pipeline metrics"""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 # Keep the original WebSocket endpoint for backward compatibility (if needed)
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -38,39 +91,9 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         print(f"WebSocket error: {e}")
 
-# Test-specific WebSocket endpoint (this was causing the issue)
-@app.websocket("/test/ws")
-async def test_websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    try:
-        # Send initial message
-        await websocket.send_text("Connected to test WebSocket")
-        while True:
-            # In a real implementation, this would receive messages from test runner
-            # and broadcast updates to connected clients
-            try:
-                data = await websocket.receive_text()
-                # Echo the received message back to client
-                await websocket.send_text(f"Echo: {data}")
-            except asyncio.CancelledError:
-                # Clean shutdown
-                break
-            except Exception as e2:
-                # Check if WebSocket is still connected
-                if "disconnect" in str(e2).lower() or "close" in str(e2).lower():
-                    print(f"WebSocket disconnected normally")
-                    break
-                else:
-                    print(f"Error receiving from WebSocket: {e2}")
-                    await asyncio.sleep(1)
-    except Exception as e:
-        print(f"WebSocket error in test endpoint: {e}")
-    finally:
-        # Ensure proper cleanup
-        try:
-            await websocket.close()
-        except:
-            pass
+# Test-specific WebSocket endpoint at the path the frontend proxy forwards to;
+# serves the same resumable stream as /api/v1/test/test/ws
+app.add_api_websocket_route("/test/ws", websocket_test_endpoint)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,7 +1,7 @@
 # Linux Mirror Testing Solution - Test Models
 
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 class TestRequest(BaseModel):
@@ -13,6 +13,17 @@ class TestRequest(BaseModel):
     timeout_seconds: Optional[int] = None
     parallel: bool = True
 
+class PackageCheckRequest(TestRequest):
+    """
+    Request model for batched package checks. Targets are selected like a
+    TestRequest; packages come from ``target_packages`` (keyed by target
+    such as "Rocky-9" or family such as "rocky"), then ``packages``, then
+    the target's install test packages.
+    """
+    packages: List[str] = []
+    target_packages: Dict[str, List[str]] = {}
+    install: bool = False
+
 class TestResult(BaseModel):
     """
     Result model for individual test
@@ -23,7 +34,7 @@ class TestResult(BaseModel):
     status: str  # "success", "failure", "running"
     start_time: datetime
     end_time: Optional[datetime] = None
-    duration_seconds: Optional[int] = None
+    duration_seconds: Optional[float] = None
     error_message: Optional[str] = None
     package_count: Optional[int] = None
     test_details: Optional[dict] = None
@@ -0,0 +1,175 @@
+# Linux Mirror Testing Solution - APT Metadata Verification
+
+import hashlib
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from core.config import settings
+from services.http_client import http_client
+from services.metadata import MetadataError, MetadataReport, StreamingVerifier, index_copy_path, stream_verify
+
+logger = logging.getLogger(__name__)
+
+# Preferred index compression, best first
+INDEX_SUFFIXES = [".xz", ".gz", ""]
+
+# Stanza fields read from Packages indices
+STANZA_FIELD = re.compile(rb"^(Package|Version|Architecture):[ \t]*(\S+)", re.M)
+
+
+def strip_clearsign(text: str) -> str:
+    """Return the signed body of an InRelease file (or the text unchanged)"""
+    if not text.startswith("-----BEGIN PGP SIGNED MESSAGE-----"):
+        return text
+    body = text.split("\n\n", 1)[1] if "\n\n" in text else ""
+    body = body.split("-----BEGIN PGP SIGNATURE-----", 1)[0]
+    # Undo dash-escaping
+    return "\n".join(line[2:] if line.startswith("- ") else line for line in body.splitlines())
+
+
+def parse_release(text: str) -> Tuple[Dict[str, str], Dict[str, Tuple[str, int]]]:
+    """
+    Parse a Release file into (fields, sha256_table) where sha256_table maps
+    a path such as "main/binary-amd64/Packages.xz" to (digest, size).
+    """
+    fields: Dict[str, str] = {}
+    checksums: Dict[str, Tuple[str, int]] = {}
+    current = None
+    for line in strip_clearsign(text).splitlines():
+        if not line.strip():
+            continue
+        if line[0] in " \t":
+            if current == "SHA256":
+                parts = line.split()
+                if len(parts) == 3:
+                    checksums[parts[2]] = (parts[0].lower(), int(parts[1]))
+            continue
+        name, _, value = line.partition(":")
+        current = name.strip()
+        fields[current] = value.strip()
+    return fields, checksums
+
+
+class StreamingIndexVerifier(StreamingVerifier):
+    """
+    Verifies a Packages index while counting its stanzas; with ``collect``
+    also records (name, version, arch) of each one in ``packages``.
+    """
+
+    def __init__(self, path: str, expected_sha256: str, expected_size: int, collect: bool = False):
+        super().__init__(path, expected_sha256, expected_size)
+        self.package_count = 0
+        self.packages: Optional[List[Tuple[str, str, str]]] = [] if collect else None
+        self._tail = b""
+
+    def consume(self, data: bytes):
+        data = self._tail + data
+        # Only parse complete stanzas; the rest waits for the next chunk
+        end = data.rfind(b"\n\n")
+        if end < 0:
+            self._tail = data
+            return
+        self._tail = data[end + 2:]
+        self._parse(data[:end + 1])
+
+    def _parse(self, data: bytes):
+        if self.packages is None:
+            self.package_count += len(re.findall(rb"^Package:", data, re.M))
+            return
+        stanza = None
+        for field, value in STANZA_FIELD.findall(data):
+            if field == b"Package":
+                self._add(stanza)
+                self.package_count += 1
+                stanza = [value.decode(errors="replace"), None, "all"]
+            elif stanza is not None:
+                stanza[1 if field == b"Version" else 2] = value.decode(errors="replace")
+        self._add(stanza)
+
+    def _add(self, stanza):
+        if stanza is not None and stanza[1] is not None:
+            self.packages.append(tuple(stanza))
+
+    def close(self):
+        self._parse(self._tail)
+        self._tail = b""
+
+
+def select_index(checksums: Dict[str, Tuple[str, int]], component: str, arch: str) -> Optional[str]:
+    base = f"{component}/binary-{arch}/Packages"
+    for suffix in INDEX_SUFFIXES:
+        if base + suffix in checksums:
+            return base + suffix
+    return None
+
+
+async def fetch_release(dists_url: str, timeout: float) -> Tuple[str, bytes]:
+    """Fetch InRelease, falling back to Release; returns (url, raw bytes)"""
+    last_status = None
+    for name in ("InRelease", "Release"):
+        url = f"{dists_url}/{name}"
+        async with http_client.session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status == 200:
+                return url, await response.read()
+            last_status = response.status
+    raise MetadataError(f"No InRelease or Release file under {dists_url} (HTTP {last_status})")
+
+
+def dists_url_for(repository_url: str, codename: str) -> str:
+    return f"{repository_url.rstrip('/')}/dists/{codename}"
+
+
+async def verify_apt_repository(repository_url: str, codename: str,
+                                components: Iterable[str] = ("main",),
+                                architectures: Iterable[str] = ("amd64",),
+                                timeout: Optional[float] = None,
+                                collect_packages: bool = False,
+                                keep_indices: Optional[str] = None,
+                                release: Optional[Tuple[str, bytes]] = None) -> MetadataReport:
+    """
+    Verify dists/<codename> on the mirror: the Release file lists the
+    configured components, and each Packages index for them exists and
+    matches its SHA256 and size. Raises MetadataError on the first problem.
+    ``collect_packages`` fills report.packages for the package index;
+    ``keep_indices`` is a directory to keep copies of the indices in;
+    ``release`` is the (url, data) of a Release file the caller already fetched.
+    """
+    timeout = timeout or settings.metadata_timeout_seconds
+    dists_url = dists_url_for(repository_url, codename)
+    report = MetadataReport()
+    if collect_packages:
+        report.packages = []
+
+    release_url, release_data = release or await fetch_release(dists_url, timeout)
+    report.release_sha256 = hashlib.sha256(release_data).hexdigest()
+    fields, checksums = parse_release(release_data.decode("utf-8", errors="replace"))
+    if not checksums:
+        raise MetadataError(f"{release_url} has no SHA256 section")
+
+    available_components = fields.get("Components", "").split()
+    report.architectures = fields.get("Architectures", "").split()
+    for component in components:
+        # Components may be listed with a prefix, e.g. "updates/main"
+        if available_components and component not in available_components and \
+                not any(c.endswith(f"/{component}") for c in available_components):
+            raise MetadataError(f"Component '{component}' not in Release ({' '.join(available_components)})")
+
+        for arch in architectures:
+            path = select_index(checksums, component, arch)
+            if path is None:
+                raise MetadataError(f"No Packages index for {component}/{arch} in Release")
+            digest, size = checksums[path]
+            verifier = StreamingIndexVerifier(path, digest, size, collect=collect_packages)
+            copy_path = index_copy_path(keep_indices, path) if keep_indices else None
+            if copy_path:
+                report.index_copies.append(copy_path)
+            report.bytes_downloaded += await stream_verify(f"{dists_url}/{path}", verifier, timeout, copy_to=copy_path)
+            report.package_count += verifier.package_count
+            if collect_packages:
+                report.packages.extend(verifier.packages)
+            report.indices.append({"path": path, "size": size, "packages": verifier.package_count})
+
+    return report
@@ -0,0 +1,253 @@
+# Linux Mirror Testing Solution - Mirror Completeness Diff
+
+import asyncio
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.config import settings
+from core.repo_config import config_store
+from services.apt_metadata import StreamingIndexVerifier
+from services.metadata import CHUNK_SIZE
+from services.rpm_metadata import PrimaryXmlVerifier
+
+logger = logging.getLogger(__name__)
+
+# Packages variants read from a snapshot directory, first found wins
+PACKAGES_SUFFIXES = (".xz", ".gz", ".bz2", ".zst", "")
+DIFF_KINDS = ("missing", "stale", "extra")
+
+Key = Tuple[str, str]  # (name, arch)
+
+
+def find_snapshot_indices(directory: str) -> List[str]:
+    """Packages and primary.xml files under ``directory``, one Packages variant per directory"""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for suffix in PACKAGES_SUFFIXES:
+            if f"Packages{suffix}" in files:
+                found.append(os.path.join(root, f"Packages{suffix}"))
+                break
+        found.extend(os.path.join(root, name) for name in sorted(files) if "primary.xml" in name)
+    return found
+
+
+class SortedRuns:
+    """
+    Collects (name, version, arch) rows and iterates them sorted by
+    (name, arch, version) with at most ``chunk_rows`` in memory: full chunks
+    are sorted and spilled to files in ``directory``, then merged.
+    """
+
+    def __init__(self, directory: str, chunk_rows: int):
+        self.directory = directory
+        self.chunk_rows = max(1, chunk_rows)
+        self.rows: List[Tuple[str, str, str]] = []
+        self.runs: List[str] = []
+
+    def append(self, row: Tuple[str, str, str]):
+        name, version, arch = row
+        self.rows.append((name, arch, version))
+        if len(self.rows) >= self.chunk_rows:
+            self._spill()
+
+    def _spill(self):
+        self.rows.sort()
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix=".run")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.writelines(f"{name}\t{arch}\t{version}\n" for name, arch, version in self.rows)
+        self.runs.append(path)
+        self.rows = []
+
+    def _read(self, path: str) -> Iterator[Tuple[str, ...]]:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                yield tuple(line.rstrip("\n").split("\t"))
+
+    def __iter__(self) -> Iterator[Tuple[str, ...]]:
+        self.rows.sort()
+        if not self.runs:
+            return iter(self.rows)
+        return heapq.merge(*(self._read(path) for path in self.runs), self.rows)
+
+
+def read_index(path: str, rows: SortedRuns) -> int:
+    """Stream a Packages or primary.xml file (any compression) into ``rows``"""
+    if "primary.xml" in os.path.basename(path):
+        verifier = PrimaryXmlVerifier(path, None, None, "sha256", collect=True)
+    else:
+        verifier = StreamingIndexVerifier(path, None, None, collect=True)
+    # Rows go straight to the sorter instead of a list
+    verifier.packages = rows
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            verifier.feed(chunk)
+    verifier.finish()
+    return verifier.package_count
+
+
+def grouped(rows: Iterable[Tuple[str, ...]]) -> Iterator[Tuple[Key, List[str]]]:
+    """((name, arch), versions) from rows sorted by (name, arch, version)"""
+    for key, group in itertools.groupby(rows, key=lambda row: (row[0], row[1])):
+        yield key, sorted({row[2] for row in group})
+
+
+def merge_diff(upstream: Iterable[Tuple[Key, List[str]]], mirror: Iterable[Tuple[Key, List[str]]]):
+    """
+    Sorted merge of two grouped streams. Yields (kind, key, upstream versions,
+    mirror versions) for every key; kind is "missing" (not on the mirror),
+    "extra" (not upstream), "stale" (the mirror lacks an upstream version)
+    or None when the mirror has every upstream version.
+    """
+    upstream, mirror = iter(upstream), iter(mirror)
+    wanted, present = next(upstream, None), next(mirror, None)
+    while wanted is not None or present is not None:
+        if present is None or (wanted is not None and wanted[0] < present[0]):
+            yield "missing", wanted[0], wanted[1], []
+            wanted = next(upstream, None)
+        elif wanted is None or present[0] < wanted[0]:
+            yield "extra", present[0], [], present[1]
+            present = next(mirror, None)
+        else:
+            kind = "stale" if set(wanted[1]) - set(present[1]) else None
+            yield kind, wanted[0], wanted[1], present[1]
+            wanted, present = next(upstream, None), next(mirror, None)
+
+
+def diff_target(snapshot_dir: str, mirror_files: List[str], output_path: str,
+                chunk_rows: int, sample_size: int) -> Dict[str, Any]:
+    """
+    Diff a target's mirror indices against its upstream snapshot (runs in a
+    worker process). Every difference is written to ``output_path`` as
+    tab-separated kind, name, arch, upstream versions, mirror versions;
+    returns the counts and a few examples of each kind.
+    """
+    started = time.monotonic()
+    snapshot_files = find_snapshot_indices(snapshot_dir)
+    if not snapshot_files:
+        raise FileNotFoundError(f"No Packages or primary.xml files under {snapshot_dir}")
+
+    workdir = tempfile.mkdtemp(prefix="sort-", dir=os.path.dirname(output_path) or None)
+    try:
+        upstream, mirror = SortedRuns(workdir, chunk_rows), SortedRuns(workdir, chunk_rows)
+        for path in snapshot_files:
+            read_index(path, upstream)
+        for path in mirror_files:
+            read_index(path, mirror)
+
+        counts = {"upstream": 0, "mirror": 0, **{kind: 0 for kind in DIFF_KINDS}}
+        samples: Dict[str, List[str]] = {kind: [] for kind in DIFF_KINDS}
+        temporary = f"{output_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as output:
+            for kind, (name, arch), wanted, present in merge_diff(grouped(upstream), grouped(mirror)):
+                counts["upstream"] += bool(wanted)
+                counts["mirror"] += bool(present)
+                if kind is None:
+                    continue
+                counts[kind] += 1
+                if len(samples[kind]) < sample_size:
+                    samples[kind].append(f"{name}/{arch}")
+                output.write(f"{kind}\t{name}\t{arch}\t{' '.join(wanted)}\t{' '.join(present)}\n")
+        os.replace(temporary, output_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        **counts,
+        "samples": samples,
+        "snapshot_files": len(snapshot_files),
+        "report": output_path,
+        "duration": round(time.monotonic() - started, 3),
+    }
+
+
+class CompletenessChecker:
+    """
+    Diffs each target's mirror metadata against an upstream snapshot copied
+    in offline (snapshot_dir/<Distribution-version>/). The metadata phase
+    keeps copies of the indices it downloads; both sides are streamed,
+    sorted in bounded chunks and merged in a pool of worker processes.
+    Options come from config.yaml test.completeness.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_workers = 0
+
+    @property
+    def options(self):
+        return config_store.get().section("test").get("completeness", {})
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.options.get("enabled", settings.completeness_enabled))
+
+    @property
+    def snapshot_dir(self) -> str:
+        return self.options.get("snapshot_dir", settings.completeness_snapshot_dir)
+
+    @property
+    def report_dir(self) -> str:
+        return self.options.get("report_dir", settings.completeness_report_dir)
+
+    @property
+    def workers(self) -> int:
+        return max(1, int(self.options.get("workers", settings.completeness_workers)))
+
+    def report_path(self, key: str) -> str:
+        return os.path.join(self.report_dir, f"{key}.tsv")
+
+    def workdir(self, key: str) -> Optional[str]:
+        """A temporary directory for the target's index copies; None if it has no snapshot"""
+        if not self.enabled or not os.path.isdir(os.path.join(self.snapshot_dir, key)):
+            return None
+        return tempfile.mkdtemp(prefix=f"completeness-{key}-")
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None or self._pool_workers != self.workers:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            # spawn: a forked child would inherit the event loop's threads and locks
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            self._pool_workers = self.workers
+        return self._pool
+
+    async def check(self, key: str, mirror_files: List[str]) -> Dict[str, Any]:
+        """Summary of the diff between ``mirror_files`` and the target's snapshot ({"error"} on failure)"""
+        output_path = self.report_path(key)
+        try:
+            os.makedirs(self.report_dir, exist_ok=True)
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor(), diff_target,
+                os.path.join(self.snapshot_dir, key), mirror_files, output_path,
+                int(self.options.get("sort_chunk_rows", settings.completeness_sort_chunk_rows)),
+                int(self.options.get("sample_size", settings.completeness_sample_size)),
+            )
+        except BrokenProcessPool as e:
+            self._pool = None
+            logger.error(f"Completeness worker for {key} died: {e}")
+            return {"error": f"Worker process died: {e}"}
+        except Exception as e:
+            logger.warning(f"Completeness diff for {key} failed: {e}")
+            return {"error": str(e)}
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global completeness checker instance
+completeness_checker = CompletenessChecker()
@@ -0,0 +1,213 @@
+# Linux Mirror Testing Solution - Warm Container Pool
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set
+
+from core.config import settings
+from core.repo_config import config_store
+from services.docker_client import docker_client, CONTAINER_PATH
+
+logger = logging.getLogger(__name__)
+
+POOL_LABEL = "mirror-test.pool"
+
+
+class WarmContainer:
+    """An idle, already-started container waiting for a test"""
+
+    def __init__(self, container_id: str, image: str):
+        self.id = container_id
+        self.image = image
+        self.created_at = time.monotonic()
+
+
+class ContainerPool:
+    """
+    Keeps a few idle containers per base image so tests can exec into an
+    already-running container instead of paying for create + start.
+
+    Containers are single-use: a leased container is removed after the test
+    and a fresh one is started in the background, so every test still gets a
+    clean overlay filesystem. Idle containers older than the TTL are recycled
+    and dead ones are dropped by a periodic health check. Pool containers
+    left behind by a previous backend process are removed on start.
+    """
+
+    def __init__(self):
+        self._idle: Dict[str, Deque[WarmContainer]] = {}
+        self._warming: Dict[str, int] = {}
+        self._images: Set[str] = set()
+        self._last_used: Dict[str, float] = {}
+        self._maintenance: Optional[asyncio.Task] = None
+        self._background = set()
+        self._swept = False  # stale containers removed; warming may begin
+
+    def _option(self, name: str, default):
+        pool_config = config_store.get().section("container").get("pool") or {}
+        return pool_config.get(name, default)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._option("enabled", settings.container_pool_enabled))
+
+    @property
+    def size_per_image(self) -> int:
+        return max(0, int(self._option("size_per_image", settings.container_pool_size)))
+
+    @property
+    def idle_ttl(self) -> float:
+        return float(self._option("idle_ttl_seconds", settings.container_pool_idle_ttl_seconds))
+
+    @property
+    def health_interval(self) -> float:
+        return float(self._option("health_check_interval_seconds", settings.container_pool_health_interval_seconds))
+
+    def start(self, images: Iterable[str] = ()):
+        """Remove stale pool containers, then start warming the given images and the maintenance loop"""
+        if self._maintenance is None or self._maintenance.done():
+            self._maintenance = asyncio.create_task(self._maintenance_loop(set(images)))
+
+    async def remove_stale(self) -> int:
+        """Remove pool containers this process does not own (left by a crash); returns how many"""
+        owned = {c.id for idle in self._idle.values() for c in idle}
+        removed = 0
+        for container in await docker_client.list_containers(labels=[POOL_LABEL]):
+            if container["Id"] in owned:
+                continue
+            try:
+                await docker_client.remove_container(container["Id"], force=True)
+                removed += 1
+            except Exception as e:
+                logger.warning(f"Could not remove stale pooled container {container['Id'][:12]}: {e}")
+        if removed:
+            logger.info(f"Removed {removed} stale pooled containers")
+        return removed
+
+    async def stop(self):
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            try:
+                await self._maintenance
+            except asyncio.CancelledError:
+                pass
+            self._maintenance = None
+        for task in list(self._background):
+            task.cancel()
+        containers = [c for idle in self._idle.values() for c in idle]
+        self._idle.clear()
+        await asyncio.gather(*(self._remove(c) for c in containers), return_exceptions=True)
+
+    async def acquire(self, image: str) -> Optional[WarmContainer]:
+        """Lease an idle container for ``image``; None means fall back to docker run"""
+        if not self.enabled or not self._swept:
+            return None
+        self._images.add(image)
+        self._last_used[image] = time.monotonic()
+
+        idle = self._idle.get(image)
+        container = None
+        while idle:
+            candidate = idle.popleft()
+            if time.monotonic() - candidate.created_at < self.idle_ttl:
+                container = candidate
+                break
+            self._spawn(self._remove(candidate))
+
+        self._replenish(image)
+        return container
+
+    def release(self, container: WarmContainer):
+        """Discard a leased container; its replacement is already warming"""
+        self._spawn(self._remove(container))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            image: {"idle": len(self._idle.get(image, ())), "warming": self._warming.get(image, 0)}
+            for image in sorted(self._images)
+        }
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _replenish(self, image: str):
+        missing = self.size_per_image - len(self._idle.get(image, ())) - self._warming.get(image, 0)
+        for _ in range(max(0, missing)):
+            self._warming[image] = self._warming.get(image, 0) + 1
+            self._spawn(self._warm(image))
+
+    async def _warm(self, image: str):
+        try:
+            container_id = await docker_client.create_container(
+                image, ["sleep", "infinity"], env=[CONTAINER_PATH], labels={POOL_LABEL: "1"}
+            )
+            await docker_client.start_container(container_id)
+            self._idle.setdefault(image, deque()).append(WarmContainer(container_id, image))
+        except Exception as e:
+            logger.warning(f"Could not warm container for {image}: {e}")
+        finally:
+            self._warming[image] = self._warming.get(image, 1) - 1
+
+    async def _remove(self, container: WarmContainer):
+        try:
+            await docker_client.remove_container(container.id, force=True)
+        except Exception as e:
+            logger.warning(f"Could not remove pooled container {container.id[:12]}: {e}")
+
+    async def _maintenance_loop(self, images: Set[str]):
+        # Before warming anything, so only containers of earlier processes match
+        try:
+            await self.remove_stale()
+        except Exception as e:
+            logger.warning(f"Could not remove stale pooled containers: {e}")
+        self._swept = True
+        if not self.enabled:
+            return
+        self._images.update(images)
+        for image in self._images:
+            self._last_used.setdefault(image, time.monotonic())
+            self._replenish(image)
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self._check_health()
+            except Exception as e:
+                logger.error(f"Container pool maintenance failed: {e}")
+
+    async def _check_health(self):
+        now = time.monotonic()
+        # Keep an image warm across at least two scheduled runs
+        interval = config_store.get().section("test").get("interval_minutes", settings.test_interval_minutes)
+        keep_warm = max(self.idle_ttl, 2 * 60 * float(interval))
+
+        for image in list(self._images):
+            idle = self._idle.get(image, ())
+            # Recycle containers past their TTL and drop any that stopped running
+            for container in list(idle):
+                if now - container.created_at < self.idle_ttl:
+                    try:
+                        state = (await docker_client.inspect_container(container.id)).get("State", {})
+                        if state.get("Running"):
+                            continue
+                    except Exception:
+                        pass
+                try:
+                    idle.remove(container)
+                except ValueError:
+                    # Leased while we were checking it
+                    continue
+                self._spawn(self._remove(container))
+
+            if now - self._last_used.get(image, now) < keep_warm:
+                self._replenish(image)
+            else:
+                # Unused image: let the pool for it drain
+                self._images.discard(image)
+
+
+# Global container pool instance
+container_pool = ContainerPool()
@@ -0,0 +1,107 @@
+# Linux Mirror Testing Solution - Test Container Labels and Orphan Reaper
+
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, Optional, Set
+
+from core.config import settings
+from core.repo_config import config_store
+from services.docker_client import docker_client
+
+logger = logging.getLogger(__name__)
+
+TARGET_LABEL = "mirror-test.target"
+JOB_LABEL = "mirror-test.job"
+PHASE_LABEL = "mirror-test.phase"
+
+_NAME_UNSAFE = re.compile(r"[^a-zA-Z0-9_.-]+")
+
+
+def container_name(test_key: str, phase: str) -> str:
+    """Deterministic container name: at most one container per target and phase"""
+    return _NAME_UNSAFE.sub("-", f"mirror-test-{test_key}-{phase}").lower()
+
+
+def container_labels(test_key: str, phase: str, job_id: Optional[str]) -> Dict[str, str]:
+    return {TARGET_LABEL: test_key, JOB_LABEL: job_id or "scheduled", PHASE_LABEL: phase}
+
+
+def test_timeout_seconds() -> float:
+    """Overall budget of one test's container work (test.timeout_seconds)"""
+    return float(config_store.get().section("test").get("timeout_seconds", settings.test_timeout_seconds))
+
+
+class ContainerReaper:
+    """
+    Periodically removes labeled test containers that outlived
+    test.timeout_seconds (plus a grace period), e.g. after a backend crash
+    or a lost connection to the Docker daemon. Containers of tests that are
+    still running are left to their own timeout handling.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._active: Set[str] = set()
+        self.reaped = 0
+
+    @property
+    def interval(self) -> float:
+        return float(config_store.get().section("container").get("reaper_interval_seconds", settings.container_reaper_interval_seconds))
+
+    def track(self, container_id: str):
+        self._active.add(container_id)
+
+    def untrack(self, container_id: str):
+        self._active.discard(container_id)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning(f"Container reaper pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def reap(self) -> int:
+        """Remove overdue labeled containers; returns how many were removed"""
+        max_age = test_timeout_seconds() + settings.container_reaper_grace_seconds
+        now = time.time()
+        removed = 0
+        for container in await docker_client.list_containers(labels=[TARGET_LABEL]):
+            container_id = container["Id"]
+            if container_id in self._active:
+                continue
+            age = now - container.get("Created", now)
+            if age < max_age:
+                continue
+            labels = container.get("Labels") or {}
+            logger.warning(
+                f"Removing orphaned test container {container_id[:12]} "
+                f"({labels.get(TARGET_LABEL)} {labels.get(PHASE_LABEL)}, {int(age)}s old)"
+            )
+            try:
+                await docker_client.remove_container(container_id, force=True)
+                removed += 1
+            except Exception as e:
+                logger.warning(f"Could not remove container {container_id[:12]}: {e}")
+        self.reaped += removed
+        return removed
+
+
+# Global container reaper instance
+container_reaper = ContainerReaper()
@@ -0,0 +1,338 @@
+# Linux Mirror Testing Solution - Docker Engine API Client
+
+import asyncio
+import json
+import logging
+import os
+import struct
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from core.config import settings
+from services.metrics import container_ops
+from services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# PATH for test containers (some base images ship without a sane default)
+CONTAINER_PATH = "PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin"
+
+
+class DockerAPIError(Exception):
+    """Raised when the Docker Engine API returns an error response"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+def split_image(image: str):
+    """Split "name[:tag]" into (name, tag), ignoring a registry port"""
+    name, _, tag = image.rpartition(":")
+    if not name or "/" in tag:
+        return image, "latest"
+    return name, tag
+
+
+class ContainerProcess:
+    """
+    A running container (or exec session) with the parts of the
+    asyncio.subprocess.Process interface the tests use: ``stdout``
+    (a StreamReader fed from the log stream), ``wait()``, ``communicate()``,
+    ``kill()`` and ``returncode``. ``container_id`` is kept for cleanup.
+    """
+
+    def __init__(self, client: "DockerClient", container_id: str, exec_id: Optional[str] = None, remove: bool = True):
+        self.client = client
+        self.container_id = container_id
+        self.exec_id = exec_id
+        self.remove = remove
+        self.stdout = asyncio.StreamReader(limit=2 ** 20)
+        self.returncode: Optional[int] = None
+        self.exit_error: Optional[str] = None
+        self.oom_killed = False
+        self._pump: Optional[asyncio.Task] = None
+        self._kill: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _start_pump(self, response: aiohttp.ClientResponse):
+        self._pump = asyncio.create_task(self._read_stream(response))
+
+    async def _read_stream(self, response: aiohttp.ClientResponse):
+        # Non-TTY streams are multiplexed: 8-byte header (stream type, 3 pad bytes, big-endian size)
+        try:
+            while True:
+                try:
+                    header = await response.content.readexactly(8)
+                except asyncio.IncompleteReadError:
+                    break
+                _, size = struct.unpack(">BxxxL", header)
+                if size:
+                    self.stdout.feed_data(await response.content.readexactly(size))
+        except (aiohttp.ClientError, asyncio.IncompleteReadError) as e:
+            logger.debug(f"Log stream for {self.container_id[:12]} ended: {e}")
+        finally:
+            response.release()
+            self.stdout.feed_eof()
+
+    async def wait(self) -> int:
+        if self.returncode is not None:
+            return self.returncode
+        if self._pump is not None:
+            await self._pump
+        with span("container.exit") as step:
+            await self._wait_exit()
+        container_ops["exit"].observe(step.duration)
+        step.attributes["returncode"] = self.returncode
+        return self.returncode
+
+    async def _wait_exit(self):
+        if self.exec_id is not None:
+            # ExitCode can lag the end of the output stream slightly
+            for _ in range(50):
+                info = await self.client.inspect_exec(self.exec_id)
+                if not info.get("Running") and info.get("ExitCode") is not None:
+                    break
+                await asyncio.sleep(0.1)
+            self.returncode = info.get("ExitCode")
+            if self.returncode is None:
+                self.returncode = -1
+        else:
+            status = await self.client.wait_container(self.container_id)
+            self.returncode = status.get("StatusCode", -1)
+            self.exit_error = (status.get("Error") or {}).get("Message") or None
+            if self.returncode == 137:
+                state = (await self.client.inspect_container(self.container_id)).get("State", {})
+                self.oom_killed = bool(state.get("OOMKilled"))
+
+    async def communicate(self):
+        output = await self.stdout.read()
+        await self.wait()
+        return output, None
+
+    def kill(self):
+        """
+        Stop the container; like Process.kill() this does not wait.
+        For exec sessions this kills the (single-use) pooled container.
+        """
+        if self._kill is None or self._kill.done():
+            self._kill = asyncio.create_task(self.client.kill_container(self.container_id))
+            self._kill.add_done_callback(self._killed)
+
+    def _killed(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Could not kill container {self.container_id[:12]}: {task.exception()}")
+
+    async def close(self):
+        """Remove the container unless it belongs to someone else (exec sessions)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._pump is not None and not self._pump.done():
+            self._pump.cancel()
+        if self._kill is not None:
+            # Failures are logged by _killed()
+            await asyncio.gather(self._kill, return_exceptions=True)
+        if self.remove:
+            try:
+                with span("container.remove") as step:
+                    await self.client.remove_container(self.container_id, force=True)
+                container_ops["remove"].observe(step.duration)
+            except Exception as e:
+                logger.warning(f"Could not remove container {self.container_id[:12]}: {e}")
+
+
+class DockerClient:
+    """
+    Async Docker Engine API client over DOCKER_HOST (tcp:// or unix://)
+    sharing one keep-alive connection pool for the life of the app.
+    """
+
+    def __init__(self, docker_host: Optional[str] = None, api_version: Optional[str] = None):
+        self.docker_host = docker_host or os.environ.get('DOCKER_HOST', 'tcp://docker-daemon:2376')
+        self.api_version = api_version or settings.docker_api_version
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        parsed = urlparse(self.docker_host)
+        if parsed.scheme == "unix":
+            self._socket_path = parsed.path
+            self._base_url = "http://docker"
+        else:
+            self._socket_path = None
+            self._base_url = f"http://{parsed.netloc or parsed.path}"
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            limit = settings.docker_api_connection_limit
+            if self._socket_path:
+                connector = aiohttp.UnixConnector(path=self._socket_path, limit=limit)
+            else:
+                connector = aiohttp.TCPConnector(limit=limit, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _url(self, path: str) -> str:
+        return f"{self._base_url}/{self.api_version}{path}"
+
+    async def _request(self, method: str, path: str, params=None, json=None, timeout: float = 60, expect_json: bool = True):
+        async with self.session.request(
+            method, self._url(path), params=params, json=json,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if response.status >= 400:
+                try:
+                    message = (await response.json()).get("message", "")
+                except Exception:
+                    message = await response.text()
+                raise DockerAPIError(response.status, message)
+            if response.status == 204 or not expect_json:
+                await response.read()
+                return None
+            return await response.json()
+
+    async def _open_stream(self, method: str, path: str, params=None, json=None) -> aiohttp.ClientResponse:
+        response = await self.session.request(method, self._url(path), params=params, json=json)
+        if response.status >= 400:
+            message = await response.text()
+            response.release()
+            raise DockerAPIError(response.status, message)
+        return response
+
+    async def ping(self) -> bool:
+        try:
+            await self._request("GET", "/_ping", timeout=5, expect_json=False)
+            return True
+        except Exception:
+            return False
+
+    async def pull_image(self, image: str, timeout: float = 600):
+        name, tag = split_image(image)
+        # The pull progress stream must be drained for the pull to complete
+        await self._request("POST", "/images/create", params={"fromImage": name, "tag": tag}, timeout=timeout, expect_json=False)
+
+    async def create_container(self, image: str, command: List[str], env: Optional[List[str]] = None,
+                               labels: Optional[Dict[str, str]] = None, name: Optional[str] = None,
+                               host_config: Optional[Dict[str, Any]] = None) -> str:
+        body = {
+            "Image": image,
+            "Cmd": command,
+            "Env": env or [],
+            "Labels": labels or {},
+            "Tty": False,
+            "AttachStdout": True,
+            "AttachStderr": True,
+            "HostConfig": host_config or {},
+        }
+        params = {"name": name} if name else None
+        try:
+            created = await self._request("POST", "/containers/create", params=params, json=body)
+        except DockerAPIError as e:
+            if e.status != 404:
+                raise
+            # Image not present on the daemon yet (docker run pulls implicitly)
+            with span("image.pull", image=image):
+                await self.pull_image(image)
+            created = await self._request("POST", "/containers/create", params=params, json=body)
+        return created["Id"]
+
+    async def start_container(self, container_id: str):
+        try:
+            await self._request("POST", f"/containers/{container_id}/start", expect_json=False)
+        except DockerAPIError as e:
+            if e.status != 304:  # already started
+                raise
+
+    async def attach_logs(self, container_id: str) -> aiohttp.ClientResponse:
+        """Follow stdout+stderr from the start of the container"""
+        return await self._open_stream(
+            "GET", f"/containers/{container_id}/logs",
+            params={"follow": "1", "stdout": "1", "stderr": "1"}
+        )
+
+    async def wait_container(self, container_id: str) -> Dict[str, Any]:
+        return await self._request("POST", f"/containers/{container_id}/wait", timeout=None)
+
+    async def inspect_container(self, container_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/containers/{container_id}/json", timeout=10)
+
+    async def inspect_image(self, image: str) -> Optional[Dict[str, Any]]:
+        """Image details, or None if the image is not on the daemon"""
+        try:
+            return await self._request("GET", f"/images/{image}/json", timeout=10)
+        except DockerAPIError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    async def kill_container(self, container_id: str):
+        try:
+            await self._request("POST", f"/containers/{container_id}/kill", expect_json=False, timeout=10)
+        except DockerAPIError as e:
+            if e.status not in (404, 409):  # gone or not running
+                raise
+
+    async def remove_container(self, container_id: str, force: bool = True):
+        try:
+            await self._request("DELETE", f"/containers/{container_id}", params={"force": "1" if force else "0"},
+                                expect_json=False, timeout=30)
+        except DockerAPIError as e:
+            if e.status != 404:
+                raise
+
+    async def list_containers(self, labels: Optional[List[str]] = None, include_stopped: bool = True) -> List[Dict[str, Any]]:
+        params = {"all": "1" if include_stopped else "0"}
+        if labels:
+            params["filters"] = json.dumps({"label": labels})
+        return await self._request("GET", "/containers/json", params=params, timeout=10)
+
+    async def run(self, image: str, command: List[str], env: Optional[List[str]] = None,
+                  labels: Optional[Dict[str, str]] = None, name: Optional[str] = None,
+                  host_config: Optional[Dict[str, Any]] = None) -> ContainerProcess:
+        """Create and start a container and follow its output (the API equivalent of docker run)"""
+        with span("container.create") as step:
+            container_id = await self.create_container(image, command, env=env, labels=labels, name=name, host_config=host_config)
+        container_ops["create"].observe(step.duration)
+        process = ContainerProcess(self, container_id)
+        try:
+            with span("container.start") as step:
+                await self.start_container(container_id)
+            container_ops["start"].observe(step.duration)
+            process._start_pump(await self.attach_logs(container_id))
+        except Exception:
+            await process.close()
+            raise
+        return process
+
+    async def exec(self, container_id: str, command: List[str], env: Optional[List[str]] = None) -> ContainerProcess:
+        """Run a command in a running container (the API equivalent of docker exec)"""
+        with span("container.exec") as step:
+            created = await self._request("POST", f"/containers/{container_id}/exec", json={
+                "Cmd": command,
+                "Env": env or [],
+                "AttachStdout": True,
+                "AttachStderr": True,
+                "Tty": False,
+            })
+            process = ContainerProcess(self, container_id, exec_id=created["Id"], remove=False)
+            process._start_pump(await self._open_stream("POST", f"/exec/{created['Id']}/start", json={"Detach": False, "Tty": False}))
+        container_ops["exec"].observe(step.duration)
+        return process
+
+    async def inspect_exec(self, exec_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/exec/{exec_id}/json", timeout=10)
+
+
+# Global Docker client instance
+docker_client = DockerClient()
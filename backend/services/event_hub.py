@@ -0,0 +1,213 @@
+# Linux Mirror Testing Solution - Dashboard Event Hub
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from core.config import settings
+from services.metrics import broadcast_serialization
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One connected dashboard. Messages are queued pre-serialized; when the
+    client falls too far behind, its backlog is dropped and it is resynced
+    with a single snapshot instead of blocking the publisher.
+    """
+
+    def __init__(self, max_queue: int):
+        self.queue: "asyncio.Queue[Tuple[int, str]]" = asyncio.Queue(maxsize=max_queue)
+        self.needs_snapshot = False
+        self.overflows = 0
+        self._ready = asyncio.Event()
+
+    def offer(self, seq: int, message: str) -> bool:
+        if self.needs_snapshot:
+            return False
+        try:
+            self.queue.put_nowait((seq, message))
+        except asyncio.QueueFull:
+            self._drop_backlog()
+            self.overflows += 1
+        self._ready.set()
+        return not self.needs_snapshot
+
+    def request_snapshot(self):
+        self._drop_backlog()
+        self._ready.set()
+
+    def _drop_backlog(self):
+        # Coalesce: everything queued is older than the snapshot that replaces it
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.needs_snapshot = True
+
+    async def next(self, hub: "EventHub") -> Tuple[int, str]:
+        """Wait for the next (seq, message) to send"""
+        while True:
+            if self.needs_snapshot:
+                self.needs_snapshot = False
+                return hub.seq, hub.snapshot_message()
+            if not self.queue.empty():
+                return self.queue.get_nowait()
+            self._ready.clear()
+            await self._ready.wait()
+
+
+class EventHub:
+    """
+    Fans test state changes out to every dashboard. Each change is serialized
+    once with the next sequence number and pushed to all subscribers as a
+    per-target delta; nothing runs while no state changes.
+
+    The last ``event_log_size`` deltas are kept so a reconnecting client that
+    sends its last-seen ``seq`` (and the hub ``epoch`` it came from) gets only
+    what it missed; anything older, or from a previous process, gets a snapshot.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.epoch = uuid.uuid4().hex[:12]  # identifies this process's sequence
+        self._log: "deque[Tuple[int, str]]" = deque(maxlen=settings.event_log_size)
+        self._subscribers: Set[Subscription] = set()
+        self._snapshot_provider: Optional[Callable[[], List[Dict[str, Any]]]] = None
+        self.published = 0
+        self.coalesced = 0
+        self.replayed = 0
+        self.snapshots = 0
+
+    def configure(self, snapshot_provider: Callable[[], List[Dict[str, Any]]]):
+        """Set the function that returns the full repository list"""
+        self._snapshot_provider = snapshot_provider
+
+    def snapshot_message(self) -> str:
+        self.snapshots += 1
+        targets = self._snapshot_provider() if self._snapshot_provider else []
+        return json.dumps({"type": "snapshot", "epoch": self.epoch, "seq": self.seq, "targets": targets}, default=str)
+
+    def publish(self, key: str, target: Dict[str, Any]):
+        """Publish the new state of one target to all subscribers"""
+        self.seq += 1
+        self.published += 1
+        start = time.perf_counter()
+        message = json.dumps({"type": "delta", "epoch": self.epoch, "seq": self.seq, "key": key, "target": target}, default=str)
+        broadcast_serialization.observe(time.perf_counter() - start)
+        self._log.append((self.seq, message))
+        for subscription in self._subscribers:
+            if not subscription.offer(self.seq, message):
+                self.coalesced += 1
+
+    def replay_since(self, since: Optional[int], epoch: Optional[str]) -> Optional[List[Tuple[int, str]]]:
+        """Deltas after ``since``, or None when the client needs a snapshot"""
+        if since is None or epoch != self.epoch or since > self.seq:
+            return None
+        oldest = self._log[0][0] if self._log else self.seq + 1
+        if since + 1 < oldest:
+            return None
+        return [(seq, message) for seq, message in self._log if seq > since]
+
+    def subscribe(self, since: Optional[int] = None, epoch: Optional[str] = None) -> Subscription:
+        """
+        Register a subscriber, primed with either the missed deltas or a
+        snapshot. Runs without awaiting, so nothing published in between is lost.
+        """
+        subscription = Subscription(settings.websocket_queue_size)
+        replay = self.replay_since(since, epoch)
+        if replay is None or len(replay) >= settings.websocket_queue_size:
+            subscription.request_snapshot()
+        else:
+            for seq, message in replay:
+                subscription.offer(seq, message)
+            self.replayed += len(replay)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "subscribers": len(self._subscribers),
+            "log_size": len(self._log),
+            "published_total": self.published,
+            "coalesced_total": self.coalesced,
+            "replayed_total": self.replayed,
+            "snapshots_total": self.snapshots,
+        }
+
+
+def parse_last_event_id(value: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    """Split an SSE Last-Event-ID of the form "<epoch>:<seq>" """
+    if not value or ":" not in value:
+        return None, None
+    epoch, _, seq = value.partition(":")
+    return (epoch, int(seq)) if seq.isdigit() else (None, None)
+
+
+async def serve_websocket(websocket, hub: "EventHub", since: Optional[int] = None, epoch: Optional[str] = None):
+    """
+    Stream hub messages to an accepted WebSocket: the deltas missed since
+    ``since`` (or one snapshot), then live deltas. A "get_status" message
+    from the client requests a fresh snapshot.
+    """
+    subscription = hub.subscribe(since, epoch)
+
+    async def receive():
+        while True:
+            message = await websocket.receive_text()
+            if message == "get_status":
+                subscription.request_snapshot()
+
+    async def send():
+        while True:
+            _, message = await subscription.next(hub)
+            await websocket.send_text(message)
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                logger.debug(f"WebSocket closed: {task.exception()!r}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hub.unsubscribe(subscription)
+
+
+async def stream_events(hub: "EventHub", since: Optional[int] = None, epoch: Optional[str] = None,
+                        keepalive: float = 15.0):
+    """
+    Server-Sent Events variant of the same stream for proxies that break
+    WebSockets. Event ids are "<epoch>:<seq>" so the browser's automatic
+    reconnect (Last-Event-ID) resumes where it left off.
+    """
+    subscription = hub.subscribe(since, epoch)
+    try:
+        yield f"retry: {settings.stream_retry_ms}\n\n"
+        while True:
+            try:
+                seq, message = await asyncio.wait_for(subscription.next(hub), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {hub.epoch}:{seq}\ndata: {message}\n\n"
+    finally:
+        hub.unsubscribe(subscription)
+
+
+# Global event hub instance
+event_hub = EventHub()
@@ -0,0 +1,76 @@
+# Linux Mirror Testing Solution - Change-Detection Cache
+
+import hashlib
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from core.config import settings
+from core.repo_config import config_store
+from services.results_store import results_store
+
+
+class Fingerprint(NamedTuple):
+    """Everything a green container run depended on"""
+    metadata_digest: str  # Release / repomd.xml digest from the metadata phase
+    image_digest: str     # image ID on the Docker daemon
+    script_digest: str    # the exact test script that ran
+
+
+def script_digest(*scripts: Optional[str]) -> str:
+    return hashlib.sha256("\0".join(s or "" for s in scripts).encode()).hexdigest()
+
+
+class FingerprintEntry:
+    def __init__(self, fingerprint: Fingerprint, verified_at: float):
+        self.fingerprint = fingerprint
+        self.verified_at = verified_at  # wall clock of the last full green run
+
+
+class FingerprintCache:
+    """
+    Remembers the fingerprint of each target's last successful full run so
+    unchanged mirrors can skip their container phases. A full run is still
+    forced once the last one is older than the configured maximum age.
+    Entries are kept in the results store, so skipping survives restarts.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, FingerprintEntry] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(config_store.get().section("test").get("skip_unchanged", settings.skip_unchanged_enabled))
+
+    @property
+    def max_age_seconds(self) -> float:
+        hours = config_store.get().section("test").get("unchanged_max_age_hours", settings.unchanged_max_age_hours)
+        return float(hours) * 3600
+
+    def lookup(self, key: str, fingerprint: Optional[Fingerprint]) -> Optional[FingerprintEntry]:
+        """Return the entry if the target can skip its container phases"""
+        if not self.enabled or fingerprint is None or not all(fingerprint):
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry.fingerprint != fingerprint:
+            return None
+        if time.time() - entry.verified_at >= self.max_age_seconds:
+            return None
+        return entry
+
+    def store(self, key: str, fingerprint: Optional[Fingerprint]):
+        if fingerprint is not None and all(fingerprint):
+            entry = self._entries[key] = FingerprintEntry(fingerprint, time.time())
+            results_store.save_fingerprint(key, fingerprint, entry.verified_at)
+
+    def invalidate(self, key: str):
+        if self._entries.pop(key, None) is not None:
+            results_store.save_fingerprint(key, None)
+
+    def load(self, entries: Dict[str, Tuple[Tuple[str, str, str], float]]):
+        """Restore entries saved by earlier runs (results_store.fingerprints())"""
+        for key, (digests, verified_at) in entries.items():
+            self._entries[key] = FingerprintEntry(Fingerprint(*digests), verified_at)
+
+
+# Global fingerprint cache instance
+fingerprint_cache = FingerprintCache()
@@ -0,0 +1,139 @@
+# Linux Mirror Testing Solution - Shared HTTP Client
+
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from core.config import settings
+from services.metrics import probe_ttfb
+from services.tracing import Span, span, start_span
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeResult:
+    """Outcome of a metadata probe against a mirror URL"""
+
+    def __init__(self, url: str, status: int, etag: Optional[str], last_modified: Optional[str],
+                 not_modified: bool, changed: bool, ttfb: float):
+        self.url = url
+        self.status = status
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified  # server answered 304
+        self.changed = changed            # validators differ from the previous probe
+        self.ttfb = ttfb
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 or self.not_modified
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    """Record DNS resolution and connection setup as spans of the traced run"""
+    config = aiohttp.TraceConfig()
+
+    async def dns_start(session, context, params):
+        # Resolution happens while the connection is being created
+        connect = getattr(context, "connect", None)
+        context.dns = Span("dns", connect, host=params.host) if connect is not None else start_span("dns", host=params.host)
+
+    async def dns_end(session, context, params):
+        context.dns.end()
+
+    async def connect_start(session, context, params):
+        context.connect = start_span("connect")
+
+    async def connect_end(session, context, params):
+        context.connect.end()
+
+    config.on_dns_resolvehost_start.append(dns_start)
+    config.on_dns_resolvehost_end.append(dns_end)
+    config.on_connection_create_start.append(connect_start)
+    config.on_connection_create_end.append(connect_end)
+    return config
+
+
+class HttpClient:
+    """
+    App-lifetime aiohttp session with per-host connection limits.
+    Remembers ETag / Last-Modified per URL so repeat probes can be
+    answered with 304 Not Modified and no body.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.http_connection_limit,
+                limit_per_host=settings.http_connection_limit_per_host,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[_trace_config()])
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        etag, last_modified = self._validators.get(url, (None, None))
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def remember(self, url: str, response: aiohttp.ClientResponse) -> bool:
+        """Store the response validators; returns True if they changed"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag is None and last_modified is None:
+            return True
+        previous = self._validators.get(url)
+        self._validators[url] = (etag, last_modified)
+        return previous != (etag, last_modified)
+
+    def forget(self, url: str):
+        self._validators.pop(url, None)
+
+    async def probe(self, url: str, timeout: float = 30) -> ProbeResult:
+        """
+        HEAD the URL with conditional headers (falling back to GET if HEAD is
+        not allowed). No response body is read.
+        """
+        headers = self.conditional_headers(url)
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+        with span("http.probe", url=url) as step:
+            start = time.monotonic()
+            async with self.session.head(url, headers=headers, timeout=client_timeout, allow_redirects=True) as response:
+                if response.status != 405:
+                    return self._probe_result(url, response, start, step)
+
+            async with self.session.get(url, headers=headers, timeout=client_timeout) as response:
+                return self._probe_result(url, response, start, step)
+
+    def _probe_result(self, url: str, response: aiohttp.ClientResponse, start: float, step) -> ProbeResult:
+        ttfb = time.monotonic() - start
+        probe_ttfb.observe(ttfb)
+        step.attributes.update(status=response.status, ttfb_seconds=round(ttfb, 6))
+        not_modified = response.status == 304
+        changed = False if not_modified else (response.status == 200 and self.remember(url, response))
+        if response.status not in (200, 304):
+            self.forget(url)
+        etag, last_modified = self._validators.get(url, (None, None))
+        return ProbeResult(url, response.status, etag, last_modified, not_modified, changed, ttfb)
+
+
+# Global HTTP client instance
+http_client = HttpClient()
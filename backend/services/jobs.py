@@ -0,0 +1,117 @@
+# Linux Mirror Testing Solution - Test Jobs
+
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from core.repo_config import Target
+from services.scheduler import QueuedTest
+
+# Finished jobs are kept this long for GET /jobs/{id}
+FINISHED_JOB_TTL_SECONDS = 3600
+MAX_JOBS = 1000
+
+
+class Job:
+    """A manual request for a set of targets, tracked through the scheduler"""
+
+    def __init__(self, targets: List[Target], entries: List[QueuedTest], reason: str):
+        self.id = uuid.uuid4().hex
+        self.targets = targets
+        self.entries = entries
+        self.reason = reason
+        self.created_at = datetime.now()
+        self.requests = 1  # how many triggers were coalesced onto this job
+        self.finished_at: Optional[float] = None
+
+    @property
+    def signature(self) -> FrozenSet[str]:
+        return frozenset(target.key for target in self.targets)
+
+    @property
+    def done(self) -> bool:
+        return all(entry.done is not None and entry.done.done() for entry in self.entries)
+
+    def describe(self, result_for: Callable[[str], Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        targets = []
+        for entry in self.entries:
+            if entry.done is not None and entry.done.done():
+                state = "done"
+            elif entry.started_at is not None:
+                state = "running"
+            else:
+                state = "queued"
+            result = result_for(entry.target.key) if state == "done" else None
+            targets.append({
+                "key": entry.target.key,
+                "distribution": entry.target.distribution,
+                "version": entry.target.version,
+                "state": state,
+                "status": result.get("status") if result else None,
+                "error_message": result.get("error_message") if result else None,
+            })
+
+        states = {target["state"] for target in targets}
+        if states == {"done"} or not states:
+            status = "completed"
+        elif states == {"queued"}:
+            status = "queued"
+        else:
+            status = "running"
+        return {
+            "job_id": self.id,
+            "status": status,
+            "reason": self.reason,
+            "created_at": self.created_at.isoformat(),
+            "coalesced_requests": self.requests - 1,
+            "targets": targets,
+        }
+
+
+class JobRegistry:
+    """
+    Keeps recent jobs. A request for exactly the same targets as a job that
+    is still in flight is coalesced onto it instead of creating a new one.
+    """
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[FrozenSet[str], Job] = {}
+
+    def _prune(self):
+        now = time.monotonic()
+        for job in list(self._active.values()):
+            if job.done:
+                job.finished_at = job.finished_at or now
+                self._active.pop(job.signature, None)
+        while self._jobs:
+            job_id, job = next(iter(self._jobs.items()))
+            expired = job.finished_at is not None and now - job.finished_at > FINISHED_JOB_TTL_SECONDS
+            if not expired and len(self._jobs) <= MAX_JOBS:
+                break
+            self._jobs.pop(job_id)
+            if self._active.get(job.signature) is job:
+                self._active.pop(job.signature)
+
+    def find_active(self, targets: List[Target]) -> Optional[Job]:
+        self._prune()
+        job = self._active.get(frozenset(target.key for target in targets))
+        if job is not None:
+            job.requests += 1
+        return job
+
+    def add(self, job: Job) -> Job:
+        self._jobs[job.id] = job
+        self._active[job.signature] = job
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+
+# Global job registry instance
+job_registry = JobRegistry()
@@ -0,0 +1,241 @@
+# Linux Mirror Testing Solution - Container Log Streaming
+
+import asyncio
+import json
+import logging
+import os
+import re
+import zlib
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from core.config import settings
+from core.repo_config import config_store
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class PhaseLog:
+    """
+    The last ``max_lines`` lines of one phase's output. Lines older than
+    that are only kept, compressed, when full logs are persisted.
+    """
+
+    def __init__(self, max_lines: int, compress: bool):
+        self.lines: Deque[str] = deque(maxlen=max_lines)
+        self.line_count = 0
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+        self._compressed: List[bytes] = []
+
+    def append(self, line: str):
+        self.lines.append(line)
+        self.line_count += 1
+        if self._compressor is not None:
+            chunk = self._compressor.compress(line.encode())
+            if chunk:
+                self._compressed.append(chunk)
+
+    def text(self) -> str:
+        return "".join(self.lines)
+
+    def tail(self, chars: int = 200) -> str:
+        """The last ``chars`` characters without joining the whole buffer"""
+        parts = []
+        size = 0
+        for line in reversed(self.lines):
+            parts.append(line)
+            size += len(line)
+            if size >= chars:
+                break
+        return "".join(reversed(parts))[-chars:]
+
+    def gzip_bytes(self) -> Optional[bytes]:
+        if self._compressor is None:
+            return None
+        self._compressed.append(self._compressor.flush())
+        self._compressor = None
+        return b"".join(self._compressed)
+
+
+class LogListener:
+    """A live log follower; events it had no room for are counted, not queued"""
+
+    def __init__(self, max_queue: int):
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class TargetLogs:
+    """Phase logs of a target's current (or last) run plus its live listeners"""
+
+    def __init__(self, started_at: Optional[datetime]):
+        self.started_at = started_at  # None until the target's first run
+        self.phases: Dict[str, PhaseLog] = {}
+        self.status: Optional[str] = None
+        self.finished = False
+        self.listeners: Set[LogListener] = set()
+
+
+class LogStreamer:
+    """
+    Keeps bounded per-target, per-phase ring buffers of container output and
+    fans new lines out to live listeners. A listener that falls behind loses
+    lines (it is told how many) rather than slowing the container reader.
+    Full logs are only kept, gzip-compressed, when ``test.logs.persist`` is on,
+    and are written under ``test.logs.directory`` when the run finishes.
+    """
+
+    def __init__(self):
+        self._targets: Dict[str, TargetLogs] = {}
+
+    @property
+    def options(self):
+        return config_store.get().section("test").get("logs", {})
+
+    @property
+    def max_lines(self) -> int:
+        return max(1, int(self.options.get("buffer_lines", settings.log_buffer_lines)))
+
+    @property
+    def persist_enabled(self) -> bool:
+        return bool(self.options.get("persist", settings.log_persist_enabled))
+
+    @property
+    def directory(self) -> str:
+        return self.options.get("directory", settings.log_directory)
+
+    def start_run(self, key: str):
+        """Discard the previous run's buffers; listeners stay attached"""
+        previous = self._targets.get(key)
+        logs = TargetLogs(datetime.now())
+        if previous is not None:
+            logs.listeners = previous.listeners
+        self._targets[key] = logs
+        self._broadcast(logs, {"type": "start", "started_at": logs.started_at.isoformat()})
+
+    def phase(self, key: str, phase: str) -> PhaseLog:
+        logs = self._targets.get(key)
+        if logs is None:
+            self.start_run(key)
+            logs = self._targets[key]
+        log = logs.phases.get(phase)
+        if log is None:
+            log = logs.phases[phase] = PhaseLog(self.max_lines, self.persist_enabled)
+        return log
+
+    def append(self, key: str, phase: str, line: str) -> PhaseLog:
+        log = self.phase(key, phase)
+        log.append(line)
+        logs = self._targets[key]
+        if logs.listeners:
+            self._broadcast(logs, {"type": "line", "phase": phase, "line": log.line_count, "text": line})
+        return log
+
+    def finish_run(self, key: str, status: Optional[str] = None):
+        logs = self._targets.get(key)
+        if logs is None or logs.finished:
+            return
+        logs.finished = True
+        logs.status = status
+        self._broadcast(logs, {"type": "end", "status": status})
+        if self.persist_enabled:
+            task = asyncio.get_running_loop().run_in_executor(None, self._persist, key, logs)
+            task.add_done_callback(lambda f: f.exception() and logger.error(f"Failed to persist logs for {key}: {f.exception()}"))
+
+    def _persist(self, key: str, logs: TargetLogs):
+        directory = os.path.join(self.directory, _UNSAFE.sub("_", key))
+        os.makedirs(directory, exist_ok=True)
+        stamp = logs.started_at.strftime("%Y%m%dT%H%M%S")
+        for phase, log in logs.phases.items():
+            data = log.gzip_bytes()
+            if data:
+                with open(os.path.join(directory, f"{stamp}-{_UNSAFE.sub('_', phase)}.log.gz"), "wb") as file:
+                    file.write(data)
+
+    def _broadcast(self, logs: TargetLogs, event: Dict[str, Any]):
+        for listener in logs.listeners:
+            listener.offer(event)
+
+    def snapshot(self, key: str, phase: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Buffered lines of the current run as line events"""
+        logs = self._targets.get(key)
+        if logs is None or logs.started_at is None:
+            return []
+        events: List[Dict[str, Any]] = [{"type": "start", "started_at": logs.started_at.isoformat()}]
+        for name, log in logs.phases.items():
+            if phase and name != phase:
+                continue
+            first = log.line_count - len(log.lines) + 1
+            events.extend(
+                {"type": "line", "phase": name, "line": first + index, "text": text}
+                for index, text in enumerate(log.lines)
+            )
+        if logs.finished:
+            events.append({"type": "end", "status": logs.status})
+        return events
+
+    def subscribe(self, key: str) -> LogListener:
+        logs = self._targets.get(key)
+        if logs is None:
+            logs = self._targets[key] = TargetLogs(None)
+        listener = LogListener(settings.log_listener_queue_size)
+        logs.listeners.add(listener)
+        return listener
+
+    def unsubscribe(self, key: str, listener: LogListener):
+        logs = self._targets.get(key)
+        if logs is not None:
+            logs.listeners.discard(listener)
+            if not logs.listeners and logs.started_at is None:
+                # Placeholder for a target that has not run yet
+                del self._targets[key]
+
+    async def follow(self, key: str, phase: Optional[str] = None):
+        """Buffered lines of the current run, then live events, as JSON strings"""
+        listener = self.subscribe(key)
+        try:
+            for event in self.snapshot(key, phase):
+                yield json.dumps(event)
+            while True:
+                event = await listener.queue.get()
+                if listener.dropped:
+                    yield json.dumps({"type": "dropped", "lines": listener.dropped})
+                    listener.dropped = 0
+                if phase and event.get("phase") not in (None, phase):
+                    continue
+                yield json.dumps(event)
+        finally:
+            self.unsubscribe(key, listener)
+
+    async def consume(self, stream, key: str, phase: str, matcher=None) -> PhaseLog:
+        """
+        Read a process stream line by line into the phase's ring buffer until
+        EOF, or until ``matcher`` (an OutputMatcher) reports a fatal line
+        """
+        log = self.phase(key, phase)
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                # A single line longer than the stream limit; its remainder is discarded
+                self.append(key, phase, "[line too long, truncated]\n")
+                continue
+            if not line:
+                return log
+            text = line.decode(errors="replace")
+            self.append(key, phase, text)
+            if matcher is not None and matcher.feed(text):
+                return log
+
+
+# Global log streamer instance
+log_streamer = LogStreamer()
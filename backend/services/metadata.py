@@ -0,0 +1,170 @@
+# Linux Mirror Testing Solution - Shared Metadata Verification Helpers
+
+import asyncio
+import bz2
+import contextlib
+import hashlib
+import lzma
+import os
+import tempfile
+import zlib
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from services.http_client import http_client
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst metadata
+    zstandard = None
+
+CHUNK_SIZE = 1 << 20
+
+
+class MetadataError(Exception):
+    """Raised when mirror metadata is missing or inconsistent"""
+
+
+def chain_digest(previous: Optional[str], digest: Optional[str]) -> Optional[str]:
+    """Digest of several repositories' metadata, folded in order as MetadataReport.merge does"""
+    if previous is None:
+        return digest
+    return hashlib.sha256(f"{previous}{digest}".encode()).hexdigest()
+
+
+class MetadataReport:
+    """Result of verifying a repository's metadata from the backend host"""
+
+    def __init__(self):
+        self.package_count = 0
+        self.indices: List[Dict[str, object]] = []
+        self.bytes_downloaded = 0
+        self.release_sha256: Optional[str] = None  # digest of Release / repomd.xml
+        self.architectures: List[str] = []
+        self.arch_counts: Dict[str, int] = {}
+        self.test_packages: Dict[str, bool] = {}
+        # (name, version, arch) of every package, when collected for the package index
+        self.packages: Optional[List[Tuple[str, str, str]]] = None
+        # Local copies of the downloaded indices, when kept for the completeness diff
+        self.index_copies: List[str] = []
+        # Summary of the diff against the upstream snapshot, when one was run
+        self.completeness: Optional[Dict[str, object]] = None
+
+    def merge(self, other: "MetadataReport"):
+        """Fold another repository's report (e.g. AppStream next to BaseOS) into this one"""
+        self.package_count += other.package_count
+        self.indices.extend(other.indices)
+        self.bytes_downloaded += other.bytes_downloaded
+        self.release_sha256 = chain_digest(self.release_sha256, other.release_sha256)
+        for arch, count in other.arch_counts.items():
+            self.arch_counts[arch] = self.arch_counts.get(arch, 0) + count
+        self.architectures = sorted(set(self.architectures) | set(other.architectures))
+        self.test_packages.update(other.test_packages)
+        if other.packages is not None:
+            self.packages = (self.packages or []) + other.packages
+        self.index_copies.extend(other.index_copies)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "package_count": self.package_count,
+            "indices": self.indices,
+            "bytes_downloaded": self.bytes_downloaded,
+            "release_sha256": self.release_sha256,
+            "architectures": self.architectures,
+            "arch_counts": self.arch_counts,
+            "test_packages": self.test_packages,
+            "completeness": self.completeness,
+        }
+
+
+def make_decompressor(path: str):
+    """Incremental decompressor for a metadata file, chosen by extension (None for plain files)"""
+    if path.endswith(".xz"):
+        return lzma.LZMADecompressor()
+    if path.endswith(".gz"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if path.endswith(".bz2"):
+        return bz2.BZ2Decompressor()
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise MetadataError(f"{path}: zstandard is not installed, cannot read .zst metadata")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+class StreamingVerifier:
+    """
+    Hashes a (compressed) metadata file chunk by chunk while decompressing it
+    and handing the plain data to ``consume()``, so memory stays bounded
+    regardless of file size. Subclasses parse the decompressed data.
+    """
+
+    def __init__(self, path: str, expected_digest: Optional[str], expected_size: Optional[int], algorithm: str = "sha256"):
+        self.path = path
+        self.expected_digest = expected_digest
+        self.expected_size = expected_size
+        try:
+            self.hasher = hashlib.new(algorithm)
+        except ValueError:
+            raise MetadataError(f"{path}: unsupported checksum type '{algorithm}'")
+        self.size = 0
+        self._decompressor = make_decompressor(path)
+        self.copy: Optional[BinaryIO] = None  # receives the raw chunks too, when set
+
+    def feed(self, chunk: bytes):
+        if self.copy is not None:
+            self.copy.write(chunk)
+        self.hasher.update(chunk)
+        self.size += len(chunk)
+        self.consume(self._decompressor.decompress(chunk) if self._decompressor else chunk)
+
+    def consume(self, data: bytes):
+        pass
+
+    def close(self):
+        """Called after the last chunk, before the digest checks"""
+
+    def finish(self):
+        self.close()
+        if self.expected_size is not None and self.size != self.expected_size:
+            raise MetadataError(f"{self.path}: size {self.size} does not match index ({self.expected_size})")
+        digest = self.hasher.hexdigest()
+        if self.expected_digest is not None and digest != self.expected_digest:
+            raise MetadataError(f"{self.path}: {self.hasher.name} mismatch (got {digest[:16]}…, index says {self.expected_digest[:16]}…)")
+        if self._decompressor is not None and not getattr(self._decompressor, "eof", True):
+            raise MetadataError(f"{self.path}: truncated compressed stream")
+
+
+async def fetch_bytes(url: str, timeout: float) -> Optional[bytes]:
+    """GET a small metadata file; None on 404"""
+    async with http_client.session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+        if response.status == 404:
+            return None
+        if response.status != 200:
+            raise MetadataError(f"{url}: HTTP {response.status}")
+        return await response.read()
+
+
+def index_copy_path(directory: str, path: str) -> str:
+    """A new file in ``directory`` to keep a copy of index ``path`` in (same extension)"""
+    fd, copy_path = tempfile.mkstemp(dir=directory, suffix=f"-{os.path.basename(path)}")
+    os.close(fd)
+    return copy_path
+
+
+async def stream_verify(url: str, verifier: StreamingVerifier, timeout: float, copy_to: Optional[str] = None) -> int:
+    """
+    Download ``url`` through ``verifier``; returns the number of bytes read.
+    With ``copy_to`` the raw file is also written there.
+    """
+    with open(copy_to, "wb") if copy_to else contextlib.nullcontext() as copy:
+        verifier.copy = copy
+        async with http_client.session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 200:
+                raise MetadataError(f"{verifier.path}: HTTP {response.status}")
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                # hashlib and the decompressors release the GIL on large buffers
+                await asyncio.to_thread(verifier.feed, chunk)
+    verifier.finish()
+    return verifier.size
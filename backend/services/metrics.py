@@ -0,0 +1,216 @@
+# Linux Mirror Testing Solution - Prometheus Metrics
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Starlette appends "; charset=utf-8"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base of the metric families; children are created once per label set"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self._new_child("")
+
+    def _new_child(self, label_text: str):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """
+        The child for these label values. Look it up once and keep it (or
+        preallocate it) on hot paths; a lookup is a single tuple-keyed dict get.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+            child = self._children[values] = self._new_child(label_text)
+        return child
+
+    def _samples(self) -> Iterable[object]:
+        return self._children.values() if self.labelnames else (self._default,)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for child in self._samples():
+            child.render(self.name, lines)
+        return lines
+
+
+class _ValueChild:
+    __slots__ = ("label_text", "value")
+
+    def __init__(self, label_text: str):
+        self.label_text = label_text
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self, name: str, lines: List[str]):
+        labels = f"{{{self.label_text}}}" if self.label_text else ""
+        lines.append(f"{name}{labels} {_format(self.value)}")
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self, label_text: str):
+        return _ValueChild(label_text)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """A gauge that is either set directly or read from a function at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self, label_text: str):
+        return _ValueChild(label_text)
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the (unlabeled) value on scrape instead of on every change"""
+        self._function = function
+
+    def render(self) -> List[str]:
+        if self._function is not None:
+            self._default.set(self._function())
+        return super().render()
+
+
+class _HistogramChild:
+    __slots__ = ("label_text", "bounds", "counts", "sum")
+
+    def __init__(self, label_text: str, bounds: Tuple[float, ...]):
+        self.label_text = label_text
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, lines: List[str]):
+        prefix = f"{self.label_text}," if self.label_text else ""
+        labels = f"{{{self.label_text}}}" if self.label_text else ""
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{_format(bound)}"}} {cumulative}')
+        lines.append(f"{name}_sum{labels} {_format(self.sum)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = ()):
+        self.bounds = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self, label_text: str):
+        return _HistogramChild(label_text, self.bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+
+class MetricsRegistry:
+    """All metric families of the process, rendered in registration order"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry
+registry = MetricsRegistry()
+
+PHASES = ("connectivity", "metadata", "update", "install")
+RUN_STATUSES = ("success", "partial", "failure", "cancelled")
+CONTAINER_OPERATIONS = ("create", "start", "exec", "exit", "remove")
+
+phase_duration = registry.register(Histogram(
+    "mirror_test_phase_duration_seconds", "Duration of a test phase",
+    ("phase", "distribution", "version"),
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 180, 300),
+))
+runs_total = registry.register(Counter(
+    "mirror_test_runs_total", "Finished test runs by overall status", ("status",),
+))
+container_latency = registry.register(Histogram(
+    "mirror_test_container_operation_seconds",
+    "Docker Engine API latency of container operations (exit: end of output until the exit code is known)",
+    ("operation",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+))
+probe_ttfb = registry.register(Histogram(
+    "mirror_test_http_probe_ttfb_seconds", "Time to first byte of mirror metadata probes",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+))
+queue_depth = registry.register(Gauge(
+    "mirror_test_scheduler_queue_depth", "Targets waiting in the scheduler queue",
+))
+in_flight = registry.register(Gauge(
+    "mirror_test_scheduler_in_flight", "Tests currently running",
+))
+stream_subscribers = registry.register(Gauge(
+    "mirror_test_stream_subscribers", "Connected dashboard WebSocket/SSE subscribers",
+))
+broadcast_serialization = registry.register(Histogram(
+    "mirror_test_broadcast_serialization_seconds", "Time to serialize one dashboard delta",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+))
+
+# Children for fixed label values are allocated up front
+for _status in RUN_STATUSES:
+    runs_total.labels(_status)
+container_ops = {operation: container_latency.labels(operation) for operation in CONTAINER_OPERATIONS}
+
+
+def prepare_targets(targets: Iterable) -> None:
+    """Preallocate the phase histograms of the configured targets"""
+    for target in targets:
+        for phase in PHASES:
+            phase_duration.labels(phase, target.distribution, target.version)
@@ -0,0 +1,106 @@
+# Linux Mirror Testing Solution - Streaming Output Matcher
+
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from core.repo_config import APT_FAMILIES
+
+
+def _compile(*patterns: str) -> List[Pattern]:
+    return [re.compile(pattern) for pattern in patterns]
+
+
+# Per package format and phase: output that proves the phase did its work,
+# and signatures that mean the run cannot succeed (the container is killed).
+PATTERNS: Dict[str, Dict[str, Dict[str, List[Pattern]]]] = {
+    "apt": {
+        "update": {
+            "success": _compile(r"Reading package lists", r"^Hit:", r"^Get:"),
+            "fatal": _compile(
+                r"^Err:.*\b(404|403|410)\s+\S",
+                r"Could not resolve",
+                r"does not have a Release file",
+                r"^E: Failed to fetch",
+                r"^E: The repository .* is not signed",
+            ),
+        },
+        "install": {
+            "success": _compile(r"^Setting up ", r"^Processing triggers"),
+            "fatal": _compile(
+                r"^E: Unable to locate package",
+                r"^E: Package .* has no installation candidate",
+                r"^Err:.*\b(404|403|410)\s+\S",
+                r"Could not resolve",
+                r"^E: Failed to fetch",
+            ),
+        },
+    },
+    "rpm": {
+        "update": {
+            "success": _compile(r"Metadata cache created", r"Cache created successfully", r"Rocky Linux"),
+            "fatal": _compile(
+                r"Failed to download metadata for repo",
+                r"Cannot download repomd\.xml",
+                r"Curl error \(6\): Couldn't resolve",
+                r"Status code: (404|403|410) for ",
+            ),
+        },
+        "install": {
+            "success": _compile(r"^Installed:", r"^Complete!", r"Transaction complete", r"Transaction test", r"Running transaction"),
+            "fatal": _compile(
+                r"No match for argument",
+                r"Unable to find a match",
+                r"Failed to download metadata for repo",
+                r"Curl error \(6\): Couldn't resolve",
+                r"Status code: (404|403|410) for ",
+            ),
+        },
+    },
+}
+
+# Wording of the classifications, per phase
+MESSAGES = {
+    "update": ("Update completed but with warnings", "Update failed"),
+    "install": ("Package installed but with warnings", "Install failed"),
+}
+
+
+class OutputMatcher:
+    """
+    Classifies one phase's output line by line as it arrives. ``feed()``
+    returns the offending line as soon as a fatal signature appears so the
+    caller can kill the container instead of waiting for it to exit.
+    """
+
+    def __init__(self, distribution: str, phase: str):
+        table = PATTERNS["apt" if distribution.lower() in APT_FAMILIES else "rpm"][phase]
+        self.phase = phase
+        self._success = table["success"]
+        self._fatal = table["fatal"]
+        self.matched_success = False
+        self.fatal: Optional[str] = None
+
+    def feed(self, line: str) -> Optional[str]:
+        if self.fatal is not None:
+            return self.fatal
+        if not self.matched_success:
+            for pattern in self._success:
+                if pattern.search(line):
+                    self.matched_success = True
+                    break
+        for pattern in self._fatal:
+            if pattern.search(line):
+                self.fatal = line.strip()
+                return self.fatal
+        return None
+
+    def classify(self, returncode: Optional[int], tail: str = "") -> Tuple[str, Optional[str]]:
+        """Map the finished (or killed) phase to (status, error)"""
+        warning, failed = MESSAGES[self.phase]
+        if self.fatal is not None:
+            return "failure", f"{failed}: {self.fatal}"
+        if returncode == 0:
+            if self.matched_success:
+                return "success", None
+            return "partial", warning
+        return "failure", f"{failed}: {tail[-200:]}"  # Last 200 chars
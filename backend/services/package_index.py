@@ -0,0 +1,354 @@
+# Linux Mirror Testing Solution - Package Index
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from core.config import settings
+from core.repo_config import config_store
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MLTPKIX1"
+# Magic, then the header's length; the JSON header follows, then 8-byte aligned sections
+PREAMBLE = struct.Struct("<8sI")
+MAX_ARCHITECTURES = 64
+
+
+class Segment:
+    """
+    One target's packages as three parallel columns sorted by name id:
+    name ids, version ids and architecture bitmasks. Columns are arrays
+    when built in memory and memoryviews into the index file when loaded.
+    """
+
+    def __init__(self, key: str, repository: str, digest: Optional[str], indexed_at: float,
+                 names: Sequence[int], versions: Sequence[int], masks: Sequence[int]):
+        self.key = key
+        self.repository = repository
+        self.digest = digest          # Release / repomd.xml digest the rows came from
+        self.indexed_at = indexed_at  # wall clock
+        self.names = names
+        self.versions = versions
+        self.masks = masks
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def rows(self, name_id: int) -> range:
+        start = bisect_left(self.names, name_id)
+        return range(start, bisect_right(self.names, name_id, start))
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class PackageIndex:
+    """
+    Which targets carry which package versions, built from the Packages and
+    primary.xml indices the metadata phase already downloads (no extra
+    fetches). Names and versions are interned into append-only tables and
+    architectures into bit positions, so a target costs 16 bytes per
+    package version. A lookup is a dict hit plus a bisect per target.
+
+    The index is saved to one file after changes and memory-mapped on
+    startup, so a restart serves lookups straight away. Saving first drops
+    names and versions that only replaced segments used. Options come from
+    config.yaml test.package_index {enabled, path}.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.versions: List[str] = []
+        self.architectures: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self._version_ids: Dict[str, int] = {}
+        self._arch_bits: Dict[str, int] = {}
+        self.segments: Dict[str, Segment] = {}
+        self._lock = threading.Lock()  # interning and saving run in worker threads
+        # What lookups read, swapped as one reference when the tables are rebuilt
+        self._view = (self._name_ids, self.versions, self.segments)
+        self._mmap: Optional[mmap.mmap] = None
+        self._dirty = False
+        self._save_task: Optional[asyncio.Task] = None
+        self.loaded_from: Optional[str] = None
+
+    @property
+    def options(self):
+        return config_store.get().section("test").get("package_index", {})
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.options.get("enabled", settings.package_index_enabled))
+
+    @property
+    def path(self) -> str:
+        return self.options.get("path", settings.package_index_path)
+
+    # Building
+
+    def _intern(self, table: List[str], ids: Dict[str, int], value: str) -> int:
+        index = ids.get(value)
+        if index is None:
+            index = ids[value] = len(table)
+            table.append(value)
+        return index
+
+    def _arch_bit(self, arch: str) -> int:
+        bit = self._arch_bits.get(arch)
+        if bit is None:
+            if len(self.architectures) >= MAX_ARCHITECTURES:
+                raise ValueError(f"More than {MAX_ARCHITECTURES} architectures in the package index")
+            bit = self._arch_bits[arch] = len(self.architectures)
+            self.architectures.append(arch)
+        return 1 << bit
+
+    def _build(self, key: str, repository: str, digest: Optional[str], packages: Iterable[Tuple[str, str, str]]) -> Segment:
+        grouped: Dict[Tuple[int, int], int] = {}
+        with self._lock:
+            for name, version, arch in packages:
+                row = (self._intern(self.names, self._name_ids, name),
+                       self._intern(self.versions, self._version_ids, version))
+                grouped[row] = grouped.get(row, 0) | self._arch_bit(arch)
+            ordered = sorted(grouped.items())
+            segment = Segment(
+                key, repository, digest, time.time(),
+                array("I", (row[0] for row, _ in ordered)),
+                array("I", (row[1] for row, _ in ordered)),
+                array("Q", (mask for _, mask in ordered)),
+            )
+            # Published under the lock so compaction never sees ids without their segment
+            self.segments[key] = segment
+        return segment
+
+    def is_current(self, key: str, repository: str, digest: Optional[str]) -> bool:
+        segment = self.segments.get(key)
+        return segment is not None and digest is not None and segment.digest == digest and segment.repository == repository
+
+    async def ingest(self, key: str, repository: str, report):
+        """
+        Replace a target's packages with those collected by the metadata
+        phase (report.packages); skipped when its metadata digest is unchanged
+        """
+        if report.packages is None or self.is_current(key, repository, report.release_sha256):
+            return
+        started = time.perf_counter()
+        segment = await asyncio.to_thread(self._build, key, repository, report.release_sha256, report.packages)
+        logger.info(f"Indexed {len(segment)} package versions for {key} in {time.perf_counter() - started:.2f}s")
+        self._schedule_save()
+
+    # Lookups
+
+    def lookup(self, name: str) -> Dict[str, List[Dict[str, Any]]]:
+        """{target key: [{"version", "architectures"}]} for every indexed target carrying ``name``"""
+        name_ids, versions, segments = self._view
+        name_id = name_ids.get(name)
+        if name_id is None:
+            return {}
+        found = {}
+        for key, segment in list(segments.items()):
+            rows = segment.rows(name_id)
+            if rows:
+                found[key] = [
+                    {"version": versions[segment.versions[row]], "architectures": self.arch_names(segment.masks[row])}
+                    for row in rows
+                ]
+        return found
+
+    def arch_names(self, mask: int) -> List[str]:
+        return [arch for bit, arch in enumerate(self.architectures) if mask >> bit & 1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "loaded_from": self.loaded_from,
+            "names": len(self.names),
+            "versions": len(self.versions),
+            "architectures": list(self.architectures),
+            "targets": {
+                key: {"rows": len(segment), "repository": segment.repository, "digest": segment.digest,
+                      "indexed_at": segment.indexed_at}
+                for key, segment in self.segments.items()
+            },
+        }
+
+    # Persistence
+
+    @staticmethod
+    def _renumber(table: List[str], used: Set[int]) -> Tuple[List[int], List[str], Dict[str, int]]:
+        """(old id -> new id, kept values, value -> new id); ids keep their relative order"""
+        mapping = [0] * len(table)
+        kept: List[str] = []
+        for old in sorted(used):
+            mapping[old] = len(kept)
+            kept.append(table[old])
+        return mapping, kept, {value: index for index, value in enumerate(kept)}
+
+    def _compact(self):
+        """
+        Drop names and versions no segment uses any more (their targets were
+        re-indexed since) and renumber the rest. New ids keep the old order,
+        so segments stay sorted. Called with the lock held.
+        """
+        used_names: Set[int] = set()
+        used_versions: Set[int] = set()
+        for segment in self.segments.values():
+            used_names.update(segment.names)
+            used_versions.update(segment.versions)
+        if len(used_names) == len(self.names) and len(used_versions) == len(self.versions):
+            return
+        dropped = len(self.names) - len(used_names), len(self.versions) - len(used_versions)
+        name_map, self.names, self._name_ids = self._renumber(self.names, used_names)
+        version_map, self.versions, self._version_ids = self._renumber(self.versions, used_versions)
+        self.segments = {
+            key: Segment(
+                segment.key, segment.repository, segment.digest, segment.indexed_at,
+                array("I", map(name_map.__getitem__, segment.names)),
+                array("I", map(version_map.__getitem__, segment.versions)),
+                segment.masks,
+            )
+            for key, segment in self.segments.items()
+        }
+        self._view = (self._name_ids, self.versions, self.segments)
+        logger.info(f"Package index dropped {dropped[0]} unused names and {dropped[1]} unused versions")
+
+    def _schedule_save(self):
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_loop())
+
+    async def _save_loop(self):
+        while self._dirty:
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self.save)
+            except Exception as e:
+                logger.error(f"Failed to save package index to {self.path}: {e}")
+
+    def save(self, path: Optional[str] = None):
+        """Write the index to ``path`` atomically (temporary file, then rename)"""
+        path = path or self.path
+        with self._lock:
+            self._compact()
+            names = "\n".join(self.names).encode()
+            versions = "\n".join(self.versions).encode()
+            architectures = list(self.architectures)
+            segments = list(self.segments.values())
+
+        sections: List[bytes] = []
+        offset = 0
+
+        def add(data: bytes) -> int:
+            nonlocal offset
+            start = offset
+            sections.append(data + b"\0" * (_align(len(data)) - len(data)))
+            offset += _align(len(data))
+            return start
+
+        # Section offsets are relative to the (aligned) end of the header
+        header = {
+            "byteorder": sys.byteorder,
+            "architectures": architectures,
+            "names": {"offset": add(names), "bytes": len(names)},
+            "versions": {"offset": add(versions), "bytes": len(versions)},
+            "segments": [],
+        }
+        for segment in segments:
+            header["segments"].append({
+                "key": segment.key, "repository": segment.repository, "digest": segment.digest,
+                "indexed_at": segment.indexed_at, "rows": len(segment),
+                "names": add(bytes(memoryview(segment.names).cast("B"))),
+                "versions": add(bytes(memoryview(segment.versions).cast("B"))),
+                "masks": add(bytes(memoryview(segment.masks).cast("B"))),
+            })
+
+        encoded = json.dumps(header).encode()
+        base = _align(PREAMBLE.size + len(encoded))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(PREAMBLE.pack(MAGIC, len(encoded)) + encoded)
+            file.write(b"\0" * (base - PREAMBLE.size - len(encoded)))
+            for data in sections:
+                file.write(data)
+        os.replace(temporary, path)
+
+    def load(self, path: Optional[str] = None) -> bool:
+        """Map a saved index; False (and an empty index) if it is missing or unreadable"""
+        path = path or self.path
+        try:
+            with open(path, "rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            magic, length = PREAMBLE.unpack_from(mapped, 0)
+            if magic != MAGIC:
+                raise ValueError("not a package index file")
+            header = json.loads(mapped[PREAMBLE.size:PREAMBLE.size + length])
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError("written on a machine with different byte order")
+            base = _align(PREAMBLE.size + length)
+            view = memoryview(mapped)
+
+            def text(section) -> List[str]:
+                start = base + section["offset"]
+                data = bytes(view[start:start + section["bytes"]])
+                return data.decode().split("\n") if data else []
+
+            def column(offset: int, rows: int, code: str):
+                start = base + offset
+                return view[start:start + rows * array(code).itemsize].cast(code)
+
+            names, versions = text(header["names"]), text(header["versions"])
+            segments = {
+                entry["key"]: Segment(
+                    entry["key"], entry["repository"], entry["digest"], entry["indexed_at"],
+                    column(entry["names"], entry["rows"], "I"),
+                    column(entry["versions"], entry["rows"], "I"),
+                    column(entry["masks"], entry["rows"], "Q"),
+                )
+                for entry in header["segments"]
+            }
+        except (ValueError, KeyError, TypeError, struct.error) as e:
+            logger.warning(f"Ignoring package index {path}: {e}")
+            return False
+
+        with self._lock:
+            self.names, self.versions = names, versions
+            self._name_ids = {name: index for index, name in enumerate(names)}
+            self._version_ids = {version: index for index, version in enumerate(versions)}
+            self.architectures = list(header["architectures"])
+            self._arch_bits = {arch: bit for bit, arch in enumerate(self.architectures)}
+            self.segments = segments
+            self._view = (self._name_ids, self.versions, self.segments)
+            # Segments loaded from the file keep views into the mapping
+            self._mmap = mapped
+        self.loaded_from = path
+        logger.info(f"Loaded package index from {path}: {len(segments)} targets, {len(names)} names")
+        return True
+
+    async def start(self):
+        if self.enabled:
+            await asyncio.to_thread(self.load)
+
+    async def stop(self):
+        if self._save_task is not None:
+            await self._save_task
+
+
+# Global package index instance
+package_index = PackageIndex()
@@ -0,0 +1,309 @@
+# Linux Mirror Testing Solution - Results Store
+
+import base64
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from core.config import settings
+from core.repo_config import config_store
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_runs (
+    id TEXT PRIMARY KEY,
+    distribution TEXT NOT NULL,
+    version TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    status TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL,
+    duration_seconds REAL,
+    error_message TEXT,
+    package_count INTEGER,
+    verified_unchanged INTEGER NOT NULL DEFAULT 0,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_test_runs_target_time ON test_runs (distribution, version, start_time);
+CREATE TABLE IF NOT EXISTS test_phases (
+    run_id TEXT NOT NULL REFERENCES test_runs (id) ON DELETE CASCADE,
+    phase TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL,
+    error TEXT,
+    PRIMARY KEY (run_id, phase)
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    target TEXT PRIMARY KEY,
+    metadata_digest TEXT NOT NULL,
+    image_digest TEXT NOT NULL,
+    script_digest TEXT NOT NULL,
+    verified_at REAL NOT NULL
+);
+"""
+
+_STOP = object()
+
+
+class FingerprintWrite(NamedTuple):
+    """Queued change to a target's stored fingerprint; ``digests`` None deletes it"""
+    target: str
+    digests: Optional[Tuple[str, str, str]]
+    verified_at: float
+
+
+def encode_cursor(start_time: float, run_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{start_time!r}|{run_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Raises ValueError for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start_time, run_id = raw.split("|", 1)
+        return float(start_time), run_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _timestamp(value) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+def _isoformat(value: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(value).isoformat() if value is not None else None
+
+
+class ResultsStore:
+    """
+    Persists finished test runs to SQLite (WAL mode) with one row per phase.
+    Writes are queued and committed in batches by a background thread so the
+    event loop never waits on the disk; reads use their own connection, which
+    WAL lets run alongside the writer.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self._path: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        database = config_store.get().section("database")
+        if database.get("type", settings.database_type) != "sqlite":
+            logger.warning("Only the sqlite results store is implemented; using database_path")
+        return database.get("path", settings.database_path)
+
+    @property
+    def batch_size(self) -> int:
+        return max(1, int(config_store.get().section("database").get("batch_size", settings.database_batch_size)))
+
+    @property
+    def flush_interval(self) -> float:
+        value = config_store.get().section("database").get("flush_interval_seconds", settings.database_flush_interval_seconds)
+        return max(0.0, float(value))
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._path, timeout=30, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def start(self):
+        """Create the schema and start the writer thread"""
+        if self._writer is not None and self._writer.is_alive():
+            return
+        self._path = self.path
+        directory = os.path.dirname(os.path.abspath(self._path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        with connection:
+            connection.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, args=(connection,), name="results-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"Results store at {self._path}")
+
+    def stop(self, timeout: float = 10.0):
+        """Flush queued results and stop the writer thread (blocking)"""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        self._writer = None
+
+    def record(self, distribution: str, version: str, result: Dict[str, Any]):
+        """Queue a finished run (a test_tracker entry) for writing"""
+        self._queue.put((distribution, version, dict(result)))
+
+    def save_fingerprint(self, target: str, digests: Optional[Tuple[str, str, str]], verified_at: float = 0.0):
+        """Queue storing (or with ``digests`` None, deleting) a target's last green fingerprint"""
+        self._queue.put(FingerprintWrite(target, tuple(digests) if digests is not None else None, verified_at))
+
+    def _write_loop(self, connection: sqlite3.Connection):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            batch_size = self.batch_size
+            while len(batch) < batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._write_batch(connection, batch)
+            except Exception as e:
+                # Keep the writer alive; retry one by one so only bad writes are dropped
+                logger.exception(f"Failed to write a batch of {len(batch)} queued writes: {e}")
+                if len(batch) > 1:
+                    for item in batch:
+                        try:
+                            self._write_batch(connection, [item])
+                        except Exception as e:
+                            logger.error(f"Dropped queued write for {item[0]}: {e}")
+        connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, batch: List[Tuple[str, str, Dict[str, Any]]]):
+        runs = []
+        phases = []
+        fingerprints = [item for item in batch if isinstance(item, FingerprintWrite)]
+        for distribution, version, result in (item for item in batch if not isinstance(item, FingerprintWrite)):
+            run_id = uuid.uuid4().hex
+            runs.append((
+                run_id, distribution, version, result.get("repository", ""), result.get("status", "unknown"),
+                _timestamp(result.get("start_time")) or time.time(), _timestamp(result.get("end_time")),
+                result.get("duration"), result.get("error_message"), result.get("package_count"),
+                int(bool(result.get("verified_unchanged"))),
+                json.dumps(result["metadata"]) if result.get("metadata") else None,
+            ))
+            for position, (phase, phase_result) in enumerate((result.get("test_results") or {}).items()):
+                phases.append((
+                    run_id, phase, position, phase_result.get("status", "unknown"),
+                    phase_result.get("duration"), phase_result.get("error"),
+                ))
+        with connection:
+            connection.executemany("INSERT INTO test_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", runs)
+            connection.executemany("INSERT INTO test_phases VALUES (?, ?, ?, ?, ?, ?)", phases)
+            # In queue order, so the last store or delete for a target wins
+            for write in fingerprints:
+                if write.digests is None:
+                    connection.execute("DELETE FROM fingerprints WHERE target = ?", (write.target,))
+                else:
+                    connection.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)",
+                                       (write.target, *write.digests, write.verified_at))
+
+    def _phases_for(self, connection: sqlite3.Connection, run_ids: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        phases: Dict[str, Dict[str, Dict[str, Any]]] = {run_id: {} for run_id in run_ids}
+        if not run_ids:
+            return phases
+        placeholders = ",".join("?" * len(run_ids))
+        rows = connection.execute(
+            f"SELECT run_id, phase, status, duration, error FROM test_phases "
+            f"WHERE run_id IN ({placeholders}) ORDER BY run_id, position",
+            run_ids,
+        )
+        for row in rows:
+            phases[row["run_id"]][row["phase"]] = {"status": row["status"], "duration": row["duration"], "error": row["error"]}
+        return phases
+
+    def history(self, distribution: str, version: str, limit: int = 20,
+                cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Runs for one target, newest first. ``cursor`` is the ``next_cursor``
+        of the previous page; pages are stable while new runs are written.
+        """
+        connection = self._reader()
+        params: List[Any] = [distribution, version]
+        query = "SELECT * FROM test_runs WHERE distribution = ? AND version = ?"
+        if cursor:
+            start_time, run_id = decode_cursor(cursor)
+            query += " AND (start_time < ? OR (start_time = ? AND id < ?))"
+            params += [start_time, start_time, run_id]
+        query += " ORDER BY start_time DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = connection.execute(query, params).fetchall()
+        page = rows[:limit]
+        phases = self._phases_for(connection, [row["id"] for row in page])
+        results = [
+            {
+                "id": row["id"],
+                "distribution": row["distribution"],
+                "version": row["version"],
+                "repository": row["repository"],
+                "status": row["status"],
+                "start_time": _isoformat(row["start_time"]),
+                "end_time": _isoformat(row["end_time"]),
+                "duration_seconds": row["duration_seconds"],
+                "error_message": row["error_message"],
+                "package_count": row["package_count"],
+                "verified_unchanged": bool(row["verified_unchanged"]),
+                "test_details": phases[row["id"]],
+            }
+            for row in page
+        ]
+        next_cursor = encode_cursor(page[-1]["start_time"], page[-1]["id"]) if len(rows) > limit else None
+        return {"results": results, "next_cursor": next_cursor}
+
+    def latest(self) -> Dict[str, Dict[str, Any]]:
+        """Most recent run per target in test_tracker format, used to restore state on startup"""
+        connection = self._reader()
+        rows = connection.execute(
+            "SELECT r.* FROM test_runs r JOIN ("
+            "  SELECT distribution, version, MAX(start_time) AS start_time FROM test_runs GROUP BY distribution, version"
+            ") newest USING (distribution, version, start_time)"
+        ).fetchall()
+        phases = self._phases_for(connection, [row["id"] for row in rows])
+        latest = {}
+        for row in rows:
+            latest[f"{row['distribution']}-{row['version']}"] = {
+                "start_time": datetime.fromtimestamp(row["start_time"]),
+                "end_time": datetime.fromtimestamp(row["end_time"]) if row["end_time"] is not None else None,
+                "duration": row["duration_seconds"] or 0,
+                "status": row["status"],
+                "repository": row["repository"],
+                "error_message": row["error_message"],
+                "package_count": row["package_count"],
+                "verified_unchanged": bool(row["verified_unchanged"]),
+                "test_results": phases[row["id"]],
+            }
+        return latest
+
+    def fingerprints(self) -> Dict[str, Tuple[Tuple[str, str, str], float]]:
+        """Stored fingerprints: {target: ((metadata, image, script digests), verified_at)}"""
+        rows = self._reader().execute("SELECT * FROM fingerprints").fetchall()
+        return {
+            row["target"]: ((row["metadata_digest"], row["image_digest"], row["script_digest"]), row["verified_at"])
+            for row in rows
+        }
+
+
+# Global results store instance
+results_store = ResultsStore()
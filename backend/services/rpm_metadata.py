@@ -0,0 +1,165 @@
+# Linux Mirror Testing Solution - RPM Metadata Verification
+
+import hashlib
+import logging
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from core.config import settings
+from services.metadata import MetadataError, MetadataReport, StreamingVerifier, fetch_bytes, index_copy_path, stream_verify
+
+logger = logging.getLogger(__name__)
+
+REPO_NS = "{http://linux.duke.edu/metadata/repo}"
+COMMON_NS = "{http://linux.duke.edu/metadata/common}"
+
+
+def parse_repomd(data: bytes) -> Dict[str, Dict[str, object]]:
+    """
+    Parse repomd.xml into {type: {"href", "checksum_type", "checksum", "size"}}
+    for each <data> entry (primary, filelists, other, ...).
+    """
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as e:
+        raise MetadataError(f"repomd.xml is not valid XML: {e}")
+
+    entries = {}
+    for node in root.findall(f"{REPO_NS}data"):
+        location = node.find(f"{REPO_NS}location")
+        checksum = node.find(f"{REPO_NS}checksum")
+        size = node.find(f"{REPO_NS}size")
+        if location is None or checksum is None:
+            continue
+        entries[node.get("type")] = {
+            "href": location.get("href"),
+            "checksum_type": checksum.get("type", "sha256"),
+            "checksum": (checksum.text or "").strip().lower(),
+            "size": int(size.text) if size is not None and size.text else None,
+        }
+    return entries
+
+
+def rpm_version(element) -> str:
+    """[epoch:]version-release of a primary.xml <version> element"""
+    if element is None:
+        return ""
+    epoch = element.get("epoch")
+    version = f"{element.get('ver', '')}-{element.get('rel', '')}"
+    return f"{epoch}:{version}" if epoch and epoch != "0" else version
+
+
+class PrimaryXmlVerifier(StreamingVerifier):
+    """
+    Verifies primary.xml(.gz/.xz/.zst) while walking it with an incremental
+    pull parser; each <package> is discarded once counted so memory stays flat.
+    """
+
+    def __init__(self, path: str, expected_digest: str, expected_size: Optional[int], algorithm: str,
+                 wanted_packages: Iterable[str] = (), collect: bool = False):
+        super().__init__(path, expected_digest, expected_size, algorithm)
+        self.package_count = 0
+        # (name, version, arch) of each package, for the package index
+        self.packages: Optional[List[Tuple[str, str, str]]] = [] if collect else None
+        self.declared_count: Optional[int] = None
+        self.arch_counts: Dict[str, int] = {}
+        self.wanted: Set[str] = set(wanted_packages)
+        self.found: Set[str] = set()
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root = None
+
+    def consume(self, data: bytes):
+        if not data:
+            return
+        try:
+            self._parser.feed(data)
+        except ET.ParseError as e:
+            raise MetadataError(f"{self.path}: XML error: {e}")
+        self._drain()
+
+    def _drain(self):
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                    declared = element.get("packages")
+                    self.declared_count = int(declared) if declared and declared.isdigit() else None
+                continue
+            if element.tag != f"{COMMON_NS}package":
+                continue
+            self.package_count += 1
+            arch = element.findtext(f"{COMMON_NS}arch") or "unknown"
+            self.arch_counts[arch] = self.arch_counts.get(arch, 0) + 1
+            name = element.findtext(f"{COMMON_NS}name")
+            if name in self.wanted:
+                self.found.add(name)
+            if self.packages is not None and name:
+                self.packages.append((name, rpm_version(element.find(f"{COMMON_NS}version")), arch))
+            # Drop the finished package from the tree
+            self._root.clear()
+
+    def close(self):
+        try:
+            self._parser.close()
+        except ET.ParseError as e:
+            raise MetadataError(f"{self.path}: truncated or invalid XML: {e}")
+        self._drain()
+        if self.declared_count is not None and self.declared_count != self.package_count:
+            raise MetadataError(f"{self.path}: declares {self.declared_count} packages but contains {self.package_count}")
+
+
+async def fetch_repomd(repo_url: str, timeout: Optional[float] = None) -> bytes:
+    repo_url = repo_url.rstrip("/")
+    repomd = await fetch_bytes(f"{repo_url}/repodata/repomd.xml", timeout or settings.metadata_timeout_seconds)
+    if repomd is None:
+        raise MetadataError(f"{repo_url}/repodata/repomd.xml not found")
+    return repomd
+
+
+async def verify_rpm_repository(repo_url: str, test_packages: Iterable[str] = (),
+                                timeout: Optional[float] = None, collect_packages: bool = False,
+                                keep_indices: Optional[str] = None, repomd: Optional[bytes] = None) -> MetadataReport:
+    """
+    Verify a yum/dnf repository at ``repo_url`` (the directory holding
+    repodata/): repomd.xml parses, primary metadata matches its checksum and
+    size, and the configured test packages exist. Raises MetadataError.
+    ``collect_packages`` fills report.packages for the package index;
+    ``keep_indices`` is a directory to keep a copy of primary.xml in;
+    ``repomd`` is a repomd.xml the caller already fetched.
+    """
+    timeout = timeout or settings.metadata_timeout_seconds
+    repo_url = repo_url.rstrip("/")
+    test_packages = [p for p in test_packages if p]
+    report = MetadataReport()
+
+    if repomd is None:
+        repomd = await fetch_repomd(repo_url, timeout)
+    report.release_sha256 = hashlib.sha256(repomd).hexdigest()
+
+    entries = parse_repomd(repomd)
+    primary = entries.get("primary")
+    if primary is None or not primary["href"]:
+        raise MetadataError("repomd.xml has no primary metadata entry")
+
+    verifier = PrimaryXmlVerifier(
+        primary["href"], primary["checksum"], primary["size"], primary["checksum_type"], wanted_packages=test_packages,
+        collect=collect_packages
+    )
+    copy_path = index_copy_path(keep_indices, primary["href"]) if keep_indices else None
+    if copy_path:
+        report.index_copies.append(copy_path)
+    report.bytes_downloaded += await stream_verify(f"{repo_url}/{primary['href']}", verifier, timeout, copy_to=copy_path)
+
+    report.package_count = verifier.package_count
+    report.arch_counts = verifier.arch_counts
+    report.architectures = sorted(verifier.arch_counts)
+    report.test_packages = {name: name in verifier.found for name in test_packages}
+    report.packages = verifier.packages
+    report.indices.append({"path": primary["href"], "size": verifier.size, "packages": verifier.package_count})
+
+    if verifier.package_count == 0:
+        raise MetadataError(f"{primary['href']} lists no packages")
+    missing: List[str] = [name for name, present in report.test_packages.items() if not present]
+    if missing:
+        raise MetadataError(f"Test packages not in repository: {', '.join(missing)}")
+    return report
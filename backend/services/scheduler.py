@@ -0,0 +1,438 @@
+# Linux Mirror Testing Solution - Test Scheduler
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional
+from urllib.parse import urlparse
+
+from core.config import settings
+from core.repo_config import Target, config_store
+
+logger = logging.getLogger(__name__)
+
+# Lower value runs first
+PRIORITY_MANUAL = 0
+PRIORITY_FAILING = 1
+PRIORITY_NORMAL = 2
+
+
+def priority_for(previous_status: Optional[str], manual: bool = False) -> int:
+    """Manual triggers first, then targets whose last run did not succeed"""
+    if manual:
+        return PRIORITY_MANUAL
+    if previous_status in ("failure", "partial"):
+        return PRIORITY_FAILING
+    return PRIORITY_NORMAL
+
+
+def mirror_host(repository_url: str) -> str:
+    return urlparse(repository_url).netloc or repository_url
+
+
+class QueuedTest:
+    """A target waiting for (or holding) a scheduler slot"""
+
+    def __init__(self, target: Target, priority: int, reason: str):
+        self.target = target
+        self.priority = priority
+        self.reason = reason
+        self.host = mirror_host(target.repository)
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.done: Optional[asyncio.Future] = None
+        self.job_id: Optional[str] = None  # manual job that requested the run, if any
+        self.task: Optional[asyncio.Task] = None
+
+    def describe(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "key": self.target.key,
+            "priority": self.priority,
+            "reason": self.reason,
+            "host": self.host,
+            "waited_seconds": round((self.started_at or now) - self.enqueued_at, 3),
+        }
+
+
+class TestScheduler:
+    """
+    Runs queued tests under a global concurrency cap and a per-mirror-host cap.
+    Limits are read from config.yaml (test.max_concurrent_tests,
+    test.max_concurrent_per_host) on every dispatch, falling back to Settings.
+    Work outside the queue (package checks) holds slots through slot().
+    """
+
+    def __init__(self):
+        self._runner: Optional[Callable[[QueuedTest], Awaitable[Any]]] = None
+        self._heap: List = []
+        self._counter = itertools.count()
+        self._pending: Dict[str, QueuedTest] = {}
+        self._running: Dict[str, QueuedTest] = {}
+        self._host_running: Dict[str, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self._held = 0
+        self._slot_waiters: deque = deque()
+
+        # Wait-time reporting
+        self._dispatched = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._recent_waits = deque(maxlen=100)
+
+    def configure(self, runner: Callable[[QueuedTest], Awaitable[Any]]):
+        """Set the coroutine function that runs a single queued test"""
+        self._runner = runner
+
+    @property
+    def max_concurrent(self) -> int:
+        value = config_store.get().section("test").get("max_concurrent_tests", settings.max_concurrent_tests)
+        return max(1, int(value))
+
+    @property
+    def max_per_host(self) -> int:
+        value = config_store.get().section("test").get("max_concurrent_per_host", settings.max_concurrent_per_host)
+        return max(1, int(value))
+
+    def start(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def is_pending(self, key: str) -> bool:
+        """True while a target is queued or running"""
+        return key in self._pending or key in self._running
+
+    def submit(self, target: Target, priority: int = PRIORITY_NORMAL, reason: str = "scheduled") -> QueuedTest:
+        """
+        Queue a target. A target that is already queued keeps its place but is
+        promoted if the new priority is higher; a running target is not queued again.
+        """
+        key = target.key
+        if key in self._running:
+            return self._running[key]
+
+        entry = self._pending.get(key)
+        if entry is not None:
+            if priority < entry.priority:
+                entry.priority = priority
+                entry.reason = reason
+                heapq.heappush(self._heap, (priority, next(self._counter), entry))
+            return entry
+
+        entry = QueuedTest(target, priority, reason)
+        entry.done = asyncio.get_running_loop().create_future()
+        self._pending[key] = entry
+        heapq.heappush(self._heap, (priority, next(self._counter), entry))
+        self.start()
+        self._wakeup.set()
+        return entry
+
+    def _has_room(self, host: str) -> bool:
+        return (len(self._running) + self._held < self.max_concurrent
+                and self._host_running.get(host, 0) < self.max_per_host)
+
+    def _release_host(self, host: str):
+        remaining = self._host_running.get(host, 1) - 1
+        if remaining > 0:
+            self._host_running[host] = remaining
+        else:
+            self._host_running.pop(host, None)
+
+    def _slot_freed(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+        # Waiters re-check the limits when they wake
+        while self._slot_waiters:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, target: Target):
+        """
+        Hold one of the test slots (and one of its mirror host's) for work
+        that does not go through the queue, so it shares the same limits
+        """
+        host = mirror_host(target.repository)
+        while not self._has_room(host):
+            waiter = asyncio.get_running_loop().create_future()
+            self._slot_waiters.append(waiter)
+            await waiter
+        self._held += 1
+        self._host_running[host] = self._host_running.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            self._held -= 1
+            self._release_host(host)
+            self._slot_freed()
+
+    def _next_runnable(self) -> Optional[QueuedTest]:
+        if len(self._running) + self._held >= self.max_concurrent:
+            return None
+
+        max_per_host = self.max_per_host
+        skipped = []
+        found = None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            priority, _, entry = item
+            if self._pending.get(entry.target.key) is not entry or priority != entry.priority:
+                # Stale heap item left behind by a promotion
+                continue
+            if self._host_running.get(entry.host, 0) >= max_per_host:
+                skipped.append(item)
+                continue
+            found = entry
+            break
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return found
+
+    async def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            entry = self._next_runnable()
+            while entry is not None:
+                self._start_entry(entry)
+                entry = self._next_runnable()
+            await self._wakeup.wait()
+
+    def _start_entry(self, entry: QueuedTest):
+        key = entry.target.key
+        del self._pending[key]
+        self._running[key] = entry
+        self._host_running[entry.host] = self._host_running.get(entry.host, 0) + 1
+
+        entry.started_at = time.monotonic()
+        wait = entry.started_at - entry.enqueued_at
+        self._dispatched += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._recent_waits.append(wait)
+
+        task = entry.task = asyncio.create_task(self._run(entry))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, entry: QueuedTest):
+        result = None
+        try:
+            if self._runner is None:
+                raise RuntimeError("Scheduler has no runner configured")
+            result = await self._runner(entry)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Scheduled test {entry.target.key} failed: {e}")
+        finally:
+            self._running.pop(entry.target.key, None)
+            self._release_host(entry.host)
+            if entry.done is not None and not entry.done.done():
+                entry.done.set_result(result)
+            self._slot_freed()
+
+    def cancel(self, key: str) -> Optional[str]:
+        """
+        Drop a queued target or cancel its running test task (its container is
+        removed as the task unwinds). Returns "queued"/"running", or None.
+        """
+        entry = self._pending.pop(key, None)
+        if entry is not None:
+            # The heap item becomes stale and is skipped on dispatch
+            if entry.done is not None and not entry.done.done():
+                entry.done.set_result(None)
+            return "queued"
+        entry = self._running.get(key)
+        if entry is not None and entry.task is not None and not entry.task.done():
+            entry.task.cancel()
+            return "running"
+        return None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._running)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, in-flight tests and wait-time statistics"""
+        recent = sorted(self._recent_waits)
+        return {
+            "queue_depth": self.queue_depth,
+            "running": self.in_flight,
+            "held_slots": self._held,
+            "max_concurrent": self.max_concurrent,
+            "max_per_host": self.max_per_host,
+            "running_per_host": dict(self._host_running),
+            "dispatched_total": self._dispatched,
+            "avg_wait_seconds": round(self._total_wait / self._dispatched, 3) if self._dispatched else 0.0,
+            "max_wait_seconds": round(self._max_wait, 3),
+            "p50_wait_seconds": round(recent[len(recent) // 2], 3) if recent else 0.0,
+            "queued": [entry.describe() for entry in sorted(self._pending.values(), key=lambda e: (e.priority, e.enqueued_at))],
+            "in_flight": [entry.describe() for entry in self._running.values()],
+        }
+
+
+def target_offset(key: str, interval: float) -> float:
+    """Deterministic position of a target within its interval window"""
+    digest = hashlib.sha256(key.encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 * interval
+
+
+class PeriodicScheduler:
+    """
+    Re-queues every target once per interval (test.interval_minutes, or the
+    repository entry's interval_minutes). Each target gets a fixed slot in the
+    window derived from its key, so runs are spread evenly and stay put across
+    restarts; a little random jitter keeps equal slots from lining up exactly.
+    """
+
+    def __init__(self):
+        self._trigger: Optional[Callable[[List[Target]], Any]] = None
+        self._has_result: Optional[Callable[[str], bool]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._due: Dict[str, float] = {}
+        self._intervals: Dict[str, float] = {}
+        self._config = None
+
+    def configure(self, trigger: Callable[[List[Target]], Any], has_result: Callable[[str], bool]):
+        """
+        ``trigger(targets)`` queues targets; ``has_result(key)`` tells whether a
+        target already has a result (those wait for their slot after a restart)
+        """
+        self._trigger = trigger
+        self._has_result = has_result
+
+    @property
+    def options(self) -> Mapping[str, Any]:
+        return config_store.get().section("test")
+
+    def interval_for(self, target: Target) -> float:
+        """Interval in seconds; 0 disables periodic runs for the target"""
+        minutes = target.interval_minutes
+        if minutes is None:
+            minutes = self.options.get("interval_minutes", settings.test_interval_minutes)
+        return max(0.0, float(minutes) * 60)
+
+    @property
+    def jitter(self) -> float:
+        return max(0.0, float(self.options.get("interval_jitter_seconds", settings.test_interval_jitter_seconds)))
+
+    def next_slot(self, target: Target, now: float) -> Optional[float]:
+        """Next wall-clock time at or after ``now`` in the target's slot, plus jitter"""
+        interval = self.interval_for(target)
+        if interval <= 0:
+            return None
+        offset = target_offset(target.key, interval)
+        slot = (now - offset) // interval * interval + offset
+        if slot < now:
+            slot += interval
+        # Never jitter by more than a quarter window, so consecutive runs can't merge
+        jitter = min(self.jitter, interval / 4)
+        return slot + random.uniform(-jitter, jitter)
+
+    def _reschedule(self, now: float, initial: bool = False):
+        config = config_store.get()
+        self._config = config
+        due = {}
+        intervals = {target.key: self.interval_for(target) for target in config.targets}
+        for target in config.targets:
+            previous = self._due.get(target.key)
+            if previous is not None and intervals[target.key] == self._intervals.get(target.key):
+                due[target.key] = previous
+                continue
+            if intervals[target.key] <= 0:
+                # Periodic runs turned off for this target
+                continue
+            if initial and self._has_result is not None and not self._has_result(target.key):
+                # Never tested: run now rather than waiting up to a full interval
+                due[target.key] = now
+                continue
+            slot = self.next_slot(target, now)
+            if slot is not None:
+                due[target.key] = slot
+        self._due = due
+        self._intervals = intervals
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._due = {}
+            self._reschedule(time.time(), initial=True)
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            now = time.time()
+            if config_store.get() is not self._config:
+                # Targets or intervals changed: keep existing slots, add/drop the rest
+                self._reschedule(now)
+
+            due = [key for key, when in self._due.items() if when <= now]
+            if due:
+                config = self._config
+                targets = []
+                for key in due:
+                    target = config.get(key)
+                    # Half a window ahead: past this slot even if jitter fired it early
+                    slot = None if target is None else self.next_slot(target, now + self._intervals.get(key, 0.0) / 2)
+                    if slot is None:
+                        # Gone from the config or periodic runs turned off: drop without running
+                        self._due.pop(key, None)
+                        continue
+                    self._due[key] = slot
+                    targets.append(target)
+                try:
+                    if self._trigger is not None and targets:
+                        self._trigger(targets)
+                except Exception as e:
+                    logger.error(f"Periodic trigger failed: {e}")
+
+            next_due = min(self._due.values(), default=now + 60)
+            # Wake at least every 30s to notice config changes
+            await asyncio.sleep(min(max(next_due - time.time(), 0.05), 30))
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "jitter_seconds": self.jitter,
+            "next_runs": {key: round(when - now, 1) for key, when in sorted(self._due.items(), key=lambda item: item[1])},
+        }
+
+
+# Global scheduler instances
+test_scheduler = TestScheduler()
+periodic_scheduler = PeriodicScheduler()
@@ -2,10 +2,10 @@
 
 import asyncio
 import logging
-import yaml
 from typing import Dict, Any
 from datetime import datetime
 from models.test import TestResult, TestRequest
+from core.repo_config import config_store
 
 logger = logging.getLogger(__name__)
 
@@ -31,14 +31,11 @@ class TestService:
             "25.04": "oracular"
         }
         
-        # Load configuration
-        try:
-            with open('config.yaml', 'r') as file:
-                self.config = yaml.safe_load(file)
-        except Exception as e:
-            print(f"Error reading config file: {e}")
-            self.config = {}
-    
+    @property
+    def config(self):
+        """Compiled configuration shared with the API layer (hot-reloaded)"""
+        return config_store.get().raw
+
     def get_codename_for_version(self, distribution: str, version: str) -> str:
         """
         Get the codename for a given distribution and version
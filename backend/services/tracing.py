@@ -0,0 +1,203 @@
+# Linux Mirror Testing Solution - Run Trace Spans
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from core.repo_config import config_store
+
+logger = logging.getLogger(__name__)
+
+# Span new spans are attached to; set for the duration of a test run
+current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed step of a run, measured with the monotonic nanosecond clock"""
+
+    __slots__ = ("name", "span_id", "parent", "start_ns", "end_ns", "attributes", "children", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes: Any):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.start_ns = time.monotonic_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def end(self, error: Optional[str] = None):
+        if self.end_ns is None:
+            self.end_ns = time.monotonic_ns()
+        if error is not None:
+            self.error = error
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.monotonic_ns()) - self.start_ns
+
+    @property
+    def duration(self) -> float:
+        """Elapsed seconds, up to now while the span is still open"""
+        return self.duration_ns / 1e9
+
+    def end_open(self):
+        """End this span and any descendants left open (e.g. a failed DNS lookup)"""
+        for child in self.children:
+            child.end_open()
+        if self.end_ns is None:
+            self.end(error="unfinished")
+
+    def to_dict(self, origin_ns: int) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "offset_seconds": round((self.start_ns - origin_ns) / 1e9, 6),
+            "duration_seconds": round(self.duration, 6),
+            "open": self.end_ns is None,
+            "error": self.error,
+            "attributes": self.attributes,
+            "children": [child.to_dict(origin_ns) for child in self.children],
+        }
+
+
+class Trace:
+    """The span tree of one test run"""
+
+    def __init__(self, name: str, **attributes: Any):
+        self.trace_id = uuid.uuid4().hex
+        self.wall_start_ns = time.time_ns()
+        self.root = Span(name, **attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"trace_id": self.trace_id, "started_at_unix_nano": self.wall_start_ns, **self.root.to_dict(self.root.start_ns)}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON (ExportTraceServiceRequest) with wall-clock times anchored at the run start"""
+        spans = []
+
+        def unix_ns(monotonic_ns: int) -> str:
+            return str(self.wall_start_ns + monotonic_ns - self.root.start_ns)
+
+        def visit(span: Span):
+            spans.append({
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent.span_id if span.parent is not None else "",
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": unix_ns(span.start_ns),
+                "endTimeUnixNano": unix_ns(span.end_ns or time.monotonic_ns()),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            })
+            for child in span.children:
+                visit(child)
+
+        visit(self.root)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "mirror-test"}}]},
+            "scopeSpans": [{"scope": {"name": "mirror-test.runs"}, "spans": spans}],
+        }]}
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def start_span(name: str, **attributes: Any) -> Span:
+    """
+    Open a child of the current span without making it current; for steps
+    that begin and end in callbacks. Detached when no run is being traced.
+    """
+    return Span(name, current_span.get(), **attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """Time the enclosed block as a child of the current span"""
+    step = Span(name, current_span.get(), **attributes)
+    token = current_span.set(step)
+    try:
+        yield step
+    except BaseException as e:
+        step.end(error=str(e) or type(e).__name__)
+        raise
+    finally:
+        current_span.reset(token)
+        step.end()
+
+
+class Tracer:
+    """
+    Keeps the trace of each target's current (or last) run and, when
+    ``test.tracing.export`` is on, appends finished traces to
+    ``test.tracing.file`` as one JSON document per line (OTLP/JSON, or the
+    plain span tree with ``format: json``).
+    """
+
+    def __init__(self):
+        self._traces: Dict[str, Trace] = {}
+        self._file_lock = threading.Lock()
+
+    @property
+    def options(self):
+        return config_store.get().section("test").get("tracing", {})
+
+    @property
+    def export_enabled(self) -> bool:
+        return bool(self.options.get("export", settings.trace_export_enabled))
+
+    @property
+    def export_file(self) -> str:
+        return self.options.get("file", settings.trace_export_file)
+
+    @property
+    def export_format(self) -> str:
+        return self.options.get("format", settings.trace_export_format)
+
+    def start_run(self, key: str, **attributes: Any) -> Trace:
+        """Begin a run's trace and make its root the current span of this task"""
+        trace = self._traces[key] = Trace("test_run", target=key, **attributes)
+        current_span.set(trace.root)
+        return trace
+
+    def finish_run(self, key: str, trace: Trace, status: Optional[str] = None):
+        trace.root.attributes["status"] = status
+        trace.root.end(error=None if status in ("success", "partial") else status)
+        trace.root.end_open()
+        current_span.set(None)
+        if self.export_enabled:
+            document = trace.to_dict() if self.export_format == "json" else trace.to_otlp()
+            task = asyncio.get_running_loop().run_in_executor(None, self._append, json.dumps(document, default=str))
+            task.add_done_callback(lambda f: f.exception() and logger.error(f"Failed to export trace for {key}: {f.exception()}"))
+
+    def get(self, key: str) -> Optional[Trace]:
+        return self._traces.get(key)
+
+    def _append(self, line: str):
+        directory = os.path.dirname(self.export_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._file_lock, open(self.export_file, "a") as file:
+            file.write(line + "\n")
+
+
+# Global tracer instance
+tracer = Tracer()
@@ -0,0 +1,42 @@
+# Linux Mirror Testing Solution - Container Process Tests
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.endpoints import test as endpoints
+from services.container_pool import WarmContainer
+from services.docker_client import DockerAPIError
+
+
+@pytest.mark.parametrize("error", [DockerAPIError(500, "exec failed"), asyncio.CancelledError()])
+def test_failed_exec_releases_the_lease(monkeypatch, error):
+    lease = WarmContainer("pooled-container", "debian:12")
+    removed = []
+
+    async def acquire(image):
+        return lease
+
+    async def exec(container_id, command, env=None):
+        raise error
+
+    async def remove_container(container_id, force=True):
+        removed.append(container_id)
+
+    monkeypatch.setattr(endpoints.container_pool, "acquire", acquire)
+    monkeypatch.setattr(endpoints.docker_client, "exec", exec)
+    monkeypatch.setattr(endpoints.docker_client, "remove_container", remove_container)
+
+    async def run():
+        with pytest.raises(type(error)):
+            async with endpoints.container_process("Debian", "12", "debian:12", ["true"], "update"):
+                pass
+        await asyncio.gather(*endpoints.container_pool._background)
+
+    asyncio.run(run())
+    assert removed == ["pooled-container"]
+    assert "Debian-12" not in endpoints.active_containers
@@ -0,0 +1,120 @@
+# Linux Mirror Testing Solution - Periodic Scheduler Tests
+
+import asyncio
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.repo_config import ConfigStore
+from services import scheduler
+from services.scheduler import PeriodicScheduler
+
+
+def write_config(path, config):
+    path.write_text(yaml.safe_dump(config))
+
+
+def use_config(monkeypatch, tmp_path, config):
+    path = tmp_path / "config.yaml"
+    write_config(path, config)
+    monkeypatch.setattr(scheduler, "config_store", ConfigStore(str(path), check_interval=0))
+    return path
+
+
+def debian_interval(minutes):
+    return {
+        "repositories": {
+            "debian": [{"url": "http://mirror/debian", "distributions": ["12"], "interval_minutes": minutes}],
+            "rocky": [{"url": "http://mirror/rocky", "distributions": ["9"]}],
+        },
+        "test": {"interval_minutes": 60, "interval_jitter_seconds": 0},
+    }
+
+
+def test_interval_zero_target_is_never_run(monkeypatch, tmp_path):
+    use_config(monkeypatch, tmp_path, debian_interval(0))
+    triggered = []
+
+    async def run():
+        periodic = PeriodicScheduler()
+        periodic.configure(lambda targets: triggered.extend(target.key for target in targets), lambda key: False)
+        periodic.start()
+        await asyncio.sleep(0.2)
+        assert list(periodic.stats()["next_runs"]) == ["Rocky-9"]
+        await periodic.stop()
+
+    asyncio.run(run())
+    assert triggered == ["Rocky-9"]
+
+
+def test_target_disabled_by_config_reload_is_dropped(monkeypatch, tmp_path):
+    path = use_config(monkeypatch, tmp_path, debian_interval(30))
+    triggered = []
+
+    async def run():
+        periodic = PeriodicScheduler()
+        periodic.configure(lambda targets: triggered.extend(target.key for target in targets), lambda key: False)
+        # Both targets are untested, so both are due right away
+        periodic.start()
+        assert sorted(periodic.stats()["next_runs"]) == ["Debian-12", "Rocky-9"]
+        # Turned off before the loop gets to run it
+        write_config(path, debian_interval(0))
+        await asyncio.sleep(0.2)
+        assert list(periodic.stats()["next_runs"]) == ["Rocky-9"]
+        await periodic.stop()
+
+    asyncio.run(run())
+    assert triggered == ["Rocky-9"]
+
+
+def test_all_targets_disabled(monkeypatch, tmp_path):
+    use_config(monkeypatch, tmp_path, {
+        "repositories": {"debian": [{"url": "http://mirror/debian", "distributions": ["12"]}]},
+        "test": {"interval_minutes": 0},
+    })
+    triggered = []
+
+    async def run():
+        periodic = PeriodicScheduler()
+        periodic.configure(triggered.extend, lambda key: False)
+        periodic.start()
+        await asyncio.sleep(0.2)
+        assert periodic.stats()["next_runs"] == {}
+        await periodic.stop()
+
+    asyncio.run(run())
+    assert triggered == []
+
+
+def test_held_slots_count_against_the_test_limit(monkeypatch, tmp_path):
+    use_config(monkeypatch, tmp_path, {
+        "repositories": {"debian": [{"url": "http://mirror/debian", "distributions": ["11", "12"]}]},
+        "test": {"max_concurrent_tests": 1},
+    })
+    ran = []
+
+    async def run():
+        tests = scheduler.TestScheduler()
+
+        async def runner(entry):
+            ran.append(entry.target.key)
+
+        tests.configure(runner)
+        first, second = scheduler.config_store.get().targets
+        async with tests.slot(first):
+            entry = tests.submit(second)
+            await asyncio.sleep(0.05)
+            assert ran == []
+            # A second holder waits too
+            waiting = asyncio.create_task(tests.slot(first).__aenter__())
+            await asyncio.sleep(0.05)
+            assert not waiting.done()
+            waiting.cancel()
+        await asyncio.wait_for(entry.done, 1)
+        await tests.stop()
+
+    asyncio.run(run())
+    assert ran == ["Debian-12"]
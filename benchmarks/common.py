@@ -0,0 +1,105 @@
+# Linux Mirror Testing Solution - Benchmark Helpers
+
+import asyncio
+import os
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "backend")
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(values: List[float], digits: int = 4) -> Dict[str, Optional[float]]:
+    p50, p99 = percentile(values, 0.5), percentile(values, 0.99)
+    return {
+        "p50": round(p50, digits) if p50 is not None else None,
+        "p99": round(p99, digits) if p99 is not None else None,
+        "count": len(values),
+    }
+
+
+class LoopLagMonitor:
+    """Samples how late a short sleep wakes up: time the event loop was blocked"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def summary_ms(self) -> Dict[str, Optional[float]]:
+        samples = [lag * 1000 for lag in self.samples]
+        summary = summarize(samples, 2)
+        return {"p50": summary["p50"], "p99": summary["p99"], "max": round(max(samples, default=0.0), 2)}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def synthetic_versions(count: int) -> Tuple[List[str], List[str]]:
+    """(Debian, Rocky) versions of ``count`` targets: mostly APT, plus a few RPM targets"""
+    rocky = ["8", "9", "10"][:min(3, count // 20)]
+    return [f"bench{index:04d}" for index in range(count - len(rocky))], rocky
+
+
+def synthetic_config(count: int, mirror_url: str, concurrency: int) -> Dict[str, Any]:
+    """config.yaml for ``count`` targets (see synthetic_versions)"""
+    debian, rocky = synthetic_versions(count)
+    repositories = {"debian": [{"url": f"{mirror_url}/debian", "distributions": debian}]}
+    if rocky:
+        repositories["rocky"] = [{"url": f"{mirror_url}/rocky", "distributions": rocky}]
+    return {
+        "repositories": repositories,
+        "test": {
+            "interval_minutes": 0,
+            "max_concurrent_tests": concurrency,
+            "max_concurrent_per_host": concurrency,
+            "verify_metadata": True,
+            "skip_unchanged": False,
+            "combined_pipeline": True,
+            "logs": {"persist": False},
+        },
+        "container": {"pool": {"enabled": False}},
+        "database": {"path": "benchmark.db"},
+    }
+
+
+def write_config(directory: str, config: Dict[str, Any]) -> str:
+    path = os.path.join(directory, "config.yaml")
+    with open(path, "w") as file:
+        yaml.safe_dump(config, file)
+    return path
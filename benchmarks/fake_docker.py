@@ -0,0 +1,228 @@
+# Linux Mirror Testing Solution - Benchmark Docker Engine API Stand-in
+
+import asyncio
+import itertools
+import random
+import re
+import struct
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+# Marker lines of the combined pipeline script, e.g. echo '@@phase update start'
+PHASE_LINE = re.compile(r"""echo ['"]@@phase (\w+) start""")
+
+
+class FakeDockerOptions:
+    """Latency, output volume and failure behaviour of the stand-in daemon"""
+
+    def __init__(self, create_latency: float = 0.005, start_latency: float = 0.01,
+                 phase_seconds: float = 0.05, output_lines: int = 50,
+                 failure_rate: float = 0.0, seed: int = 1):
+        self.create_latency = create_latency
+        self.start_latency = start_latency
+        self.phase_seconds = phase_seconds   # time each script phase "runs"
+        self.output_lines = output_lines     # lines of output per phase
+        self.failure_rate = failure_rate     # fraction of runs whose update hits a fatal 404
+        self.seed = seed
+
+
+def _frame(data: bytes) -> bytes:
+    # Multiplexed stdout frame: stream type, 3 pad bytes, big-endian size
+    return struct.pack(">BxxxL", 1, len(data)) + data
+
+
+def _phase_output(phase: str, apt: bool, count: int) -> List[str]:
+    if phase == "update":
+        if apt:
+            lines = [f"Get:{i} http://mirror bench/main amd64 Packages [{i % 97 + 1}.{i % 10} kB]\n" for i in range(count)]
+            return lines + ["Reading package lists... Done\n"]
+        return [f"BaseOS {i} kB/s | {i % 97 + 1} kB 00:00\n" for i in range(count)] + ["Metadata cache created.\n"]
+    if apt:
+        lines = [f"Unpacking pkg{i} (1.0-{i}) ...\n" for i in range(count)]
+        return lines + ["Setting up nano (7.2-1) ...\n"]
+    return [f"  Installing       : pkg{i}-1.0-{i}.x86_64     {i}/{count}\n" for i in range(count)] + ["Installed:\n", "Complete!\n"]
+
+
+def _fatal_line(apt: bool) -> str:
+    if apt:
+        return "E: Failed to fetch http://mirror/dists/bench/main/binary-amd64/Packages  404  Not Found\n"
+    return "Error: Failed to download metadata for repo 'bench-baseos'\n"
+
+
+class Container:
+    """One stand-in container: output is produced in chunks over phase_seconds per phase"""
+
+    def __init__(self, container_id: str, name: Optional[str], command: List[str], labels: Dict[str, str]):
+        self.id = container_id
+        self.name = name
+        self.command = command
+        self.labels = labels
+        self.created = int(time.time())
+        self.lines: List[str] = []
+        self.returncode: Optional[int] = None
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+    async def emit(self, lines: List[str]):
+        async with self.changed:
+            self.lines.extend(lines)
+            self.changed.notify_all()
+
+    async def finish(self, returncode: int):
+        async with self.changed:
+            if self.returncode is None:
+                self.returncode = returncode
+            self.changed.notify_all()
+
+
+class FakeDocker:
+    """
+    The subset of the Docker Engine API the backend's DockerClient uses,
+    served from memory. Containers "run" the test script by emitting
+    synthetic apt/dnf output between the script's phase markers.
+    """
+
+    def __init__(self, options: FakeDockerOptions):
+        self.options = options
+        self.random = random.Random(options.seed)
+        self.containers: Dict[str, Container] = {}
+        self._ids = itertools.count(1)
+        self.created_total = 0
+
+    def find(self, reference: str) -> Optional[Container]:
+        container = self.containers.get(reference)
+        if container is None:
+            container = next((c for c in self.containers.values() if c.name == reference), None)
+        return container
+
+    async def run_script(self, container: Container):
+        script = container.command[-1] if container.command else ""
+        apt = "apt-get" in script
+        phases = PHASE_LINE.findall(script) or ["update", "install"]
+        fail = self.random.random() < self.options.failure_rate
+        chunks = max(1, min(10, self.options.output_lines))
+        per_chunk = self.options.phase_seconds / chunks
+        try:
+            for phase in phases:
+                await container.emit([f"@@phase {phase} start\n"])
+                output = _phase_output(phase, apt, self.options.output_lines)
+                size = max(1, len(output) // chunks)
+                for start in range(0, len(output), size):
+                    await asyncio.sleep(per_chunk)
+                    await container.emit(output[start:start + size])
+                if fail and phase == "update":
+                    await container.emit([_fatal_line(apt), f"@@phase {phase} end 100\n"])
+                    await container.finish(100)
+                    return
+                await container.emit([f"@@phase {phase} end 0\n"])
+            await container.finish(0)
+        except asyncio.CancelledError:
+            await container.finish(137)
+
+    # Engine API handlers
+
+    async def ping(self, request):
+        return web.Response(text="OK")
+
+    async def create(self, request):
+        await asyncio.sleep(self.options.create_latency)
+        body = await request.json()
+        name = request.query.get("name")
+        if name and self.find(name) is not None:
+            return web.json_response({"message": f"Conflict. The container name /{name} is already in use"}, status=409)
+        container_id = f"{next(self._ids):064x}"
+        self.containers[container_id] = Container(container_id, name, body.get("Cmd") or [], body.get("Labels") or {})
+        self.created_total += 1
+        return web.json_response({"Id": container_id}, status=201)
+
+    async def start(self, request):
+        container = self.find(request.match_info["id"])
+        if container is None:
+            return web.json_response({"message": "No such container"}, status=404)
+        await asyncio.sleep(self.options.start_latency)
+        if container.task is None:
+            container.task = asyncio.create_task(self.run_script(container))
+        return web.Response(status=204)
+
+    async def logs(self, request):
+        container = self.find(request.match_info["id"])
+        if container is None:
+            return web.json_response({"message": "No such container"}, status=404)
+        response = web.StreamResponse()
+        await response.prepare(request)
+        sent = 0
+        while True:
+            async with container.changed:
+                await container.changed.wait_for(lambda: len(container.lines) > sent or container.returncode is not None)
+                pending = container.lines[sent:]
+                done = container.returncode is not None
+            sent += len(pending)
+            if pending:
+                await response.write(_frame("".join(pending).encode()))
+            if done and sent == len(container.lines):
+                break
+        await response.write_eof()
+        return response
+
+    async def wait(self, request):
+        container = self.find(request.match_info["id"])
+        if container is None:
+            return web.json_response({"message": "No such container"}, status=404)
+        async with container.changed:
+            await container.changed.wait_for(lambda: container.returncode is not None)
+        return web.json_response({"StatusCode": container.returncode})
+
+    async def inspect(self, request):
+        container = self.find(request.match_info["id"])
+        if container is None:
+            return web.json_response({"message": "No such container"}, status=404)
+        return web.json_response({"Id": container.id, "State": {"Running": container.returncode is None, "OOMKilled": False}})
+
+    async def kill(self, request):
+        container = self.find(request.match_info["id"])
+        if container is None:
+            return web.json_response({"message": "No such container"}, status=404)
+        if container.task is not None and not container.task.done():
+            container.task.cancel()
+        else:
+            await container.finish(137)
+        return web.Response(status=204)
+
+    async def delete(self, request):
+        container = self.find(request.match_info["id"])
+        if container is None:
+            return web.json_response({"message": "No such container"}, status=404)
+        self.containers.pop(container.id, None)
+        if container.task is not None:
+            container.task.cancel()
+        return web.Response(status=204)
+
+    async def list(self, request):
+        return web.json_response([
+            {"Id": c.id, "Names": [f"/{c.name or c.id[:12]}"], "Labels": c.labels, "Created": c.created}
+            for c in self.containers.values()
+        ])
+
+    async def image(self, request):
+        return web.json_response({"Id": "sha256:" + "0" * 64})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        prefix = "/{version}"
+        app.add_routes([
+            web.get("/_ping", self.ping),
+            web.get(prefix + "/_ping", self.ping),
+            web.post(prefix + "/images/create", self.ping),
+            web.get(prefix + "/images/{name:.*}/json", self.image),
+            web.post(prefix + "/containers/create", self.create),
+            web.get(prefix + "/containers/json", self.list),
+            web.post(prefix + "/containers/{id}/start", self.start),
+            web.get(prefix + "/containers/{id}/logs", self.logs),
+            web.post(prefix + "/containers/{id}/wait", self.wait),
+            web.get(prefix + "/containers/{id}/json", self.inspect),
+            web.post(prefix + "/containers/{id}/kill", self.kill),
+            web.delete(prefix + "/containers/{id}", self.delete),
+        ])
+        return app
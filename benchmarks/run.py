@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+"""
+Offline end-to-end benchmark of the test pipeline.
+
+Runs 20, 200 and 2000 (by default) synthetic targets through the scheduler
+and test_repository_comprehensive() against a stand-in Docker Engine API and
+a generated mirror (synthetic_mirror.py), both served from a separate local
+process. Each target count runs in a fresh backend process so peak RSS is per
+run.
+
+Reports throughput, p50/p99 latency per phase, event-loop lag and peak RSS,
+and compares them with a saved baseline:
+
+    python benchmarks/run.py --save-baseline        # record benchmarks/baseline.json
+    python benchmarks/run.py                        # compare; exit 1 on regressions
+    python benchmarks/run.py --targets 200 --failure-rate 0.1 --phase-seconds 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from common import (BACKEND_DIR, BENCHMARK_DIR, LoopLagMonitor, peak_rss_mb, summarize, synthetic_config,
+                    synthetic_versions, write_config)
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+PHASES = ("connectivity", "metadata", "update", "install")
+# Differences smaller than these are noise, whatever the relative change
+LATENCY_FLOOR_SECONDS = 0.005
+LOOP_LAG_FLOOR_MS = 2.0
+
+
+# Stand-in process
+
+def build_mirror(root: str, targets: int, mirror_options: Dict[str, Any]):
+    """
+    Generate the mirror for up to ``targets`` targets. The Debian targets all
+    share one generated suite (their codenames are links to it), so the tree
+    stays small however many targets run.
+    """
+    from synthetic_mirror import MirrorSpec, generate, link_suites
+
+    debian, rocky = synthetic_versions(targets)
+    spec = MirrorSpec(apt={"debian": ["bench"]}, yum={"rocky": rocky} if rocky else {},
+                      packages=mirror_options["packages"], yum_components=["BaseOS"], stubs="none",
+                      seed=mirror_options["seed"])
+    generate(root, spec)
+    link_suites(root, spec, "debian", "bench", debian)
+
+
+def serve_standins(docker_options: Dict[str, Any], mirror_options: Dict[str, Any], targets: int, ready):
+    """Serve the fake Docker daemon and a generated mirror until terminated"""
+    from aiohttp import web
+    from fake_docker import FakeDocker, FakeDockerOptions
+    from synthetic_mirror import MirrorServer
+
+    async def main(root: str):
+        runner = web.AppRunner(FakeDocker(FakeDockerOptions(**docker_options)).app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0, backlog=1024)
+        await site.start()
+        mirror = MirrorServer(root, delay=mirror_options["latency"], error_rate=mirror_options["error_rate"],
+                              seed=mirror_options["seed"])
+        server = await mirror.start()
+        ready.send([site._server.sockets[0].getsockname()[1], server.sockets[0].getsockname()[1]])
+        await asyncio.Event().wait()
+
+    with tempfile.TemporaryDirectory(prefix="mirror-bench-tree-") as workdir:
+        root = os.path.join(workdir, "mirror")
+        build_mirror(root, targets, mirror_options)
+        asyncio.run(main(root))
+
+
+# Worker (one target count, fresh process)
+
+async def run_worker(result_path: str):
+    """Run every configured target once through the scheduler (cwd holds config.yaml)"""
+    sys.path.insert(0, BACKEND_DIR)
+    from api.endpoints.test import schedule_tests, test_tracker
+    from services.docker_client import docker_client
+    from services.http_client import http_client
+    from services.results_store import results_store
+    from services.scheduler import test_scheduler
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    results_store.start()
+    test_scheduler.start()
+
+    started = time.monotonic()
+    entries = schedule_tests(manual=True, reason="benchmark")
+    await asyncio.gather(*(entry.done for entry in entries))
+    wall = time.monotonic() - started
+
+    await monitor.stop()
+    await test_scheduler.stop()
+    await docker_client.close()
+    await http_client.close()
+    await asyncio.to_thread(results_store.stop)
+
+    statuses: Dict[str, int] = {}
+    latency: Dict[str, List[float]] = {phase: [] for phase in ("run", "queue_wait") + PHASES}
+    for entry in entries:
+        latency["queue_wait"].append(entry.started_at - entry.enqueued_at)
+    for info in test_tracker.values():
+        statuses[info["status"]] = statuses.get(info["status"], 0) + 1
+        latency["run"].append(info.get("duration", 0.0))
+        for phase, result in info.get("test_results", {}).items():
+            if result["status"] not in ("skipped", "unchanged", "pending", "cancelled"):
+                latency[phase].append(result["duration"])
+
+    result = {
+        "targets": len(entries),
+        "wall_seconds": round(wall, 3),
+        "throughput_per_second": round(len(entries) / wall, 2) if wall else None,
+        "statuses": statuses,
+        "latency_seconds": {name: summarize(values) for name, values in latency.items()},
+        "loop_lag_ms": monitor.summary_ms(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    with open(result_path, "w") as file:
+        json.dump(result, file, indent=2)
+
+
+# Orchestration
+
+def run_size(count: int, docker_port: int, mirror_port: int, args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix=f"mirror-bench-{count}-") as workdir:
+        write_config(workdir, synthetic_config(count, f"http://127.0.0.1:{mirror_port}", args.concurrency))
+        result_path = os.path.join(workdir, "result.json")
+        env = {**os.environ, "DOCKER_HOST": f"tcp://127.0.0.1:{docker_port}"}
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", result_path],
+            cwd=workdir, env=env, timeout=args.timeout,
+            stdout=None if args.verbose else subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        if process.returncode != 0 or not os.path.exists(result_path):
+            tail = (process.stdout or "")[-2000:]
+            raise RuntimeError(f"Benchmark worker for {count} targets failed ({process.returncode}):\n{tail}")
+        with open(result_path) as file:
+            return json.load(file)
+
+
+def format_seconds(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    return f"{value * 1000:.1f}ms" if value < 1 else f"{value:.2f}s"
+
+
+def print_result(result: Dict[str, Any]):
+    statuses = ", ".join(f"{status} {count}" for status, count in sorted(result["statuses"].items()))
+    print(f"\n{result['targets']} targets: {result['wall_seconds']}s wall, "
+          f"{result['throughput_per_second']} targets/s ({statuses})")
+    print(f"  {'latency':<14}{'p50':>10}{'p99':>10}{'n':>7}")
+    for name, summary in result["latency_seconds"].items():
+        print(f"  {name:<14}{format_seconds(summary['p50']):>10}{format_seconds(summary['p99']):>10}{summary['count']:>7}")
+    lag = result["loop_lag_ms"]
+    print(f"  loop lag      p50 {lag['p50']}ms  p99 {lag['p99']}ms  max {lag['max']}ms")
+    print(f"  peak RSS      {result['peak_rss_mb']} MB")
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of ``results`` against the baseline's, as readable lines"""
+    regressions = []
+    for size, current in results.items():
+        previous = baseline.get("results", {}).get(size)
+        if previous is None:
+            continue
+        if current["throughput_per_second"] < previous["throughput_per_second"] * (1 - tolerance):
+            regressions.append(f"{size} targets: throughput {previous['throughput_per_second']} -> {current['throughput_per_second']}/s")
+        for name, summary in current["latency_seconds"].items():
+            old = previous["latency_seconds"].get(name, {}).get("p99")
+            new = summary["p99"]
+            if old is not None and new is not None and new > old * (1 + tolerance) and new - old > LATENCY_FLOOR_SECONDS:
+                regressions.append(f"{size} targets: {name} p99 {format_seconds(old)} -> {format_seconds(new)}")
+        old_lag, new_lag = previous["loop_lag_ms"]["p99"], current["loop_lag_ms"]["p99"]
+        if old_lag is not None and new_lag is not None and new_lag > old_lag * (1 + tolerance) and new_lag - old_lag > LOOP_LAG_FLOOR_MS:
+            regressions.append(f"{size} targets: loop lag p99 {old_lag}ms -> {new_lag}ms")
+        if current["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{size} targets: peak RSS {previous['peak_rss_mb']} -> {current['peak_rss_mb']} MB")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the test pipeline")
+    parser.add_argument("--targets", type=int, nargs="+", default=[20, 200, 2000], help="target counts to run")
+    parser.add_argument("--concurrency", type=int, default=20, help="test.max_concurrent_tests (and per host)")
+    parser.add_argument("--create-latency", type=float, default=0.005, help="fake container create latency (s)")
+    parser.add_argument("--start-latency", type=float, default=0.01, help="fake container start latency (s)")
+    parser.add_argument("--phase-seconds", type=float, default=0.05, help="time each script phase runs (s)")
+    parser.add_argument("--output-lines", type=int, default=50, help="container output lines per phase")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="fraction of runs whose update fails")
+    parser.add_argument("--packages", type=int, default=2000, help="packages per mirror index")
+    parser.add_argument("--mirror-latency", type=float, default=0.002, help="mirror response latency (s)")
+    parser.add_argument("--mirror-error-rate", type=float, default=0.0, help="fraction of mirror requests answered 503")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to compare with or save")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative change reported as a regression")
+    parser.add_argument("--timeout", type=float, default=1800, help="per target count, in seconds")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the backend's output")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.worker:
+        asyncio.run(run_worker(args.worker))
+        return 0
+
+    docker_options = {
+        "create_latency": args.create_latency, "start_latency": args.start_latency,
+        "phase_seconds": args.phase_seconds, "output_lines": args.output_lines,
+        "failure_rate": args.failure_rate, "seed": args.seed,
+    }
+    mirror_options = {
+        "packages": args.packages, "latency": args.mirror_latency,
+        "error_rate": args.mirror_error_rate, "seed": args.seed,
+    }
+    parameters = {**docker_options, **{f"mirror_{key}": value for key, value in mirror_options.items()},
+                  "concurrency": args.concurrency}
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    standins = multiprocessing.Process(target=serve_standins, args=(docker_options, mirror_options, max(args.targets), sender),
+                                       daemon=True)
+    standins.start()
+    try:
+        docker_port, mirror_port = receiver.recv()
+        print(f"Fake Docker on :{docker_port}, synthetic mirror on :{mirror_port}")
+        results = {}
+        for count in args.targets:
+            results[str(count)] = run_size(count, docker_port, mirror_port, args)
+            print_result(results[str(count)])
+    finally:
+        standins.terminate()
+        standins.join()
+
+    output = {"parameters": parameters, "results": results}
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(output, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(output, file, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get("parameters") != parameters:
+        print("\nWarning: baseline was recorded with different parameters; comparison may not be meaningful")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,608 @@
+#!/usr/bin/env python
+"""
+Synthetic mirror generator: deterministic local APT and yum/dnf repositories.
+
+Writes repositories with the structure the backend expects under a
+directory, one per distribution (or at the production mirror's paths with
+--production-layout, so test_packages.py and test_rhel_install_fix.py only
+need MIRROR_URL changed; the scripts that go through the backend API test
+whatever config.yaml points at, see the printed config snippet):
+
+- APT: ``<distro>/dists/<codename>/Release``, ``Packages{,.gz,.xz}`` and
+  installable ``.deb`` stubs under ``<distro>/pool``
+- yum/dnf: ``<distro>/<version>/<component>/<arch>/os/repodata/`` with
+  ``repomd.xml``, ``primary.xml.gz`` (plus filelists/other) and ``.rpm`` stubs
+  (a valid RPM lead only; they are not installable)
+
+The same seed always produces byte-identical trees. Faults are injected per
+repository (``kind:pattern[:value]``, pattern matched against ``distro/version``):
+
+- ``corrupt-checksum``: Release / repomd.xml list wrong digests for the indices
+- ``truncate``: the indices are cut to half their size
+- ``missing-index``: the indices are listed but absent
+- ``missing-package``: the install test packages are listed but absent from the pool
+- ``slow``: the server delays every response under the repository by VALUE seconds (default 1)
+
+A bundled asyncio HTTP server (no dependencies) serves the tree with
+keep-alive, ETag / Last-Modified conditional requests and optional global
+delay and error rate:
+
+    python benchmarks/synthetic_mirror.py generate /tmp/mirror --packages 5000
+    python benchmarks/synthetic_mirror.py generate /tmp/mirror --apt debian:11,12 --yum rocky:9 \\
+        --fault corrupt-checksum:debian/11 --fault slow:rocky/9:2
+    python benchmarks/synthetic_mirror.py serve /tmp/mirror --port 8080
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import mimetypes
+import os
+import random
+import shutil
+import struct
+import sys
+import tarfile
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from fnmatch import fnmatch
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+from xml.sax.saxutils import escape
+
+MANIFEST = "mirror.json"
+# Packages the install tests and RPM metadata verification look for
+TEST_PACKAGES = ("nano", "curl", "tree")
+FAULT_KINDS = ("corrupt-checksum", "truncate", "missing-index", "missing-package", "slow")
+# Same mapping as the backend's get_codename()
+CODENAMES = {
+    "debian": {"7": "wheezy", "8": "jessie", "9": "stretch", "10": "buster", "11": "bullseye", "12": "bookworm", "13": "trixie"},
+    "ubuntu": {"18.04": "bionic", "20.04": "focal", "22.04": "jammy", "24.04": "noble"},
+}
+# Where the production mirror (config.yaml) keeps each distribution
+PRODUCTION_PATHS = {
+    "debian": "apt/debian/mirror/deb.debian.org/debian",
+    "ubuntu": "apt/ubuntu/mirror/archive.ubuntu.com/ubuntu",
+    "kali": "apt/kali/mirror/http.kali.org/kali",
+    "rocky": "yum/rocky/pub/rocky",
+    "rhel": "yum/rhel/pub/rhel",
+}
+DEFAULT_APT = ["debian:11,12", "ubuntu:22.04", "kali:kali-rolling"]
+DEFAULT_YUM = ["rocky:8,9", "rhel:9"]
+# Fixed timestamp for Release dates, archive members and repomd entries
+EPOCH = 946684800  # 2000-01-01
+
+
+class Fault:
+    """One injected fault: ``kind:pattern[:value]``"""
+
+    def __init__(self, kind: str, pattern: str, value: Optional[float] = None):
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"Unknown fault '{kind}' (expected one of {', '.join(FAULT_KINDS)})")
+        self.kind = kind
+        self.pattern = pattern
+        self.value = value
+
+    @classmethod
+    def parse(cls, spec: str) -> "Fault":
+        parts = spec.split(":")
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Invalid fault '{spec}' (expected kind:pattern[:value])")
+        return cls(parts[0], parts[1], float(parts[2]) if len(parts) == 3 else None)
+
+    def matches(self, repository_id: str) -> bool:
+        return fnmatch(repository_id, self.pattern)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "pattern": self.pattern, "value": self.value}
+
+
+class MirrorSpec:
+    """What to generate: repositories, their size and the faults to inject"""
+
+    def __init__(self, apt: Dict[str, List[str]], yum: Dict[str, List[str]], packages: int = 2000,
+                 apt_components=("main",), apt_architectures=("amd64",),
+                 yum_components=("BaseOS", "AppStream"), yum_architectures=("x86_64",),
+                 stubs: str = "all", faults: List[Fault] = (), production_layout: bool = False, seed: int = 1):
+        self.apt = apt                # distro -> versions
+        self.yum = yum                # distro -> versions
+        self.packages = packages      # packages per component and architecture
+        self.apt_components = list(apt_components)
+        self.apt_architectures = list(apt_architectures)
+        self.yum_components = list(yum_components)
+        self.yum_architectures = list(yum_architectures)
+        self.stubs = stubs            # "all", "test" (install test packages only) or "none"
+        self.faults = list(faults)
+        self.production_layout = production_layout  # distributions at the production mirror's paths
+        self.seed = seed
+
+    def base_path(self, distro: str) -> str:
+        """Directory of a distribution relative to the mirror root"""
+        return PRODUCTION_PATHS.get(distro, distro) if self.production_layout else distro
+
+    def faults_for(self, repository_id: str) -> Dict[str, Fault]:
+        return {fault.kind: fault for fault in self.faults if fault.matches(repository_id)}
+
+
+class Package:
+    def __init__(self, name: str, version: str, summary: str, depends: Optional[str], installed_size: int):
+        self.name = name
+        self.version = version
+        self.summary = summary
+        self.depends = depends
+        self.installed_size = installed_size
+
+
+def generate_packages(rng: random.Random, count: int, prefix: str, suffix: str = "",
+                      include_test_packages: bool = True) -> List[Package]:
+    names = list(TEST_PACKAGES if include_test_packages else ())
+    names += [f"{prefix}{index:06d}" for index in range(max(0, count - len(names)))]
+    packages = []
+    for name in names:
+        version = f"{rng.randint(0, 9)}.{rng.randint(0, 30)}-{rng.randint(1, 5)}{suffix}"
+        depends = packages[rng.randrange(len(packages))].name if packages and rng.random() < 0.2 else None
+        packages.append(Package(name, version, f"Synthetic package {name}", depends, rng.randint(8, 4096)))
+    return packages
+
+
+# Archive stubs
+
+def _tar_gz(files: Dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as compressed:
+        with tarfile.open(fileobj=compressed, mode="w", format=tarfile.GNU_FORMAT) as tar:
+            for path, data in files.items():
+                info = tarfile.TarInfo(path)
+                info.size, info.mtime, info.mode = len(data), EPOCH, 0o644
+                info.uname = info.gname = "root"
+                tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _ar_member(name: str, data: bytes) -> bytes:
+    header = f"{name:<16}{EPOCH:<12}{0:<6}{0:<6}{100644:<8}{len(data):<10}`\n".encode()
+    return header + data + (b"\n" if len(data) % 2 else b"")
+
+
+def build_deb(package: Package, arch: str) -> bytes:
+    """A minimal .deb that dpkg installs: a control file and one doc file"""
+    control = (
+        f"Package: {package.name}\nVersion: {package.version}\nArchitecture: {arch}\n"
+        f"Maintainer: Synthetic Mirror <mirror@example.invalid>\nInstalled-Size: {package.installed_size}\n"
+        f"Description: {package.summary}\n"
+    ).encode()
+    readme = f"{package.name} {package.version}\n".encode()
+    return (
+        b"!<arch>\n"
+        + _ar_member("debian-binary", b"2.0\n")
+        + _ar_member("control.tar.gz", _tar_gz({"./control": control}))
+        + _ar_member("data.tar.gz", _tar_gz({f"./usr/share/doc/{package.name}/README": readme}))
+    )
+
+
+def build_rpm_stub(package: Package, arch: str) -> bytes:
+    """An RPM lead (magic, v3.0, binary, NVR) followed by a marker; not installable"""
+    nvr = f"{package.name}-{package.version}".encode()[:65]
+    lead = struct.pack(">4sBBhh66shh16s", b"\xed\xab\xee\xdb", 3, 0, 0, 1, nvr, 1, 5, b"")
+    return lead + f"synthetic rpm stub for {package.name}.{arch}\n".encode()
+
+
+# Repository writers
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def _wrong_digest(data: bytes, algorithm: str) -> str:
+    return hashlib.new(algorithm, b"corrupt" + data).hexdigest()
+
+
+def _write_indices(directory: str, indices: Dict[str, bytes], faults: Dict[str, Fault]):
+    if "missing-index" in faults:
+        return
+    for path, data in indices.items():
+        _write(os.path.join(directory, path), data[:len(data) // 2] if "truncate" in faults else data)
+
+
+def _wants_stub(spec: MirrorSpec, package: Package, faults: Dict[str, Fault]) -> bool:
+    if package.name in TEST_PACKAGES:
+        return spec.stubs != "none" and "missing-package" not in faults
+    return spec.stubs == "all"
+
+
+def build_apt_repository(root: str, distro: str, version: str, spec: MirrorSpec) -> Dict[str, Any]:
+    repository_id = f"{distro}/{version}"
+    faults = spec.faults_for(repository_id)
+    codename = CODENAMES.get(distro, {}).get(version, version)
+    base = os.path.join(root, spec.base_path(distro))
+    indices: Dict[str, bytes] = {}
+    total = 0
+    for component_index, component in enumerate(spec.apt_components):
+        rng = random.Random(f"{spec.seed}:{repository_id}:{component}")
+        # Suites of one distribution share the pool, so versions carry the suite
+        packages = generate_packages(rng, spec.packages, f"synth-{component.lower()}-",
+                                     f"~{codename.replace('-', '')}", component_index == 0)
+        for arch in spec.apt_architectures:
+            stanzas = []
+            for package in packages:
+                deb = build_deb(package, arch)
+                filename = (f"pool/{component}/{package.name[0]}/{package.name}/"
+                            f"{package.name}_{package.version}_{arch}.deb")
+                if _wants_stub(spec, package, faults):
+                    _write(os.path.join(base, filename), deb)
+                stanza = (
+                    f"Package: {package.name}\nVersion: {package.version}\nArchitecture: {arch}\n"
+                    f"Maintainer: Synthetic Mirror <mirror@example.invalid>\nInstalled-Size: {package.installed_size}\n"
+                )
+                if package.depends:
+                    stanza += f"Depends: {package.depends}\n"
+                stanza += (
+                    f"Filename: {filename}\nSize: {len(deb)}\nMD5sum: {hashlib.md5(deb).hexdigest()}\n"
+                    f"SHA256: {hashlib.sha256(deb).hexdigest()}\nSection: misc\nPriority: optional\n"
+                    f"Description: {package.summary}\n"
+                )
+                stanzas.append(stanza)
+            plain = "\n".join(stanzas).encode()
+            path = f"{component}/binary-{arch}/Packages"
+            indices[path] = plain
+            indices[path + ".gz"] = gzip.compress(plain, mtime=0)
+            indices[path + ".xz"] = lzma.compress(plain)
+            total += len(packages)
+
+    checksums = {"MD5Sum": "md5", "SHA256": "sha256"}
+    release = (
+        f"Origin: Synthetic\nLabel: {distro.title()}\nSuite: {codename}\nCodename: {codename}\n"
+        f"Date: {formatdate(EPOCH, usegmt=True)}\nArchitectures: {' '.join(spec.apt_architectures)}\n"
+        f"Components: {' '.join(spec.apt_components)}\nDescription: Synthetic {distro} {version} repository\n"
+    )
+    for field, algorithm in checksums.items():
+        release += f"{field}:\n"
+        for path, data in indices.items():
+            digest = _wrong_digest(data, algorithm) if "corrupt-checksum" in faults else hashlib.new(algorithm, data).hexdigest()
+            release += f" {digest} {len(data):>16} {path}\n"
+    dists = os.path.join(base, "dists", codename)
+    _write(os.path.join(dists, "Release"), release.encode())
+    _write_indices(dists, indices, faults)
+    return {"id": repository_id, "type": "apt", "distribution": distro, "version": version,
+            "base": f"/{spec.base_path(distro)}/", "path": f"/{spec.base_path(distro)}/dists/{codename}/", "packages": total, "faults": sorted(faults)}
+
+
+def _repomd_entry(kind: str, compressed: bytes, plain: bytes, corrupt: bool) -> str:
+    digest = _wrong_digest(compressed, "sha256") if corrupt else hashlib.sha256(compressed).hexdigest()
+    return (
+        f'  <data type="{kind}">\n'
+        f'    <checksum type="sha256">{digest}</checksum>\n'
+        f'    <open-checksum type="sha256">{hashlib.sha256(plain).hexdigest()}</open-checksum>\n'
+        f'    <location href="repodata/{kind}.xml.gz"/>\n'
+        f'    <timestamp>{EPOCH}</timestamp>\n'
+        f'    <size>{len(compressed)}</size>\n'
+        f'    <open-size>{len(plain)}</open-size>\n'
+        '  </data>\n'
+    )
+
+
+def build_yum_repository(root: str, distro: str, version: str, component: str, arch: str,
+                         spec: MirrorSpec) -> Dict[str, Any]:
+    repository_id = f"{distro}/{version}"
+    faults = spec.faults_for(repository_id)
+    base = os.path.join(root, spec.base_path(distro), version, component, arch, "os")
+    rng = random.Random(f"{spec.seed}:{repository_id}:{component}:{arch}")
+    packages = generate_packages(rng, spec.packages, f"synth-{component.lower()}-",
+                                 include_test_packages=component == spec.yum_components[0])
+    primary, filelists, other = [], [], []
+    for package in packages:
+        ver, rel = package.version.split("-", 1)
+        rel = f"{rel}.el{version}"
+        rpm = build_rpm_stub(package, arch)
+        pkgid = hashlib.sha256(rpm).hexdigest()
+        href = f"Packages/{package.name[0]}/{package.name}-{ver}-{rel}.{arch}.rpm"
+        if _wants_stub(spec, package, faults):
+            _write(os.path.join(base, href), rpm)
+        evr = f'epoch="0" ver="{escape(ver)}" rel="{escape(rel)}"'
+        requires = (f'<rpm:requires><rpm:entry name="{package.depends}"/></rpm:requires>'
+                    if package.depends else "")
+        primary.append(
+            f'<package type="rpm"><name>{package.name}</name><arch>{arch}</arch><version {evr}/>'
+            f'<checksum type="sha256" pkgid="YES">{pkgid}</checksum>'
+            f'<summary>{escape(package.summary)}</summary><description>{escape(package.summary)}</description>'
+            f'<packager>Synthetic Mirror</packager><url/><time file="{EPOCH}" build="{EPOCH}"/>'
+            f'<size package="{len(rpm)}" installed="{package.installed_size * 1024}" archive="{len(rpm)}"/>'
+            f'<location href="{href}"/>'
+            f'<format><rpm:license>MIT</rpm:license><rpm:group>Unspecified</rpm:group>'
+            f'<rpm:provides><rpm:entry name="{package.name}" flags="EQ" {evr}/></rpm:provides>{requires}</format>'
+            '</package>'
+        )
+        filelists.append(
+            f'<package pkgid="{pkgid}" name="{package.name}" arch="{arch}"><version {evr}/>'
+            f'<file>/usr/share/doc/{package.name}/README</file></package>'
+        )
+        other.append(f'<package pkgid="{pkgid}" name="{package.name}" arch="{arch}"><version {evr}/></package>')
+
+    count = len(packages)
+    documents = {
+        "primary": ('<metadata xmlns="http://linux.duke.edu/metadata/common" '
+                    f'xmlns:rpm="http://linux.duke.edu/metadata/rpm" packages="{count}">', primary, "</metadata>"),
+        "filelists": (f'<filelists xmlns="http://linux.duke.edu/metadata/filelists" packages="{count}">',
+                      filelists, "</filelists>"),
+        "other": (f'<otherdata xmlns="http://linux.duke.edu/metadata/other" packages="{count}">', other, "</otherdata>"),
+    }
+    indices: Dict[str, bytes] = {}
+    repomd = f'<?xml version="1.0" encoding="UTF-8"?>\n<repomd xmlns="http://linux.duke.edu/metadata/repo">\n  <revision>{EPOCH}</revision>\n'
+    for kind, (opening, entries, closing) in documents.items():
+        plain = ('<?xml version="1.0" encoding="UTF-8"?>\n' + opening + "\n" + "\n".join(entries) + "\n" + closing + "\n").encode()
+        compressed = gzip.compress(plain, mtime=0)
+        indices[f"repodata/{kind}.xml.gz"] = compressed
+        repomd += _repomd_entry(kind, compressed, plain, "corrupt-checksum" in faults)
+    repomd += "</repomd>\n"
+    _write(os.path.join(base, "repodata", "repomd.xml"), repomd.encode())
+    _write_indices(base, indices, faults)
+    return {"id": repository_id, "type": "yum", "distribution": distro, "version": version,
+            "component": component, "arch": arch, "base": f"/{spec.base_path(distro)}/",
+            "path": f"/{spec.base_path(distro)}/{version}/{component}/{arch}/os/",
+            "packages": count, "faults": sorted(faults)}
+
+
+def generate(root: str, spec: MirrorSpec) -> Dict[str, Any]:
+    """Write the mirror under ``root`` (replacing it) and return its manifest"""
+    if os.path.exists(root):
+        if not os.path.exists(os.path.join(root, MANIFEST)) and os.listdir(root):
+            raise ValueError(f"{root} exists and is not a generated mirror; refusing to replace it")
+        shutil.rmtree(root)
+    os.makedirs(root)
+    repositories = []
+    for distro, versions in spec.apt.items():
+        for version in versions:
+            repositories.append(build_apt_repository(root, distro, version, spec))
+    for distro, versions in spec.yum.items():
+        for version in versions:
+            for component in spec.yum_components:
+                for arch in spec.yum_architectures:
+                    repositories.append(build_yum_repository(root, distro, version, component, arch, spec))
+    manifest = {
+        "seed": spec.seed,
+        "packages": spec.packages,
+        "stubs": spec.stubs,
+        "faults": [fault.to_dict() for fault in spec.faults],
+        "repositories": repositories,
+    }
+    with open(os.path.join(root, MANIFEST), "w") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def link_suites(root: str, spec: MirrorSpec, distro: str, version: str, aliases: List[str]):
+    """Serve a generated APT suite under more codenames as well (symlinks in dists/)"""
+    codename = CODENAMES.get(distro, {}).get(version, version)
+    dists = os.path.join(root, spec.base_path(distro), "dists")
+    for alias in aliases:
+        os.symlink(codename, os.path.join(dists, alias))
+
+
+def config_snippet(manifest: Dict[str, Any], base_url: str) -> str:
+    """The ``repositories`` section of config.yaml pointing at this mirror"""
+    distributions: Dict[str, Tuple[str, List[str]]] = {}
+    for repository in manifest["repositories"]:
+        _, versions = distributions.setdefault(repository["distribution"], (repository["base"], []))
+        if repository["version"] not in versions:
+            versions.append(repository["version"])
+    lines = ["repositories:"]
+    for distro, (base, versions) in distributions.items():
+        lines += [f"  {distro}:", f'    - url: "{base_url}{base}"', "      enabled: true", "      distributions:"]
+        lines += [f'        - "{version}"' for version in versions]
+    return "\n".join(lines)
+
+
+# HTTP server
+
+class MirrorServer:
+    """
+    Minimal asyncio HTTP/1.1 static server for a generated mirror: GET/HEAD,
+    keep-alive, ETag / Last-Modified validators and the manifest's slow faults.
+    """
+
+    def __init__(self, root: str, delay: float = 0.0, error_rate: float = 0.0, seed: int = 1):
+        self.root = os.path.realpath(root)
+        self.delay = delay
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.slow: List[Tuple[str, float]] = []
+        manifest_path = os.path.join(self.root, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+            faults = [Fault(**fault) for fault in manifest["faults"] if fault["kind"] == "slow"]
+            for repository in manifest["repositories"]:
+                for fault in faults:
+                    if fault.matches(repository["id"]):
+                        self.slow.append((repository["path"], fault.value if fault.value is not None else 1.0))
+        self.requests = 0
+        self.bytes_sent = 0
+
+    def delay_for(self, path: str) -> float:
+        return self.delay + max((seconds for prefix, seconds in self.slow if path.startswith(prefix)), default=0.0)
+
+    def resolve(self, path: str) -> Optional[str]:
+        full = os.path.realpath(os.path.join(self.root, path.lstrip("/")))
+        if full != self.root and not full.startswith(self.root + os.sep):
+            return None
+        return full if os.path.isfile(full) else None
+
+    async def _respond(self, writer, status: int, reason: str, headers: Dict[str, str], body: bytes = b""):
+        lines = [f"HTTP/1.1 {status} {reason}"] + [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def handle_request(self, writer, method: str, target: str, headers: Dict[str, str], keep_alive: bool):
+        self.requests += 1
+        path = unquote(urlsplit(target).path)
+        connection = {"Connection": "keep-alive" if keep_alive else "close"}
+        delay = self.delay_for(path)
+        if delay:
+            await asyncio.sleep(delay)
+        if method not in ("GET", "HEAD"):
+            await self._respond(writer, 405, "Method Not Allowed", {"Allow": "GET, HEAD", "Content-Length": "0", **connection})
+            return
+        if self.error_rate and self.random.random() < self.error_rate:
+            await self._respond(writer, 503, "Service Unavailable", {"Content-Length": "0", "Retry-After": "1", **connection})
+            return
+        full = self.resolve(path)
+        if full is None:
+            body = b"Not Found\n"
+            await self._respond(writer, 404, "Not Found", {"Content-Type": "text/plain", "Content-Length": str(len(body)), **connection},
+                                body if method == "GET" else b"")
+            return
+
+        stat = os.stat(full)
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        validators = {"ETag": etag, "Last-Modified": formatdate(stat.st_mtime, usegmt=True)}
+        if headers.get("if-none-match") in (etag, "*") or self._not_modified_since(headers.get("if-modified-since"), stat.st_mtime):
+            await self._respond(writer, 304, "Not Modified", {**validators, **connection})
+            return
+        content_type = mimetypes.guess_type(full)[0] or "application/octet-stream"
+        await self._respond(writer, 200, "OK", {"Content-Type": content_type, "Content-Length": str(stat.st_size),
+                                                **validators, **connection})
+        if method == "GET":
+            with open(full, "rb") as file:
+                self.bytes_sent += await asyncio.get_running_loop().sendfile(writer.transport, file)
+
+    @staticmethod
+    def _not_modified_since(value: Optional[str], mtime: float) -> bool:
+        if not value:
+            return False
+        try:
+            return int(mtime) <= parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, protocol = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, "Bad Request", {"Content-Length": "0", "Connection": "close"})
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get("content-length", "0").isdigit() and int(headers.get("content-length", "0")):
+                    await reader.readexactly(int(headers["content-length"]))
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if protocol == "HTTP/1.1" else connection == "keep-alive"
+                await self.handle_request(writer, method.upper(), target, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port, backlog=1024)
+
+
+async def serve(root: str, host: str, port: int, delay: float, error_rate: float, seed: int):
+    mirror = MirrorServer(root, delay, error_rate, seed)
+    server = await mirror.start(host, port)
+    bound = server.sockets[0].getsockname()[1]
+    print(f"Serving {mirror.root} on http://{host}:{bound}/", flush=True)
+    for prefix, seconds in mirror.slow:
+        print(f"  slow: {prefix} +{seconds}s")
+    async with server:
+        await server.serve_forever()
+
+
+# Command line
+
+def parse_repositories(values: List[str]) -> Dict[str, List[str]]:
+    repositories: Dict[str, List[str]] = {}
+    for value in values:
+        distro, _, versions = value.partition(":")
+        if not versions:
+            raise ValueError(f"Invalid repository '{value}' (expected distro:version[,version...])")
+        repositories.setdefault(distro.lower(), []).extend(v for v in versions.split(",") if v)
+    return repositories
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate and serve deterministic synthetic APT and yum mirrors")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="write a mirror tree")
+    generate_parser.add_argument("root", help="output directory (replaced if it holds a generated mirror)")
+    generate_parser.add_argument("--apt", action="append", metavar="DISTRO:VERSIONS",
+                                 help=f"APT repositories (default: {' '.join(DEFAULT_APT)})")
+    generate_parser.add_argument("--yum", action="append", metavar="DISTRO:VERSIONS",
+                                 help=f"yum/dnf repositories (default: {' '.join(DEFAULT_YUM)})")
+    generate_parser.add_argument("--packages", type=int, default=2000, help="packages per component and architecture")
+    generate_parser.add_argument("--apt-components", nargs="+", default=["main"])
+    generate_parser.add_argument("--apt-architectures", nargs="+", default=["amd64"])
+    generate_parser.add_argument("--yum-components", nargs="+", default=["BaseOS", "AppStream"])
+    generate_parser.add_argument("--yum-architectures", nargs="+", default=["x86_64"])
+    generate_parser.add_argument("--stubs", choices=["all", "test", "none"], default="all",
+                                 help="package files to write: all, the install test packages only, or none")
+    generate_parser.add_argument("--fault", action="append", default=[], metavar="KIND:PATTERN[:VALUE]",
+                                 help=f"inject a fault ({', '.join(FAULT_KINDS)})")
+    generate_parser.add_argument("--production-layout", action="store_true",
+                                 help="use the production mirror's paths (e.g. yum/rocky/pub/rocky) so only the host changes")
+    generate_parser.add_argument("--seed", type=int, default=1)
+    generate_parser.add_argument("--base-url", default="http://127.0.0.1:8080",
+                                 help="URL the printed config.yaml snippet points at")
+
+    serve_parser = commands.add_parser("serve", help="serve a generated mirror over HTTP")
+    serve_parser.add_argument("root")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--delay", type=float, default=0.0, help="seconds added to every response")
+    serve_parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    serve_parser.add_argument("--seed", type=int, default=1)
+    return parser, parser.parse_args()
+
+
+def main() -> int:
+    parser, args = parse_args()
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.root, args.host, args.port, args.delay, args.error_rate, args.seed))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        spec = MirrorSpec(
+            apt=parse_repositories(args.apt if args.apt is not None else DEFAULT_APT),
+            yum=parse_repositories(args.yum if args.yum is not None else DEFAULT_YUM),
+            packages=args.packages,
+            apt_components=args.apt_components, apt_architectures=args.apt_architectures,
+            yum_components=args.yum_components, yum_architectures=args.yum_architectures,
+            stubs=args.stubs, faults=[Fault.parse(spec) for spec in args.fault],
+            production_layout=args.production_layout, seed=args.seed,
+        )
+        started = time.monotonic()
+        manifest = generate(args.root, spec)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Generated {len(manifest['repositories'])} repositories under {args.root} "
+          f"in {time.monotonic() - started:.1f}s")
+    for repository in manifest["repositories"]:
+        faults = f"  faults: {', '.join(repository['faults'])}" if repository["faults"] else ""
+        print(f"  {repository['path']:<40} {repository['packages']:>7} packages{faults}")
+    print(f"\n{config_snippet(manifest, args.base_url.rstrip('/'))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
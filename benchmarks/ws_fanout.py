@@ -0,0 +1,427 @@
+#!/usr/bin/env python
+"""
+Load test of the dashboard WebSocket fan-out.
+
+Starts the backend (backend/main.py under uvicorn) with a fixed synthetic
+target set and opens N simulated dashboard clients, split between
+/api/v1/test/test/ws and /test/ws and spread over several client processes.
+Inside the server a driver flips targets between "running" and "success"
+at a fixed rate through the normal publish path. Each run is one state
+change, and clients time it from the run's start_time to receipt.
+
+Per client count it reports:
+- state-change-to-receipt latency
+- server CPU
+- bytes and messages per client per minute
+- resync snapshots
+- server event-loop lag
+
+Results can be saved as a baseline and compared across backend versions:
+
+    python benchmarks/ws_fanout.py --save-baseline      # record benchmarks/ws_baseline.json
+    python benchmarks/ws_fanout.py                      # compare; exit 1 on regressions
+    python benchmarks/ws_fanout.py --clients 100 1000 --rate 20 --duration 60
+"""
+
+import argparse
+import array
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from common import BACKEND_DIR, BENCHMARK_DIR, LoopLagMonitor, cpu_seconds, summarize, synthetic_config, write_config
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "ws_baseline.json")
+PATHS = ("/api/v1/test/test/ws", "/test/ws")
+# Differences smaller than these are noise, whatever the relative change
+LATENCY_FLOOR_SECONDS = 0.005
+LOOP_LAG_FLOOR_MS = 2.0
+CPU_FLOOR_PERCENT = 5.0
+
+
+# Server process
+
+class MeasurementWindow:
+    """Server side of one measurement: CPU, loop lag and the state-change driver"""
+
+    def __init__(self, rate: float, stats_path: str):
+        self.rate = rate
+        self.stats_path = stats_path
+        self.monitor = LoopLagMonitor()
+        self._driver = None
+
+    def start(self):
+        from services.event_hub import event_hub
+        self.cpu_start = cpu_seconds()
+        self.started = time.monotonic()
+        self.hub_start = event_hub.stats()
+        self.monitor.start()
+        self._driver = asyncio.create_task(self._drive())
+
+    async def _drive(self):
+        """Flip targets between running and success through the normal publish path"""
+        from api.endpoints.test import publish_target, test_tracker
+        from core.repo_config import config_store
+
+        keys = [target.key for target in config_store.get().targets]
+        interval = 1.0 / self.rate
+        next_change = time.monotonic()
+        index = 0
+        while True:
+            key = keys[index % len(keys)]
+            index += 1
+            info = test_tracker.get(key)
+            if info is None or info["status"] != "running":
+                test_tracker[key] = {
+                    "start_time": datetime.now(),
+                    "started_ns": time.monotonic_ns(),
+                    "status": "running",
+                    "test_results": {phase: {"status": "pending", "duration": 0, "error": None}
+                                     for phase in ("connectivity", "metadata", "update", "install")},
+                }
+            else:
+                info.update(status="success", end_time=datetime.now(), duration=0.5, error_message=None)
+                for result in info["test_results"].values():
+                    result.update(status="success", duration=0.1)
+            publish_target(key)
+            next_change += interval
+            await asyncio.sleep(max(0.0, next_change - time.monotonic()))
+
+    async def finish(self):
+        from services.event_hub import event_hub
+        self._driver.cancel()
+        await self.monitor.stop()
+        elapsed = time.monotonic() - self.started
+        hub = event_hub.stats()
+        stats = {
+            "seconds": round(elapsed, 3),
+            "cpu_percent": round(100 * (cpu_seconds() - self.cpu_start) / elapsed, 1),
+            "loop_lag_ms": self.monitor.summary_ms(),
+            "subscribers": hub["subscribers"],
+            **{key: hub[key] - self.hub_start[key] for key in ("published_total", "coalesced_total", "snapshots_total")},
+        }
+        with open(self.stats_path, "w") as file:
+            json.dump(stats, file)
+
+
+def run_server(port: int, stats_path: str, rate: float):
+    """Serve backend/main.py; SIGUSR1 starts the measurement, SIGUSR2 ends it"""
+    sys.path.insert(0, BACKEND_DIR)
+    import uvicorn
+    from main import app
+    from services.scheduler import periodic_scheduler, test_scheduler
+
+    # No real test runs: the driver's state changes are the only ones measured
+    test_scheduler.start = lambda: None
+    periodic_scheduler.start = lambda: None
+
+    async def main():
+        window = MeasurementWindow(rate, stats_path)
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGUSR1, window.start)
+        loop.add_signal_handler(signal.SIGUSR2, lambda: asyncio.create_task(window.finish()))
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+        await uvicorn.Server(config).serve()
+
+    asyncio.run(main())
+
+
+# Client processes
+
+class ClientStats:
+    def __init__(self):
+        self.active = False
+        self.latencies = array.array("d")
+        self.bytes = 0
+        self.messages = 0
+        self.snapshots = 0
+        self.disconnects = 0
+
+
+async def dashboard_client(session, url: str, stats: ClientStats, connected: asyncio.Future):
+    import aiohttp
+    started = time.monotonic()
+    try:
+        async with session.ws_connect(url, max_msg_size=0) as websocket:
+            async for message in websocket:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    break
+                received = time.time()
+                if not connected.done():
+                    # The first message is the snapshot
+                    connected.set_result(time.monotonic() - started)
+                if not stats.active:
+                    continue
+                data = message.data
+                stats.bytes += len(data)
+                stats.messages += 1
+                if data.startswith('{"type": "snapshot"'):
+                    stats.snapshots += 1
+                elif '"status": "running"' in data:
+                    start_time = json.loads(data)["target"].get("start_time")
+                    if start_time:
+                        stats.latencies.append(received - datetime.fromisoformat(start_time).timestamp())
+    except Exception as e:
+        if not connected.done():
+            connected.set_exception(e)
+            return
+    if stats.active:
+        stats.disconnects += 1
+
+
+async def client_main(port: int, count: int, offset: int, conn):
+    import aiohttp
+    loop = asyncio.get_running_loop()
+    stats = ClientStats()
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    futures, tasks = [], []
+    for index in range(offset, offset + count):
+        future = loop.create_future()
+        url = f"http://127.0.0.1:{port}{PATHS[index % len(PATHS)]}"
+        tasks.append(asyncio.create_task(dashboard_client(session, url, stats, future)))
+        futures.append(future)
+        if len(tasks) % 100 == 0:
+            await asyncio.sleep(0)  # let the previous batch connect
+
+    outcomes = await asyncio.gather(*futures, return_exceptions=True)
+    connect_times = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+    failures = [repr(outcome) for outcome in outcomes if isinstance(outcome, BaseException)]
+    conn.send({"connect_seconds": connect_times, "failures": failures[:5], "failed": len(failures)})
+
+    await loop.run_in_executor(None, conn.recv)  # start
+    stats.active = True
+    await loop.run_in_executor(None, conn.recv)  # stop
+    stats.active = False
+    conn.send({
+        "latencies": stats.latencies.tobytes(),
+        "bytes": stats.bytes,
+        "messages": stats.messages,
+        "snapshots": stats.snapshots,
+        "disconnects": stats.disconnects,
+    })
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await session.close()
+
+
+def run_clients(port: int, count: int, offset: int, conn):
+    asyncio.run(client_main(port, count, offset, conn))
+
+
+# Orchestration
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port: int, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited during startup ({process.returncode})")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Backend did not start listening")
+
+
+def run_clients_count(clients: int, args) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix=f"mirror-ws-{clients}-") as workdir:
+        # Nothing is tested: the mirror and Docker daemon are unreachable on purpose
+        write_config(workdir, synthetic_config(args.targets, "http://127.0.0.1:9", 1))
+        stats_path = os.path.join(workdir, "server.json")
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--server", str(port), stats_path, str(args.rate)],
+            cwd=workdir, env={**os.environ, "DOCKER_HOST": "tcp://127.0.0.1:9"},
+            stdout=None if args.verbose else subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+        )
+        workers = []
+        try:
+            wait_for_server(port, server)
+            processes = max(1, min(args.client_processes, clients))
+            for index in range(processes):
+                count = clients // processes + (1 if index < clients % processes else 0)
+                offset = sum(worker[2] for worker in workers)
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=run_clients, args=(port, count, offset, child), daemon=True)
+                process.start()
+                workers.append((process, parent, count))
+
+            ready = [parent.recv() for _, parent, _ in workers]
+            connect_seconds = [value for report in ready for value in report["connect_seconds"]]
+            failed = sum(report["failed"] for report in ready)
+            errors = [error for report in ready for error in report["failures"]][:5]
+
+            server.send_signal(signal.SIGUSR1)
+            for _, parent, _ in workers:
+                parent.send("start")
+            time.sleep(args.duration)
+            server.send_signal(signal.SIGUSR2)
+            for _, parent, _ in workers:
+                parent.send("stop")
+            reports = [parent.recv() for _, parent, _ in workers]
+
+            deadline = time.monotonic() + 30
+            while not os.path.exists(stats_path) and time.monotonic() < deadline:
+                time.sleep(0.1)
+            with open(stats_path) as file:
+                server_stats = json.load(file)
+        finally:
+            for process, _, _ in workers:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    latencies = array.array("d")
+    for report in reports:
+        latencies.frombytes(report["latencies"])
+    connected = clients - failed
+    minutes = server_stats["seconds"] / 60
+    total_bytes = sum(report["bytes"] for report in reports)
+    total_messages = sum(report["messages"] for report in reports)
+    return {
+        "clients": clients,
+        "connected": connected,
+        "failed": failed,
+        "errors": errors,
+        "connect_seconds": summarize(connect_seconds),
+        "latency_seconds": {**summarize(list(latencies)), "max": round(max(latencies, default=0.0), 4)},
+        "bytes_per_client_per_minute": round(total_bytes / connected / minutes) if connected else 0,
+        "messages_per_client_per_minute": round(total_messages / connected / minutes, 1) if connected else 0,
+        "resync_snapshots": sum(report["snapshots"] for report in reports),
+        "disconnects": sum(report["disconnects"] for report in reports),
+        "server": server_stats,
+    }
+
+
+def format_seconds(value) -> str:
+    if value is None:
+        return "-"
+    return f"{value * 1000:.1f}ms" if value < 1 else f"{value:.2f}s"
+
+
+def print_result(result: Dict[str, Any]):
+    latency, server = result["latency_seconds"], result["server"]
+    print(f"\n{result['clients']} clients: {result['connected']} connected, {result['failed']} failed")
+    for error in result["errors"]:
+        print(f"  error: {error}")
+    print(f"  connect+snapshot p50 {format_seconds(result['connect_seconds']['p50'])}  "
+          f"p99 {format_seconds(result['connect_seconds']['p99'])}")
+    print(f"  delivery latency p50 {format_seconds(latency['p50'])}  p99 {format_seconds(latency['p99'])}  "
+          f"max {format_seconds(latency['max'])}  (n={latency['count']})")
+    print(f"  per client/min   {result['messages_per_client_per_minute']} messages, "
+          f"{result['bytes_per_client_per_minute']} bytes")
+    print(f"  resyncs          {result['resync_snapshots']} snapshots, {server['coalesced_total']} coalesced deltas, "
+          f"{result['disconnects']} disconnects")
+    print(f"  server           {server['cpu_percent']}% CPU, loop lag p50 {server['loop_lag_ms']['p50']}ms "
+          f"p99 {server['loop_lag_ms']['p99']}ms max {server['loop_lag_ms']['max']}ms, "
+          f"{server['published_total']} deltas published")
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of ``results`` against the baseline's, as readable lines"""
+    regressions = []
+    for size, current in results.items():
+        previous = baseline.get("results", {}).get(size)
+        if previous is None:
+            continue
+        label = f"{size} clients"
+        if current["failed"] > previous["failed"]:
+            regressions.append(f"{label}: {previous['failed']} -> {current['failed']} failed connections")
+        old, new = previous["latency_seconds"]["p99"], current["latency_seconds"]["p99"]
+        if old is not None and new is not None and new > old * (1 + tolerance) and new - old > LATENCY_FLOOR_SECONDS:
+            regressions.append(f"{label}: delivery p99 {format_seconds(old)} -> {format_seconds(new)}")
+        old, new = previous["server"]["cpu_percent"], current["server"]["cpu_percent"]
+        if new > old * (1 + tolerance) and new - old > CPU_FLOOR_PERCENT:
+            regressions.append(f"{label}: server CPU {old}% -> {new}%")
+        old, new = previous["server"]["loop_lag_ms"]["p99"], current["server"]["loop_lag_ms"]["p99"]
+        if old is not None and new is not None and new > old * (1 + tolerance) and new - old > LOOP_LAG_FLOOR_MS:
+            regressions.append(f"{label}: server loop lag p99 {old}ms -> {new}ms")
+        old, new = previous["bytes_per_client_per_minute"], current["bytes_per_client_per_minute"]
+        if new > old * (1 + tolerance):
+            regressions.append(f"{label}: {old} -> {new} bytes per client per minute")
+        if current["resync_snapshots"] > previous["resync_snapshots"] * (1 + tolerance) + 10:
+            regressions.append(f"{label}: resync snapshots {previous['resync_snapshots']} -> {current['resync_snapshots']}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test of the dashboard WebSocket fan-out")
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 500, 2000, 5000], help="client counts to run")
+    parser.add_argument("--targets", type=int, default=200, help="synthetic targets in the snapshot")
+    parser.add_argument("--rate", type=float, default=10.0, help="state changes per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="measurement seconds per client count")
+    parser.add_argument("--client-processes", type=int, default=min(8, os.cpu_count() or 1),
+                        help="processes the clients are spread over")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to compare with or save")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative change reported as a regression")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the backend's output")
+    parser.add_argument("--server", nargs=3, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.server:
+        port, stats_path, rate = args.server
+        run_server(int(port), stats_path, float(rate))
+        return 0
+
+    parameters = {"targets": args.targets, "rate": args.rate, "duration": args.duration}
+    results = {}
+    for clients in args.clients:
+        results[str(clients)] = run_clients_count(clients, args)
+        print_result(results[str(clients)])
+
+    output = {"parameters": parameters, "results": results}
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(output, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(output, file, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get("parameters") != parameters:
+        print("\nWarning: baseline was recorded with different parameters; comparison may not be meaningful")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
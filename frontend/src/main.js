@@ -9,6 +9,51 @@ const lastUpdatedSpan = document.getElementById('last-updated');
 // WebSocket connection to backend (will be established after initial load)
 let ws = null;
 
+// Dashboard state, keyed by "Distribution-version", kept in server order
+let repositories = new Map();
+let lastSeq = null;
+let lastEpoch = null;
+
+// Reconnect state: jittered exponential backoff, then SSE if WebSockets keep failing
+let reconnectAttempts = 0;
+let wsFailures = 0;
+const WS_FAILURES_BEFORE_SSE = 3;
+
+function repoKey(repo) {
+    return `${repo.distribution}-${repo.version}`;
+}
+
+function applySnapshot(targets) {
+    repositories = new Map(targets.map(repo => [repoKey(repo), repo]));
+    updateDashboard([...repositories.values()]);
+}
+
+function applyDelta(key, target) {
+    repositories.set(key, target);
+    updateDashboard([...repositories.values()]);
+}
+
+// Handle a snapshot/delta message from the test stream
+function handleStreamMessage(data) {
+    if (Array.isArray(data)) {
+        applySnapshot(data);
+    } else if (data.type === 'snapshot') {
+        lastSeq = data.seq;
+        lastEpoch = data.epoch;
+        applySnapshot(data.targets);
+    } else if (data.type === 'delta') {
+        if (lastSeq !== null && data.epoch === lastEpoch && data.seq <= lastSeq) {
+            // Already covered by a newer snapshot
+            return;
+        }
+        lastSeq = data.seq;
+        lastEpoch = data.epoch;
+        applyDelta(data.key, data.target);
+    } else {
+        console.log('Received non-repository data:', data);
+    }
+}
+
 // Fetch and display repository list from backend
 async function loadRepositoryList() {
     try {
@@ -18,7 +63,7 @@ async function loadRepositoryList() {
         }
         const data = await response.json();
         console.log('Repository list:', data);
-        updateDashboard(data); // Display the repository list on the dashboard
+        applySnapshot(data); // Display the repository list on the dashboard
     } catch (error) {
         console.error('Error loading repository list:', error);
         // Fallback to a mock implementation for demonstration
@@ -44,6 +89,21 @@ function simulateWebSocketData() {
 }
 
 
+// Durations are float seconds; sub-10s values keep a decimal so fast probes don't show as 0
+function formatSeconds(seconds) {
+    if (seconds === null || seconds === undefined) return '-';
+    return (seconds < 10 ? seconds.toFixed(1) : Math.round(seconds)) + 's';
+}
+
+// Running tests only get deltas on phase changes, so their duration is counted locally
+function formatDuration(repo) {
+    let seconds = repo.duration_seconds;
+    if (repo.status === 'running' && repo.start_time) {
+        seconds = Math.max(0, Math.floor((Date.now() - new Date(repo.start_time).getTime()) / 1000));
+    }
+    return seconds ? formatSeconds(seconds) : '-';
+}
+
 // Update the dashboard with new data
 function updateDashboard(data) {
     // Clear existing grid
@@ -78,6 +138,15 @@ function updateDashboard(data) {
                 statusClass = 'running';
                 statusIcon = '↻';
                 break;
+            case 'cancelled':
+                statusClass = 'warning';
+                statusIcon = '⊘';
+                break;
+            case 'queued':
+            case 'pending':
+                statusClass = 'running';
+                statusIcon = '…';
+                break;
             default:
                 statusClass = 'running';
                 statusIcon = '?';
@@ -86,23 +155,20 @@ function updateDashboard(data) {
         // Build detailed test results if available
         let testDetailsHtml = '';
         if (repo.test_details) {
-            testDetailsHtml = `
-                <div class="test-details">
+            const phaseNames = {
+                connectivity: 'Connectivity',
+                metadata: 'Metadata',
+                update: 'Update',
+                install: 'Install'
+            };
+            const items = Object.entries(repo.test_details).map(([phase, result]) => `
                     <div class="test-item">
-                        <span class="test-name">Connectivity:</span>
-                        <span class="test-status ${repo.test_details.connectivity.status}">${repo.test_details.connectivity.status}</span>
-                        <span class="test-duration">(${repo.test_details.connectivity.duration}s)</span>
-                    </div>
-                    <div class="test-item">
-                        <span class="test-name">Update:</span>
-                        <span class="test-status ${repo.test_details.update.status}">${repo.test_details.update.status}</span>
-                        <span class="test-duration">(${repo.test_details.update.duration}s)</span>
-                    </div>
-                    <div class="test-item">
-                        <span class="test-name">Install:</span>
-                        <span class="test-status ${repo.test_details.install.status}">${repo.test_details.install.status}</span>
-                        <span class="test-duration">(${repo.test_details.install.duration}s)</span>
-                    </div>
+                        <span class="test-name">${phaseNames[phase] || phase}:</span>
+                        <span class="test-status ${result.status}">${result.status}</span>
+                        <span class="test-duration">(${formatSeconds(result.duration)})</span>
+                    </div>`).join('');
+            testDetailsHtml = `
+                <div class="test-details">${items}
                 </div>
             `;
         }
@@ -112,7 +178,8 @@ function updateDashboard(data) {
             <div class="status-icon ${statusClass}">${statusIcon}</div>
             <p>Repository: ${repo.repository}</p>
             <p>Overall Status: <span class="status-indicator ${statusClass}"></span> ${repo.status}</p>
-            <p>Total Duration: ${repo.duration_seconds ? repo.duration_seconds + 's' : '-'}</p>
+            <p>Total Duration: ${formatDuration(repo)}</p>
+            ${repo.package_count ? `<p>Packages: ${repo.package_count}</p>` : ''}
             ${testDetailsHtml}
             ${repo.error_message ? `<p class="error-message">Error: ${repo.error_message}</p>` : ''}
         `;
@@ -121,63 +188,106 @@ function updateDashboard(data) {
     });
 }
 
-// Establish WebSocket connection when the page loads
-document.addEventListener('DOMContentLoaded', () => {
-    // Load repository list first
-    loadRepositoryList();
-    
+// Query string telling the server what we already have, so it replays only missed deltas
+function resumeQuery() {
+    if (lastSeq === null || lastEpoch === null) {
+        return '';
+    }
+    return `?since=${lastSeq}&epoch=${encodeURIComponent(lastEpoch)}`;
+}
+
+function scheduleReconnect() {
+    // Spread reconnects out so a backend restart doesn't get every tab at once
+    const delay = Math.min(30000, 1000 * 2 ** reconnectAttempts) * (0.5 + Math.random());
+    reconnectAttempts++;
+    setTimeout(connectStream, delay);
+}
+
+function connectStream() {
+    if (wsFailures >= WS_FAILURES_BEFORE_SSE && window.EventSource) {
+        connectEventSource();
+    } else {
+        connectWebSocket();
+    }
+}
+
+function connectWebSocket() {
     // Connect to the test-specific WebSocket endpoint through nginx proxy
     const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     const wsHost = window.location.host; // This includes hostname and port
-    ws = new WebSocket(`${wsProtocol}//${wsHost}/test/ws`);
+    let opened = false;
+    ws = new WebSocket(`${wsProtocol}//${wsHost}/test/ws${resumeQuery()}`);
     ws.onopen = () => {
         console.log('Connected to backend test WebSocket');
+        opened = true;
+        reconnectAttempts = 0;
+        wsFailures = 0;
     };
 
     ws.onmessage = (event) => {
-        console.log('Received data:', event.data);
         // Try to parse as JSON, fallback to treating as plain text
         try {
-            const data = JSON.parse(event.data);
-            console.log('Parsed JSON data:', data);
-            // Only update dashboard if the message contains repository status data
-            if (data && Array.isArray(data)) {
-                updateDashboard(data);
-            } else {
-                console.log('Received non-repository data:', data);
-            }
+            handleStreamMessage(JSON.parse(event.data));
         } catch (e) {
             console.log('Received plain text data:', event.data);
-            // If it's not JSON, we might still want to process it or ignore it
-            // For now, just log and continue
         }
     };
 
     ws.onerror = (error) => {
         console.error('WebSocket error:', error);
-        // Fallback to polling approach if WebSocket fails
-        console.log('Falling back to polling for updates...');
-        setInterval(loadRepositoryList, 5000); // Poll every 5 seconds
     };
 
     ws.onclose = () => {
         console.log('Disconnected from backend WebSocket');
+        if (!opened) {
+            wsFailures++;
+            if (repositories.size === 0 && wsFailures === 1) {
+                loadRepositoryList();
+            }
+        }
+        scheduleReconnect();
+    };
+}
+
+function connectEventSource() {
+    // EventSource reconnects by itself and resumes via Last-Event-ID
+    console.log('WebSockets unavailable, using Server-Sent Events');
+    const source = new EventSource(`/api/v1/test/test/stream${resumeQuery()}`);
+    source.onopen = () => {
+        reconnectAttempts = 0;
+    };
+    source.onmessage = (event) => {
+        handleStreamMessage(JSON.parse(event.data));
+    };
+    source.onerror = () => {
+        console.error('Event stream error, browser will reconnect');
     };
+}
+
+// Establish the update stream when the page loads; its first message is a snapshot
+document.addEventListener('DOMContentLoaded', () => {
+    connectStream();
+
+    // Tick running durations between deltas
+    setInterval(() => {
+        if ([...repositories.values()].some(repo => repo.status === 'running')) {
+            updateDashboard([...repositories.values()]);
+        }
+    }, 1000);
 });
 
-// Trigger manual test
+// Trigger manual test; progress arrives through the update stream
 triggerTestBtn.addEventListener('click', () => {
     fetch('/api/v1/test/test', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
-        }
+        },
+        body: JSON.stringify({})
     })
     .then(response => response.json())
     .then(data => {
-        console.log('Manual test triggered:', data);
-        // Update the dashboard with the new result
-        updateDashboard([data]);
+        console.log(data.coalesced ? 'Joined running test job:' : 'Manual test job queued:', data.job_id);
     })
     .catch(error => {
         console.error('Error triggering manual test:', error);
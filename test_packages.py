@@ -4,6 +4,9 @@
 import subprocess
 import os
 
+# Mirror under test; point at a local synthetic mirror (benchmarks/synthetic_mirror.py) to run offline
+MIRROR_URL = os.environ.get("MIRROR_URL", "http://192.168.0.76").rstrip("/")
+
 def test_package_availability():
     """Test package availability in different repository types"""
 
@@ -15,25 +18,25 @@ def test_package_availability():
         {
             "name": "RHEL 8 BaseOS",
             "image": "registry.access.redhat.com/ubi8/ubi",
-            "repo_url": "http://192.168.0.76/yum/rhel/pub/rhel/8/BaseOS/x86_64/os/",
+            "repo_url": f"{MIRROR_URL}/yum/rhel/pub/rhel/8/BaseOS/x86_64/os/",
             "packages": ["nano", "rsync", "file", "less", "tar"]
         },
         {
             "name": "RHEL 8 AppStream",
             "image": "registry.access.redhat.com/ubi8/ubi",
-            "repo_url": "http://192.168.0.76/yum/rhel/pub/rhel/8/AppStream/x86_64/os/",
+            "repo_url": f"{MIRROR_URL}/yum/rhel/pub/rhel/8/AppStream/x86_64/os/",
             "packages": ["git", "vim", "python3"]
         },
         {
             "name": "Rocky 8 BaseOS",
             "image": "rockylinux:8",
-            "repo_url": "http://192.168.0.76/yum/rocky/pub/rocky/8/BaseOS/x86_64/os/",
+            "repo_url": f"{MIRROR_URL}/yum/rocky/pub/rocky/8/BaseOS/x86_64/os/",
             "packages": ["nano", "rsync", "file", "less", "curl"]
         },
         {
             "name": "Rocky 8 AppStream",
             "image": "rockylinux:8",
-            "repo_url": "http://192.168.0.76/yum/rocky/pub/rocky/8/AppStream/x86_64/os/",
+            "repo_url": f"{MIRROR_URL}/yum/rocky/pub/rocky/8/AppStream/x86_64/os/",
             "packages": ["git", "vim", "httpd"]
         }
     ]
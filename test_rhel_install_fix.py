@@ -4,9 +4,13 @@ Test script to verify RHEL container install fixes
 """
 import requests
 import json
+import os
 import time
 import sys
 
+# Mirror under test; point at a local synthetic mirror (benchmarks/synthetic_mirror.py) to run offline
+MIRROR_URL = os.environ.get("MIRROR_URL", "http://192.168.0.76").rstrip("/")
+
 def test_rhel_install_fixes():
     """Test RHEL container install functionality with fixes"""
 
@@ -17,8 +21,8 @@ def test_rhel_install_fixes():
 
     # Test configurations
     test_configs = [
-        {"distribution": "rhel", "version": "8", "repo_url": "http://192.168.0.76/yum/rhel/pub/rhel/"},
-        {"distribution": "rhel", "version": "9", "repo_url": "http://192.168.0.76/yum/rhel/pub/rhel/"},
+        {"distribution": "rhel", "version": "8", "repo_url": f"{MIRROR_URL}/yum/rhel/pub/rhel/"},
+        {"distribution": "rhel", "version": "9", "repo_url": f"{MIRROR_URL}/yum/rhel/pub/rhel/"},
     ]
 
     for config in test_configs: